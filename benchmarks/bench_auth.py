@@ -0,0 +1,89 @@
+"""
+Cost of a login: password verification per hasher policy, and the full email
+login path. ``logins_per_core`` in the saved JSON is the single-threaded
+throughput, i.e. what one CPU of a pod can sustain; use it to size a pod for a
+class logging in at the same minute before picking PASSWORD_HASHER_POLICY or
+PASSWORD_HASH_ITERATIONS.
+
+Concurrent throughput against a running server is measured with the
+``StudentLoginUser`` class in locust.py.
+"""
+import importlib.util
+import os
+
+import pytest
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher,
+)
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+PASSWORD = 'correct horse battery staple'
+
+pytestmark = pytest.mark.django_db
+
+
+def _pbkdf2(iterations):
+    hasher = PBKDF2PasswordHasher()
+    hasher.iterations = iterations
+    return hasher
+
+
+HASHERS = {
+    'pbkdf2-default': PBKDF2PasswordHasher,
+    'pbkdf2-600k': lambda: _pbkdf2(600_000),
+    'pbkdf2-260k': lambda: _pbkdf2(260_000),
+    'scrypt': ScryptPasswordHasher,
+    'argon2': Argon2PasswordHasher,
+}
+
+
+def _record_throughput(benchmark):
+    # No stats under --benchmark-disable
+    if benchmark.stats:
+        benchmark.extra_info['logins_per_core'] = round(1 / benchmark.stats.stats.mean, 1)
+
+
+@pytest.mark.parametrize('policy', HASHERS)
+def test_hasher_verify(benchmark, policy):
+    if policy == 'argon2' and importlib.util.find_spec('argon2') is None:
+        pytest.skip('argon2-cffi is not installed')
+    hasher = HASHERS[policy]()
+    encoded = hasher.encode(PASSWORD, hasher.salt())
+
+    benchmark.pedantic(hasher.verify, args=(PASSWORD, encoded), rounds=ROUNDS, iterations=1)
+    _record_throughput(benchmark)
+
+
+@pytest.fixture
+def student():
+    return User.objects.create_user(
+        username='bench-student@example.com',
+        email='Bench-Student@example.com',
+        password=PASSWORD,
+    )
+
+
+def test_email_authenticate(benchmark, student, count_queries):
+    def login():
+        assert authenticate(email='bench-student@example.com', password=PASSWORD) == student
+
+    count_queries(benchmark, login)
+    benchmark.pedantic(login, rounds=ROUNDS, iterations=1)
+    _record_throughput(benchmark)
+
+
+def test_student_login_view(benchmark, student, count_queries):
+    url = reverse('student_login')
+    data = {'email': 'bench-student@example.com', 'password': PASSWORD}
+
+    def login():
+        response = Client().post(url, data)
+        assert response.status_code == 302
+
+    count_queries(benchmark, login)
+    benchmark.pedantic(login, rounds=ROUNDS, iterations=1)
+    _record_throughput(benchmark)
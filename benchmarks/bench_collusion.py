@@ -0,0 +1,29 @@
+"""
+Answer-similarity detection (quiz/collusion.py) computed from scratch,
+without the cache, scoring every pair and through MinHash/LSH candidates.
+"""
+import os
+
+import pytest
+
+from quiz.collusion import EXACT_LIMIT, detect_collusion
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('method', ['exact', 'minhash'])
+def test_detect_collusion(benchmark, packed_dataset, count_queries, method):
+    size, quiz, _ = packed_dataset
+    exact_limit = EXACT_LIMIT if method == 'exact' else 0
+
+    count_queries(benchmark, detect_collusion, quiz, exact_limit=exact_limit)
+    report = benchmark.pedantic(
+        detect_collusion, args=(quiz,), kwargs={'exact_limit': exact_limit}, rounds=ROUNDS, iterations=1,
+    )
+    assert report.attempts == size.attempts
+    benchmark.extra_info.update({
+        'questions': size.questions, 'attempts': size.attempts,
+        'candidates': report.candidates, 'pairs': len(report.pairs),
+    })
@@ -0,0 +1,23 @@
+"""
+Item analysis (quiz/item_analysis.py) computed from scratch, without the
+cache, over each dataset tier in row form and packed.
+"""
+import os
+
+import pytest
+
+from quiz.item_analysis import compute_item_analysis
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('form', ['rows', 'packed'])
+def test_item_analysis(benchmark, dataset, packed_dataset, count_queries, form):
+    size, quiz, _ = dataset if form == 'rows' else packed_dataset
+
+    count_queries(benchmark, compute_item_analysis, quiz)
+    analysis = benchmark.pedantic(compute_item_analysis, args=(quiz,), rounds=ROUNDS, iterations=1)
+    assert analysis.attempts == size.attempts
+    benchmark.extra_info.update({'questions': size.questions, 'attempts': size.attempts})
@@ -0,0 +1,54 @@
+"""
+Per-quiz leaderboards (quiz/leaderboard.py): rebuilding a board from the
+attempts, reading the top 10% and one student's rank from a built board,
+and entering a graded attempt.
+"""
+import os
+
+import pytest
+
+from quiz.leaderboard import (
+    entry_score, get_leaderboard_backend, leaderboard_key, leaderboard_size, rebuild_leaderboard,
+    student_rank, top_entries,
+)
+from quiz.models import QuizAttempt
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+
+pytestmark = pytest.mark.django_db
+
+
+def test_rebuild(benchmark, dataset, count_queries):
+    size, quiz, _ = dataset
+    count_queries(benchmark, rebuild_leaderboard, quiz)
+    benchmark.pedantic(rebuild_leaderboard, args=(quiz,), rounds=ROUNDS, iterations=1)
+    benchmark.extra_info.update({'size': size, 'students': leaderboard_size(quiz)})
+
+
+def test_top_and_rank(benchmark, dataset, count_queries):
+    size, quiz, _ = dataset
+    rebuild_leaderboard(quiz)
+    student_id = QuizAttempt.objects.filter(quiz=quiz).values_list('student_id', flat=True).last()
+
+    def read():
+        top_entries(quiz, max(1, int(leaderboard_size(quiz) * 0.1)))
+        return student_rank(quiz, student_id)
+
+    count_queries(benchmark, read)
+    benchmark.pedantic(read, rounds=ROUNDS, iterations=100)
+    benchmark.extra_info.update({'size': size})
+
+
+def test_update(benchmark, dataset):
+    size, quiz, _ = dataset
+    rebuild_leaderboard(quiz)
+    backend = get_leaderboard_backend()
+    key = leaderboard_key(quiz.id)
+    attempt = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).last()
+    scores = iter(range(10**9))
+
+    def update():
+        backend.update(key, attempt.student_id, attempt.id, entry_score(0, attempt.end_time) + next(scores))
+
+    benchmark.pedantic(update, rounds=ROUNDS, iterations=1000)
+    benchmark.extra_info.update({'size': size})
@@ -0,0 +1,57 @@
+"""
+Storage and read cost of graded answers as rows versus packed into
+QuizAttempt.packed_answers (quiz/packing.py).
+
+Two copies of each dataset tier are built with the same seed; one is left in
+row form and the other compacted. ``stored_bytes`` in the saved JSON is the
+size of the answer payload (rows counted at their column widths, without
+index or per-row overhead, so the real saving on disk is larger).
+"""
+import os
+
+import pytest
+
+from quiz.models import QuizAttempt, StudentAnswer, StudentAnswerSelection
+from quiz.packing import attempt_answers, question_totals
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+
+pytestmark = pytest.mark.django_db
+
+# id, attempt_id, question_id, attempt_start_time, is_correct (+ empty text)
+ANSWER_ROW_BYTES = 8 + 8 + 8 + 8 + 1 + 1
+# id, studentanswer_id, answeroption_id, attempt_start_time
+SELECTION_ROW_BYTES = 8 + 8 + 8 + 8
+
+
+def _row_bytes(quiz):
+    answers = StudentAnswer.objects.filter(attempt__quiz=quiz).count()
+    selections = StudentAnswerSelection.objects.filter(studentanswer__attempt__quiz=quiz).count()
+    return answers * ANSWER_ROW_BYTES + selections * SELECTION_ROW_BYTES
+
+
+def _packed_bytes(quiz):
+    blobs = QuizAttempt.objects.filter(quiz=quiz).values_list('packed_answers', flat=True)
+    return sum(len(blob) for blob in blobs.iterator() if blob is not None)
+
+
+@pytest.mark.parametrize('form', ['rows', 'packed'])
+def test_question_totals(benchmark, dataset, packed_dataset, count_queries, form):
+    size, quiz, _ = dataset if form == 'rows' else packed_dataset
+    attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True)
+
+    count_queries(benchmark, question_totals, quiz, attempts)
+    benchmark.pedantic(question_totals, args=(quiz, attempts), rounds=ROUNDS, iterations=1)
+    benchmark.extra_info.update({
+        'attempts': size.attempts,
+        'stored_bytes': _row_bytes(quiz) if form == 'rows' else _packed_bytes(quiz),
+    })
+
+
+@pytest.mark.parametrize('form', ['rows', 'packed'])
+def test_attempt_answers(benchmark, dataset, packed_dataset, count_queries, form):
+    _, _, attempt_ids = dataset if form == 'rows' else packed_dataset
+    attempt = QuizAttempt.objects.select_related('answer_key').get(id=attempt_ids[0])
+
+    count_queries(benchmark, attempt_answers, attempt)
+    benchmark.pedantic(attempt_answers, args=(attempt,), rounds=ROUNDS, iterations=1)
@@ -0,0 +1,43 @@
+"""
+Ingesting batches of proctoring events through ``api_attempt_proctoring``
+(quiz/proctoring.py). The events do not count as violations, so every
+round appends to the same open attempt.
+"""
+import json
+import os
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from quiz.models import QuizAttempt
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('batch', [50, 500])
+def test_ingest_batch(benchmark, dataset, bench_owner, count_queries, batch):
+    _, quiz, _ = dataset
+    attempt = QuizAttempt.objects.create(quiz=quiz, student=bench_owner)
+    client = Client()
+    client.force_login(bench_owner)
+    url = reverse('api_attempt_proctoring', args=[attempt.id])
+    now = int(timezone.now().timestamp() * 1000)
+    body = json.dumps({'events': [
+        {'type': ('copy', 'paste', 'context_menu')[i % 3], 'at': now + i, 'count': 1} for i in range(batch)
+    ]})
+
+    def ingest():
+        response = client.post(url, body, content_type='application/json')
+        assert response.status_code == 200
+        return response
+
+    count_queries(benchmark, ingest)
+    benchmark.pedantic(ingest, rounds=ROUNDS, iterations=1)
+    benchmark.extra_info['batch'] = batch
+    # No stats under --benchmark-disable
+    if benchmark.stats:
+        benchmark.extra_info['events_per_second'] = round(batch / benchmark.stats.stats.mean)
@@ -0,0 +1,44 @@
+"""
+Question-bank search (quiz/question_search.py): rebuilding the index and
+reading the first and the last page of a query every question matches.
+The last page starts from a cursor, so it should cost about the same as
+the first.
+"""
+import os
+
+import pytest
+from django.db import connection
+
+from quiz.question_search import rebuild_index, search_backend, search_questions
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+QUERY = 'synthetic question option'
+
+pytestmark = pytest.mark.django_db
+
+
+def test_rebuild(benchmark, dataset, count_queries):
+    size, _, _ = dataset
+    count_queries(benchmark, rebuild_index)
+    indexed = benchmark.pedantic(rebuild_index, rounds=ROUNDS, iterations=1)
+    benchmark.extra_info.update({'size': size, 'questions': indexed, 'backend': search_backend(connection)})
+
+
+@pytest.mark.parametrize('page', ['first', 'last'])
+def test_search_page(benchmark, dataset, count_queries, page):
+    size, quiz, _ = dataset
+    rebuild_index()
+    cursor = None
+    if page == 'last':
+        # Walk to the cursor of the last page
+        found = search_questions(QUERY, quiz_ids=[quiz.id])
+        while found.next_cursor:
+            cursor = found.next_cursor
+            found = search_questions(QUERY, quiz_ids=[quiz.id], cursor=cursor)
+
+    def search():
+        return search_questions(QUERY, quiz_ids=[quiz.id], cursor=cursor)
+
+    count_queries(benchmark, search)
+    benchmark.pedantic(search, rounds=ROUNDS, iterations=10)
+    benchmark.extra_info.update({'size': size, 'page': page, 'backend': search_backend(connection)})
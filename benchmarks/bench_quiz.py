@@ -0,0 +1,109 @@
+"""
+Wall time and query count for the hot paths of the quiz app: grading,
+analytics, CSV export, CSV import and question serialization.
+"""
+import os
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.urls import reverse
+
+from quiz.models import QuizAttempt
+from quiz.views import _serialize_question
+
+from .factories import make_quiz, questions_csv
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+
+pytestmark = pytest.mark.django_db
+
+
+def _client(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def _record_size(benchmark, size):
+    benchmark.extra_info.update({
+        'questions': size.questions,
+        'options': size.options,
+        'attempts': size.attempts,
+    })
+
+
+def test_calculate_score(benchmark, dataset, count_queries):
+    size, quiz, attempt_ids = dataset
+    _record_size(benchmark, size)
+    attempt = QuizAttempt.objects.get(id=attempt_ids[0])
+
+    count_queries(benchmark, attempt.calculate_score)
+    benchmark.pedantic(attempt.calculate_score, rounds=ROUNDS, iterations=1)
+
+
+def test_quiz_analytics(benchmark, dataset, bench_owner, count_queries):
+    size, quiz, _ = dataset
+    _record_size(benchmark, size)
+    client = _client(bench_owner)
+    url = reverse('quiz_analytics', args=[quiz.id])
+
+    def render():
+        response = client.get(url)
+        assert response.status_code == 200
+
+    count_queries(benchmark, render)
+    benchmark.pedantic(render, rounds=ROUNDS, iterations=1)
+
+
+def test_export_quiz_analytics(benchmark, dataset, bench_owner, count_queries):
+    size, quiz, _ = dataset
+    _record_size(benchmark, size)
+    client = _client(bench_owner)
+    url = reverse('export_quiz_analytics', args=[quiz.id])
+
+    def export():
+        response = client.get(url)
+        assert response.status_code == 200
+        return response.content
+
+    count_queries(benchmark, export)
+    benchmark.pedantic(export, rounds=ROUNDS, iterations=1)
+
+
+def test_serialize_question(benchmark, dataset, count_queries):
+    size, quiz, _ = dataset
+    _record_size(benchmark, size)
+
+    def serialize():
+        return [
+            _serialize_question(q, include_options=True, shuffle_seed=q.id)
+            for q in quiz.questions.all()
+        ]
+
+    count_queries(benchmark, serialize)
+    benchmark.pedantic(serialize, rounds=ROUNDS, iterations=1)
+
+
+def test_import_questions_csv(benchmark, dataset, bench_owner, count_queries):
+    size, _, _ = dataset
+    _record_size(benchmark, size)
+    client = _client(bench_owner)
+    payload = questions_csv(size.questions, size.options).encode('utf-8')
+    counter = iter(range(10_000))
+
+    def setup():
+        n = next(counter)
+        quiz = make_quiz(bench_owner, f'Import {size.name} {n}', f'import-{size.name}-{n}')
+        upload = SimpleUploadedFile('questions.csv', payload, content_type='text/csv')
+        return (quiz, upload), {}
+
+    def import_csv(quiz, upload):
+        url = reverse('import_questions_csv', args=[quiz.id])
+        response = client.post(url, {'csv_file': upload})
+        assert response.status_code == 302
+        assert quiz.questions.count() == size.questions
+
+    args, _ = setup()
+    count_queries(benchmark, import_csv, *args)
+    benchmark.pedantic(import_csv, setup=setup, rounds=ROUNDS, iterations=1)
@@ -0,0 +1,30 @@
+"""
+Regrading every completed attempt of a quiz (quiz/regrade.py) as a dry
+run, so each round does the same work, in row form and packed.
+"""
+import os
+
+import pytest
+
+from quiz.regrade import QuizRegrade
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+
+pytestmark = pytest.mark.django_db
+
+
+def _regrade(quiz):
+    job = QuizRegrade(quiz, dry_run=True)
+    for _ in job.run():
+        pass
+    return job.report
+
+
+@pytest.mark.parametrize('form', ['rows', 'packed'])
+def test_regrade_quiz(benchmark, dataset, packed_dataset, count_queries, form):
+    size, quiz, _ = dataset if form == 'rows' else packed_dataset
+
+    count_queries(benchmark, _regrade, quiz)
+    report = benchmark.pedantic(_regrade, args=(quiz,), rounds=ROUNDS, iterations=1)
+    assert report.attempts == size.attempts
+    benchmark.extra_info.update({'questions': size.questions, 'attempts': size.attempts})
@@ -0,0 +1,62 @@
+"""
+Cold-start cost of a worker: importing the settings module and the WSGI
+application (which runs django.setup()) in a fresh interpreter.
+
+Gunicorn recycles workers every ``max_requests`` requests and Kubernetes starts
+new pods on every rollout or scale-up, so this runs far more often than once
+per deploy. The benchmark time includes interpreter startup; ``import_ms`` in
+the saved JSON is the import alone, as measured inside the child process.
+Settings must import without network calls or output, which the benchmark
+also asserts.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '3'))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+sys.stdout.write(json.dumps({{"import_ms": elapsed * 1000, "modules": len(sys.modules)}}))
+'''
+
+TARGETS = [
+    ('quizapp.settings.production', 'quizapp.settings.production'),
+    ('quizapp.settings.dev', 'quizapp.settings.dev'),
+    ('quizapp.wsgi', 'quizapp.settings.production'),
+]
+
+
+def _import_in_child(module, settings_module):
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=settings_module,
+        DJANGO_SECRET_KEY='bench',
+        SECRETS_PROVIDERS='env',
+    )
+    env.pop('USE_SECRET_MANAGER', None)
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT.format(module=module)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    # Anything else on stdout would be an import-time print
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize('module, settings_module', TARGETS, ids=[t[0] for t in TARGETS])
+def test_cold_import(benchmark, module, settings_module):
+    samples = []
+
+    def run():
+        samples.append(_import_in_child(module, settings_module))
+
+    benchmark.pedantic(run, rounds=ROUNDS, iterations=1, warmup_rounds=1)
+    benchmark.extra_info['import_ms'] = round(min(s['import_ms'] for s in samples), 1)
+    benchmark.extra_info['modules'] = samples[-1]['modules']
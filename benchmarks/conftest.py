@@ -0,0 +1,59 @@
+import random
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from quiz.models import QuizAttempt
+from quiz.packing import compact_attempt, current_answer_key
+
+from .factories import build_dataset, make_attempts, make_questions, make_quiz, selected_sizes
+
+
+@pytest.fixture(scope='session')
+def bench_owner(django_db_setup, django_db_blocker):
+    """Superuser that owns every benchmark quiz and drives the admin views"""
+    with django_db_blocker.unblock():
+        user, _ = User.objects.get_or_create(
+            username='bench-owner',
+            defaults={'email': 'bench-owner@example.com', 'is_staff': True, 'is_superuser': True},
+        )
+        return user
+
+
+@pytest.fixture(scope='session', params=selected_sizes(), ids=lambda size: size.name)
+def dataset(request, bench_owner, django_db_blocker):
+    """A populated quiz for one dataset tier, built once per session"""
+    with django_db_blocker.unblock():
+        quiz, attempt_ids = build_dataset(request.param, bench_owner)
+    return request.param, quiz, attempt_ids
+
+
+@pytest.fixture(scope='session')
+def packed_dataset(dataset, bench_owner, django_db_blocker):
+    """A copy of ``dataset`` whose attempts are all packed"""
+    size, _, _ = dataset
+    with django_db_blocker.unblock():
+        rng = random.Random(0)
+        quiz = make_quiz(bench_owner, f'Packed {size.name}', f'packed-{size.name}')
+        questions = make_questions(quiz, size.questions, size.options, rng)
+        attempt_ids = make_attempts(quiz, questions, size.attempts, rng)
+        key = current_answer_key(quiz)
+        for attempt in QuizAttempt.objects.filter(id__in=attempt_ids):
+            compact_attempt(attempt, key)
+    return size, quiz, attempt_ids
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Return a helper that runs ``func`` once and reports how many queries it
+    issued. The number is stored in the benchmark JSON via ``extra_info``.
+    """
+    def run(benchmark, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            func(*args, **kwargs)
+        benchmark.extra_info['queries'] = len(ctx.captured_queries)
+        return len(ctx.captured_queries)
+    return run
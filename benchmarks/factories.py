@@ -0,0 +1,214 @@
+"""
+Synthetic data generators for the benchmark suite.
+
+Datasets are built with bulk_create so that even the large tier (500
+questions x 10 options x 10,000 attempts) can be generated in a reasonable
+time. Tiers are chosen with the BENCH_SIZES environment variable, e.g.
+``BENCH_SIZES=small,medium,large``.
+"""
+import os
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from wagtail.models import Page
+
+from home.models import HomePage
+from quiz.models import Quiz, Question, AnswerOption, QuizAttempt, StudentAnswer
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    name: str
+    questions: int
+    options: int
+    attempts: int
+
+
+SIZES = {
+    'small': DatasetSize('small', questions=10, options=4, attempts=100),
+    'medium': DatasetSize('medium', questions=100, options=6, attempts=1000),
+    'large': DatasetSize('large', questions=500, options=10, attempts=10000),
+}
+
+DEFAULT_SIZES = 'small'
+
+QUESTION_TYPES = ['single', 'multiple', 'true_false']
+
+
+def selected_sizes():
+    """Return the dataset tiers requested through BENCH_SIZES"""
+    names = os.getenv('BENCH_SIZES', DEFAULT_SIZES).split(',')
+    return [SIZES[name.strip()] for name in names if name.strip()]
+
+
+def get_home_page():
+    """Return the HomePage quizzes are created under, creating it if needed"""
+    home_page = HomePage.objects.first()
+    if not home_page:
+        root = Page.get_first_root_node()
+        home_page = HomePage(title='Home', slug='home')
+        root.add_child(instance=home_page)
+    return home_page
+
+
+def make_quiz(owner, title, slug, **fields):
+    """Create and publish an empty quiz owned by ``owner``"""
+    quiz = Quiz(
+        title=title,
+        slug=slug,
+        created_by=owner,
+        owner=owner,
+        duration_minutes=60,
+        max_attempts=10000,
+        **fields,
+    )
+    get_home_page().add_child(instance=quiz)
+    quiz.save_revision().publish()
+    return quiz
+
+
+def make_questions(quiz, n_questions, n_options, rng):
+    """Attach ``n_questions`` questions with ``n_options`` options each"""
+    questions = Question.objects.bulk_create([
+        Question(
+            quiz=quiz,
+            question_text=f'<p>Synthetic question {i + 1}</p>',
+            question_type=QUESTION_TYPES[i % len(QUESTION_TYPES)],
+            marks=rng.randint(1, 5),
+            sort_order=i,
+        )
+        for i in range(n_questions)
+    ])
+
+    options = []
+    for question in questions:
+        count = 2 if question.question_type == 'true_false' else n_options
+        if question.question_type == 'multiple':
+            correct = set(rng.sample(range(count), k=rng.randint(1, max(1, count // 2))))
+        else:
+            correct = {rng.randrange(count)}
+        options.extend(
+            AnswerOption(
+                question=question,
+                option_text=f'Option {j + 1}',
+                is_correct=j in correct,
+                sort_order=j,
+            )
+            for j in range(count)
+        )
+    AnswerOption.objects.bulk_create(options, batch_size=5000)
+    return list(quiz.questions.all())
+
+
+def make_attempts(quiz, questions, n_attempts, rng):
+    """
+    Create ``n_attempts`` completed attempts spread over ``n_attempts // 2``
+    students, each answering every question.
+    """
+    n_students = max(1, n_attempts // 2)
+    prefix = f'bench-{quiz.id}'
+    User.objects.bulk_create([
+        User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com', password='!')
+        for i in range(n_students)
+    ], batch_size=5000)
+    students = list(User.objects.filter(username__startswith=f'{prefix}-').order_by('id'))
+
+    now = timezone.now()
+    attempts = QuizAttempt.objects.bulk_create([
+        QuizAttempt(
+            quiz=quiz,
+            student=students[i % n_students],
+            is_completed=True,
+        )
+        for i in range(n_attempts)
+    ], batch_size=5000)
+    attempt_starts = dict(
+        QuizAttempt.objects.filter(quiz=quiz).order_by('id').values_list('id', 'start_time')
+    )
+    attempt_ids = list(attempt_starts)
+
+    option_ids = {
+        q.id: list(q.options.values_list('id', 'is_correct'))
+        for q in questions
+    }
+    total_marks = sum(q.marks for q in questions) or 1
+
+    answers = []
+    outcomes = {}
+    for attempt_id in attempt_ids:
+        earned = 0
+        for question in questions:
+            choices = option_ids[question.id]
+            if question.question_type == 'multiple':
+                picked = rng.sample(choices, k=rng.randint(1, len(choices)))
+            else:
+                picked = [rng.choice(choices)]
+            correct_ids = {oid for oid, ok in choices if ok}
+            is_correct = {oid for oid, _ in picked} == correct_ids
+            if is_correct:
+                earned += question.marks
+            answers.append((
+                StudentAnswer(
+                    attempt_id=attempt_id,
+                    attempt_start_time=attempt_starts[attempt_id],
+                    question=question,
+                    is_correct=is_correct,
+                ),
+                [oid for oid, _ in picked],
+            ))
+        outcomes[attempt_id] = earned
+
+    StudentAnswer.objects.bulk_create([a for a, _ in answers], batch_size=5000)
+    Through = StudentAnswer.selected_options.through
+    Through.objects.bulk_create([
+        Through(
+            studentanswer_id=answer.id,
+            answeroption_id=oid,
+            attempt_start_time=answer.attempt_start_time,
+        )
+        for answer, picked in answers
+        for oid in picked
+    ], batch_size=10000)
+
+    updated = []
+    for attempt_id, earned in outcomes.items():
+        percentage = round(earned / total_marks * 100, 2)
+        updated.append(QuizAttempt(
+            id=attempt_id,
+            score=earned,
+            percentage=percentage,
+            is_passed=percentage >= quiz.pass_percentage,
+            end_time=now - timedelta(seconds=rng.randint(60, 3600)),
+        ))
+    QuizAttempt.objects.bulk_update(
+        updated, ['score', 'percentage', 'is_passed', 'end_time'], batch_size=5000
+    )
+    return attempt_ids
+
+
+def build_dataset(size, owner, seed=0):
+    """Build a published quiz populated according to ``size``"""
+    rng = random.Random(seed)
+    quiz = make_quiz(owner, f'Benchmark {size.name}', f'benchmark-{size.name}')
+    questions = make_questions(quiz, size.questions, size.options, rng)
+    attempt_ids = make_attempts(quiz, questions, size.attempts, rng)
+    return quiz, attempt_ids
+
+
+def questions_csv(n_questions, n_options, seed=0):
+    """Return CSV text in the format accepted by import_questions_csv"""
+    rng = random.Random(seed)
+    header = ['question_text', 'question_type', 'marks', 'explanation']
+    for i in range(1, n_options + 1):
+        header += [f'option_{i}', f'option_{i}_correct']
+    rows = [','.join(header)]
+    for n in range(n_questions):
+        correct = rng.randrange(n_options)
+        row = [f'Imported question {n + 1}', 'single', str(rng.randint(1, 5)), '']
+        for i in range(n_options):
+            row += [f'Choice {i + 1}', 'true' if i == correct else 'false']
+        rows.append(','.join(row))
+    return '\n'.join(rows) + '\n'
@@ -1,19 +1,41 @@
-import multiprocessing
+import os
+import sys
 
 # Gunicorn configuration file
 # https://docs.gunicorn.org/en/stable/configure.html#configuration-file
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from quizapp import workers as worker_sizing  # noqa: E402
+
+# Worker model sized from the pod's cgroup CPU quota and memory limit.
+# Run `python -m quizapp.workers` to print it without starting the server.
+worker_model = worker_sizing.compute()
+
 # The socket to bind
-bind = "0.0.0.0:8000"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 
 # The number of worker processes for handling requests
-workers = multiprocessing.cpu_count() * 2 + 1
+workers = worker_model.workers
 
-# The type of workers to use
-worker_class = "gthread"
+# The application and type of workers to use. GUNICORN_ASGI=1 serves the ASGI
+# entry point with uvicorn workers, so the async attempt status/time views
+# wait on the database without holding a thread; otherwise the WSGI entry
+# point runs on threaded workers. The exam page's event stream
+# (api_attempt_events) is only served under ASGI; with WSGI the page falls
+# back to polling the attempt status.
+if os.getenv("GUNICORN_ASGI"):
+    wsgi_app = "quizapp.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "quizapp.wsgi:application"
+    worker_class = "gthread"
 
 # The number of worker threads for handling requests
-threads = 8
+threads = worker_model.threads
+
+# Load the application once in the master so workers share its memory
+# copy-on-write and recycled workers start without re-importing Django
+preload_app = True
 
 # The maximum number of pending connections
 backlog = 4096
@@ -39,3 +61,16 @@ loglevel = "info"
 
 # Process name
 proc_name = "quizapp_gunicorn"
+
+
+def when_ready(server):
+    server.log.info(
+        "Worker model: %s workers x %s threads (cpu=%s, memory=%sMB, source=%s, recycle above %sMB)",
+        worker_model.workers, worker_model.threads, worker_model.cpu_limit,
+        worker_model.memory_limit_mb, worker_model.source, worker_model.max_worker_memory_mb,
+    )
+
+
+def post_request(worker, req, environ, resp):
+    # Retire a worker gracefully before it pushes the pod into the OOM killer
+    worker_sizing.recycle_if_oversized(worker, worker_model.max_worker_memory_mb)
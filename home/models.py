@@ -2,6 +2,8 @@ from django.db import models
 
 from wagtail.models import Page
 
+from quizapp.page_cache import CachedPageMixin
 
-class HomePage(Page):
+
+class HomePage(CachedPageMixin, Page):
     pass
@@ -1,4 +1,5 @@
 from locust import HttpUser, task, between, LoadTestShape
+import os
 import time
 import csv
 from statistics import mean
@@ -24,6 +25,38 @@ class StudentUser(HttpUser):
             pass
 
 
+# Login stampede: a class of students logging in at the start of an exam.
+# Provision the accounts first, then run only this user class, e.g.
+#   LOCUST_STUDENT_COUNT=500 locust -f locust.py StudentLoginUser
+# Divide the sustained RPS by the pods' CPU limit to get logins per core.
+STUDENT_EMAIL = os.getenv("LOCUST_STUDENT_EMAIL", "student{n}@example.com")
+STUDENT_PASSWORD = os.getenv("LOCUST_STUDENT_PASSWORD", "password123")
+STUDENT_COUNT = int(os.getenv("LOCUST_STUDENT_COUNT", "500"))
+_student_numbers = iter(range(1_000_000_000))
+
+
+class StudentLoginUser(HttpUser):
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        self.email = STUDENT_EMAIL.format(n=next(_student_numbers) % STUDENT_COUNT + 1)
+
+    @task
+    def login(self):
+        self.client.cookies.clear()
+        self.client.get("/quiz/login/", name="/quiz/login/ [form]")
+        token = self.client.cookies.get("csrftoken", "")
+        with self.client.post(
+            "/quiz/login/",
+            data={"email": self.email, "password": STUDENT_PASSWORD, "csrfmiddlewaretoken": token},
+            headers={"Referer": self.client.base_url + "/quiz/login/"},
+            allow_redirects=False,
+            catch_response=True,
+        ) as response:
+            if response.status_code != 302:
+                response.failure(f"login failed for {self.email}: {response.status_code}")
+
+
 # Controls concurrency rise (0 → 500 users smoothly)
 class StepLoadShape(LoadTestShape):
     stages = [
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import QuizAttempt, StudentAnswer
+from .models import QuizAttempt, StudentAnswer, StudentAnswerSelection
 
 
 # Django Admin for Quiz Attempts
@@ -15,6 +15,18 @@ class QuizAttemptAdmin(admin.ModelAdmin):
         return False
 
 
+class StudentAnswerSelectionInline(admin.TabularInline):
+    model = StudentAnswerSelection
+    fields = ('answeroption',)
+    readonly_fields = ('answeroption',)
+    extra = 0
+    can_delete = False
+    verbose_name = "Selected option"
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 # Django Admin for Student Answers
 @admin.register(StudentAnswer)
 class StudentAnswerAdmin(admin.ModelAdmin):
@@ -22,6 +34,7 @@ class StudentAnswerAdmin(admin.ModelAdmin):
     list_filter = ('is_correct',)
     search_fields = ('attempt__student__username', 'question__question_text')
     readonly_fields = ('attempt', 'question', 'is_correct')
+    inlines = [StudentAnswerSelectionInline]
     
     def has_add_permission(self, request):
         return False
@@ -0,0 +1,295 @@
+"""
+Archiving old attempts out of the hot tables.
+
+``archive_quiz`` takes the completed attempts of a quiz that ended before a
+cutoff and:
+
+  1. packs any that still have answer rows (quiz/packing.py)
+  2. writes them to ``attempt-archives/quiz-<id>/<cutoff>.npz`` on the
+     default storage (the media directory locally, GCS in production) as
+     compressed NumPy columns, one array per attempt field plus each
+     attempt's total marks, the packed answers and the answer key layouts
+     they refer to
+  3. records an AttemptArchive with quiz-level rollups and an
+     ArchivedStudentSummary per student
+  4. deletes the attempts in batches
+
+From step 3 on, ``QuizAttempt.objects.unarchived(quiz)`` leaves those
+attempts out, and the analytics view adds ``archived_rollup(quiz)`` instead,
+so figures stay the same while the deletes run and after. A later archive
+of the same quiz covers attempts between the two cutoffs.
+"""
+import datetime
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import availability
+from .leaderboard import reset_leaderboard
+from .models import AnswerKey, ArchivedStudentSummary, AttemptArchive, QuizAttempt
+from .packing import compact_attempt, current_answer_key, question_totals
+
+ARCHIVE_DIR = 'attempt-archives'
+DELETE_BATCH_SIZE = 1000
+
+# Lower bounds of the score ranges on the analytics page
+SCORE_RANGE_STARTS = [0, 20, 40, 60, 80]
+
+COLUMNS = [
+    'id', 'student_id', 'start_time', 'end_time', 'score', 'percentage',
+    'is_passed', 'answer_key_id', 'packed_answers',
+]
+
+
+def score_range(percentage):
+    """Index of the analytics score range ``percentage`` falls in"""
+    return max(i for i, start in enumerate(SCORE_RANGE_STARTS) if percentage >= start)
+
+
+@dataclass
+class StudentRollup:
+    """One student's attempts at a quiz, summarised"""
+    student_id: int
+    attempts: int = 0
+    percentage_sum: float = 0
+    best_percentage: Decimal = None
+    best_end_time: datetime.datetime = None
+    best_passed: bool = False
+    first_start_time: datetime.datetime = None
+    first_percentage: Decimal = None
+    latest_start_time: datetime.datetime = None
+    latest_percentage: Decimal = None
+
+    @classmethod
+    def from_summary(cls, summary):
+        return cls(**{
+            name: getattr(summary, name)
+            for name in cls.__dataclass_fields__
+        })
+
+    def add(self, percentage, passed, start_time, end_time):
+        end_time = end_time or start_time
+        self.merge(StudentRollup(
+            student_id=self.student_id,
+            attempts=1,
+            percentage_sum=float(percentage),
+            best_percentage=percentage,
+            best_end_time=end_time,
+            best_passed=passed,
+            first_start_time=start_time,
+            first_percentage=percentage,
+            latest_start_time=start_time,
+            latest_percentage=percentage,
+        ))
+
+    def merge(self, other):
+        if not self.attempts:
+            self.__dict__.update(other.__dict__)
+            return
+        self.attempts += other.attempts
+        self.percentage_sum += other.percentage_sum
+        # Higher score wins; on a tie, the earlier submission
+        if (other.best_percentage, self.best_end_time) > (self.best_percentage, other.best_end_time):
+            self.best_percentage = other.best_percentage
+            self.best_end_time = other.best_end_time
+            self.best_passed = other.best_passed
+        if other.first_start_time < self.first_start_time:
+            self.first_start_time = other.first_start_time
+            self.first_percentage = other.first_percentage
+        if other.latest_start_time > self.latest_start_time:
+            self.latest_start_time = other.latest_start_time
+            self.latest_percentage = other.latest_percentage
+
+    @property
+    def avg_percentage(self):
+        return self.percentage_sum / self.attempts if self.attempts else 0
+
+    @property
+    def improvement(self):
+        return self.latest_percentage - self.first_percentage if self.attempts > 1 else 0
+
+
+@dataclass
+class QuizRollup:
+    """Attempts of a quiz, summarised: the sum of its archives"""
+    attempt_count: int = 0
+    passed_count: int = 0
+    percentage_sum: float = 0
+    duration_seconds_sum: float = 0
+    score_distribution: list = field(default_factory=lambda: [0] * len(SCORE_RANGE_STARTS))
+    question_totals: dict = field(default_factory=dict)
+    students: dict = field(default_factory=dict)
+
+
+def archived_rollup(quiz):
+    """Everything archived for ``quiz``, as a QuizRollup"""
+    rollup = QuizRollup()
+    for archive in quiz.attempt_archives.all():
+        rollup.attempt_count += archive.attempt_count
+        rollup.passed_count += archive.passed_count
+        rollup.percentage_sum += archive.percentage_sum
+        rollup.duration_seconds_sum += archive.duration_seconds_sum
+        for i, count in enumerate(archive.score_distribution):
+            rollup.score_distribution[i] += count
+        for question_id, (answered, correct) in archive.question_totals.items():
+            previous = rollup.question_totals.get(int(question_id), (0, 0))
+            rollup.question_totals[int(question_id)] = (previous[0] + answered, previous[1] + correct)
+    if rollup.attempt_count:
+        for summary in ArchivedStudentSummary.objects.filter(archive__quiz=quiz):
+            student = rollup.students.setdefault(summary.student_id, StudentRollup(summary.student_id))
+            student.merge(StudentRollup.from_summary(summary))
+    return rollup
+
+
+def _microseconds(value):
+    return round(value.timestamp() * 1_000_000)
+
+
+def _from_microseconds(value):
+    return datetime.datetime.fromtimestamp(value / 1_000_000, tz=datetime.timezone.utc)
+
+
+def write_archive_file(quiz, cutoff, rows, total_marks):
+    """
+    Save ``rows`` (tuples in COLUMNS order) as compressed columns, with
+    ``total_marks`` (one per row, the marks of each attempt's paper);
+    returns the storage name
+    """
+    columns = dict(zip(COLUMNS, zip(*rows))) if rows else {name: () for name in COLUMNS}
+    packed = [bytes(blob) for blob in columns['packed_answers']]
+    key_ids = sorted(set(columns['answer_key_id']))
+    layouts = {str(key.id): key.layout for key in AnswerKey.objects.filter(id__in=key_ids)}
+
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        id=np.array(columns['id'], dtype=np.int64),
+        student_id=np.array(columns['student_id'], dtype=np.int64),
+        start_time=np.array([_microseconds(t) for t in columns['start_time']], dtype=np.int64),
+        end_time=np.array([_microseconds(t) for t in columns['end_time']], dtype=np.int64),
+        score=np.array([float(s) if s is not None else np.nan for s in columns['score']]),
+        percentage=np.array([float(p or 0) for p in columns['percentage']]),
+        is_passed=np.array(columns['is_passed'], dtype=bool),
+        answer_key_id=np.array(columns['answer_key_id'], dtype=np.int64),
+        total_marks=np.array(total_marks, dtype=np.int64),
+        packed_answers=np.frombuffer(b''.join(packed), dtype=np.uint8),
+        packed_offsets=np.cumsum([0] + [len(blob) for blob in packed], dtype=np.int64),
+        answer_keys=np.array(json.dumps(layouts)),
+    )
+    name = f'{ARCHIVE_DIR}/quiz-{quiz.id}/{cutoff:%Y%m%dT%H%M%S}.npz'
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def read_archive_file(archive):
+    """The columns of an archive file as a dict of arrays"""
+    with default_storage.open(archive.file, 'rb') as f:
+        with np.load(io.BytesIO(f.read())) as data:
+            return {name: data[name] for name in data.files}
+
+
+def archived_attempts(archive):
+    """
+    Yield the archived attempts of ``archive`` as dicts, newest first.
+    ``total_marks`` is None in archives written before it was stored.
+    """
+    columns = read_archive_file(archive)
+    total_marks = columns.get('total_marks')
+    for i in np.argsort(-columns['start_time'], kind='stable'):
+        score = columns['score'][i]
+        yield {
+            'id': int(columns['id'][i]),
+            'student_id': int(columns['student_id'][i]),
+            'start_time': _from_microseconds(int(columns['start_time'][i])),
+            'end_time': _from_microseconds(int(columns['end_time'][i])),
+            'score': None if np.isnan(score) else Decimal(str(score)),
+            'percentage': Decimal(str(columns['percentage'][i])),
+            'is_passed': bool(columns['is_passed'][i]),
+            'total_marks': None if total_marks is None else int(total_marks[i]),
+        }
+
+
+def _pending_attempts(quiz, cutoff):
+    return QuizAttempt.objects.filter(quiz=quiz, is_completed=True, end_time__lt=cutoff)
+
+
+def archive_quiz(quiz, cutoff, batch_size=DELETE_BATCH_SIZE):
+    """
+    Archive the completed attempts of ``quiz`` that ended before ``cutoff``
+    and are not in an earlier archive. Returns the AttemptArchive, or None
+    if there was nothing to archive.
+    """
+    previous = quiz.attempt_archives.aggregate(cutoff=Max('cutoff'))['cutoff']
+    if previous is not None and cutoff <= previous:
+        return None
+    attempts = _pending_attempts(quiz, cutoff).order_by('id')
+    if previous is not None:
+        attempts = attempts.filter(end_time__gte=previous)
+    if not attempts.exists():
+        return None
+
+    key = None
+    for attempt in attempts.filter(packed_answers__isnull=True):
+        key = key or current_answer_key(quiz)
+        compact_attempt(attempt, key)
+
+    rows = list(attempts.values_list(*COLUMNS))
+    students = {}
+    archive = AttemptArchive(quiz=quiz, cutoff=cutoff, attempt_count=len(rows))
+    archive.score_distribution = [0] * len(SCORE_RANGE_STARTS)
+    for _, student_id, start_time, end_time, _, percentage, is_passed, _, _ in rows:
+        percentage = percentage or Decimal(0)
+        archive.passed_count += is_passed
+        archive.percentage_sum += float(percentage)
+        archive.duration_seconds_sum += (end_time - start_time).total_seconds()
+        archive.score_distribution[score_range(percentage)] += 1
+        student = students.setdefault(student_id, StudentRollup(student_id))
+        student.add(percentage, is_passed, start_time, end_time)
+    archive.question_totals = {
+        str(question_id): list(counts)
+        for question_id, counts in question_totals(quiz, attempts).items()
+    }
+    # Attempts drawn from question pools have their own paper's total
+    papers = dict(attempts.filter(paper__isnull=False).values_list('id', 'paper__total_marks'))
+    quiz_total_marks = quiz.get_total_marks() if len(papers) < len(rows) else None
+    total_marks = [papers.get(row[0], quiz_total_marks) for row in rows]
+    archive.file = write_archive_file(quiz, cutoff, rows, total_marks)
+
+    with transaction.atomic():
+        archive.save()
+        ArchivedStudentSummary.objects.bulk_create([
+            ArchivedStudentSummary(
+                archive=archive,
+                **{name: getattr(rollup, name) for name in StudentRollup.__dataclass_fields__},
+            )
+            for rollup in students.values()
+        ])
+
+    # The quiz list takes attempts before the new cutoff from the archive
+    availability.invalidate()
+
+    delete_archived_attempts(archive, batch_size)
+    reset_leaderboard(quiz)
+    return archive
+
+
+def delete_archived_attempts(archive, batch_size=DELETE_BATCH_SIZE):
+    """Delete the attempts rolled up into ``archive``, ``batch_size`` at a time"""
+    attempts = _pending_attempts(archive.quiz, archive.cutoff)
+    deleted = 0
+    while True:
+        ids = list(attempts.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        QuizAttempt.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    archive.deleted_at = timezone.now()
+    archive.save(update_fields=['deleted_at'])
+    return deleted
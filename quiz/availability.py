@@ -0,0 +1,141 @@
+"""
+The quizzes students can take right now, for the quiz list.
+
+Which quizzes are open only changes when a quiz is published, unpublished
+or archived, or when the clock passes one of their ``start_date`` /
+``end_date`` boundaries. So ``available_quizzes`` caches snapshots of the
+open quizzes until the next boundary of any live quiz. The snapshot list is
+stored with the moment it stops being valid, so quizzes open and close
+on time even where the cache backend rounds timeouts to whole seconds.
+The signals in quiz/signals.py drop it when quizzes change. That reaches
+every worker only with a shared cache (Redis in production); with a
+process-local one the list is kept for a few seconds at most
+(quizapp/caching.py).
+
+With the list cached, the quiz list costs a cache read and one query for
+the student's own attempts (plus one for archived ones, if any of the
+quizzes has been archived).
+"""
+import datetime
+import math
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from quizapp.caching import invalidated_timeout
+
+from .models import ArchivedStudentSummary, Quiz, QuizAttempt
+
+CACHE_KEY = 'quiz:available'
+# Re-read at least this often (seconds), boundary or not
+MAX_TIMEOUT = 24 * 60 * 60
+
+# Quizzes stay open through their end date, so they close just after it
+CLOSE_DELAY = datetime.timedelta(microseconds=1)
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    """The fields of a live, active quiz the quiz list shows"""
+    id: int
+    title: str
+    # The quiz's page URL
+    url: str
+    description: str
+    duration_minutes: int
+    pass_percentage: int
+    max_attempts: int
+    start_date: datetime.datetime = None
+    end_date: datetime.datetime = None
+    # Latest archive cutoff; attempts that ended before it are counted from the archive
+    archive_cutoff: datetime.datetime = None
+
+    def is_available(self, now):
+        """Like Quiz.is_available, at ``now``"""
+        if self.start_date and now < self.start_date:
+            return False
+        if self.end_date and now > self.end_date:
+            return False
+        return True
+
+    def can_attempt(self, attempts_count):
+        """Like Quiz.can_attempt, for a student with ``attempts_count`` attempts"""
+        if attempts_count >= self.max_attempts:
+            return False, f"Maximum attempts ({self.max_attempts}) reached"
+        return True, "You can attempt this quiz"
+
+
+def quiz_snapshots():
+    """QuizSnapshots of every live, active quiz, in page order"""
+    quizzes = (
+        Quiz.objects.live().filter(is_active=True)
+        .annotate(archive_cutoff=Max('attempt_archives__cutoff'))
+    )
+    return [
+        QuizSnapshot(
+            quiz.id, quiz.title, quiz.get_detail_url(), quiz.description,
+            quiz.duration_minutes, quiz.pass_percentage, quiz.max_attempts, quiz.start_date, quiz.end_date,
+            quiz.archive_cutoff,
+        )
+        for quiz in quizzes
+    ]
+
+
+def next_boundary(snapshots, now):
+    """The first moment after ``now`` at which one of ``snapshots`` opens or closes, or None"""
+    boundaries = [s.start_date for s in snapshots if s.start_date and s.start_date > now]
+    boundaries += [s.end_date + CLOSE_DELAY for s in snapshots if s.end_date and s.end_date >= now]
+    return min(boundaries, default=None)
+
+
+def available_quizzes(now=None):
+    """QuizSnapshots of the quizzes open at ``now`` (default: the current time)"""
+    now = now or timezone.now()
+    cached = cache.get(CACHE_KEY)
+    if cached is not None:
+        valid_until, available = cached
+        if valid_until is None or now < valid_until:
+            return available
+
+    snapshots = quiz_snapshots()
+    valid_until = next_boundary(snapshots, now)
+    available = [snapshot for snapshot in snapshots if snapshot.is_available(now)]
+    timeout = invalidated_timeout(MAX_TIMEOUT)
+    if valid_until is not None:
+        timeout = min(timeout, max(1, math.ceil((valid_until - now).total_seconds())))
+    cache.set(CACHE_KEY, (valid_until, available), timeout)
+    return available
+
+
+def invalidate():
+    """Drop the cached list now and again once the current transaction commits"""
+    cache.delete(CACHE_KEY)
+    # A request in between may have cached the list from before the change
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+def attempt_counts(user, snapshots):
+    """``{quiz_id: attempts}`` of ``user`` on each of ``snapshots``, archived attempts included"""
+    cutoffs = {snapshot.id: snapshot.archive_cutoff for snapshot in snapshots}
+    counts = dict.fromkeys(cutoffs, 0)
+    if not cutoffs:
+        return counts
+    rows = QuizAttempt.objects.filter(student=user, quiz_id__in=cutoffs).values_list('quiz_id', 'is_completed', 'end_time')
+    for quiz_id, is_completed, end_time in rows:
+        cutoff = cutoffs[quiz_id]
+        # Same rule as QuizAttemptQuerySet.unarchived
+        if not (cutoff and is_completed and end_time is not None and end_time < cutoff):
+            counts[quiz_id] += 1
+
+    archived = [quiz_id for quiz_id, cutoff in cutoffs.items() if cutoff]
+    if archived:
+        totals = (
+            ArchivedStudentSummary.objects.filter(archive__quiz_id__in=archived, student=user)
+            .values_list('archive__quiz_id').annotate(total=Sum('attempts'))
+        )
+        for quiz_id, total in totals:
+            counts[quiz_id] += total or 0
+    return counts
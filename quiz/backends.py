@@ -0,0 +1,76 @@
+"""
+Email login for students and teachers.
+
+``student_login`` used to look the user up with ``email=...`` (an unindexed,
+non-unique column) and then call ``authenticate`` with the username, which
+fetched the same row a second time. EmailBackend does a single lookup on
+``lower(email)``, served by the unique functional index added in
+``quiz/migrations/0007``, and verifies the password once.
+
+Password verification is CPU bound. When a whole class logs in at the same
+minute, letting every gunicorn thread hash at once only makes each login
+slower and starves other requests, so the number of concurrent verifications
+per process is capped by ``LOGIN_HASH_CONCURRENCY``.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import F, Lookup
+from django.db.models.functions import Lower
+
+_hash_slots = threading.BoundedSemaphore(getattr(settings, 'LOGIN_HASH_CONCURRENCY', 2))
+
+
+class NotEqual(Lookup):
+    """
+    ``lhs <> rhs``. The lower(email) index only covers ``email <> ''``, and
+    the planner only uses it when the query repeats that condition;
+    ``exclude(email='')`` compiles to ``NOT (email = '')``, which it does not
+    recognise.
+    """
+    lookup_name = 'ne'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} <> {rhs}', (*lhs_params, *rhs_params)
+
+
+def non_blank_email():
+    """Filter matching the condition of the lower(email) index"""
+    return NotEqual(F('email'), '')
+
+
+def users_with_email(email):
+    """Case-insensitive email lookup that can use the lower(email) index"""
+    UserModel = get_user_model()
+    email = (email or '').strip().lower()
+    if not email:
+        return UserModel._default_manager.none()
+    return UserModel._default_manager.alias(email_lower=Lower('email')).filter(
+        non_blank_email(), email_lower=email,
+    )
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate with ``email`` and ``password``"""
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+
+        user = users_with_email(email).first()
+
+        with _hash_slots:
+            if user is None:
+                # Run the hasher anyway so a missing account takes as long to
+                # reject as a wrong password (see ModelBackend.authenticate)
+                get_user_model()().set_password(password)
+                return None
+            # check_password rehashes and saves the password when the stored
+            # hash was made with an outdated hasher or parameters
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+        return None
@@ -0,0 +1,288 @@
+"""
+Finding pairs of attempts whose answers look copied from each other.
+
+The completed (unarchived) attempts of a quiz are loaded as a response
+matrix (quiz/item_analysis.py). Two attempts agree on a choice question
+when both were presented it, answered it and picked exactly the same
+options. Agreeing on a right answer is what good students do; agreeing on
+the same wrong one is the sign of copying, so it weighs WRONG_WEIGHT
+times as much. The similarity of a pair is the weighted share of the
+questions both answered on which they agree:
+
+    (both_right + WRONG_WEIGHT * shared_wrong)
+    / (both_right + WRONG_WEIGHT * (both_answered - both_right))
+
+A pair is suspicious when it shares at least MIN_SHARED_WRONG identical
+wrong answers and its similarity is at least THRESHOLD. Attempts by the
+same student are never paired.
+
+Up to EXACT_LIMIT attempts, every pair is scored, a block of rows at a
+time, with matrix products of the attempts' one-hot answer matrices.
+Larger cohorts first find candidate pairs with MinHash signatures of each
+attempt's set of wrong answers and LSH banding, then score only those, so
+the work grows with the number of look-alike pairs rather than n².
+
+Each pair also carries how far apart the two attempts started and ended;
+pairs that were taken side by side (both within TIME_WINDOW) are listed
+first.
+
+The analytics page does not run the detection for a large cohort:
+``collusion_report(quiz)`` returns the last report stored for the quiz,
+with the time it was computed, and only recomputes it in the request while
+the quiz has at most INLINE_LIMIT completed attempts. Larger reports are
+refreshed by the ``detect_collusion`` command (k8s/detect-collusion-cronjob.yaml),
+so submissions during a live exam do not make every page view rerun it.
+Reports are kept in the cache, so the command only reaches the web workers
+through a shared one (quizapp/caching.py).
+"""
+import datetime
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .item_analysis import analysis_cache_key, response_matrix
+from .models import QuizAttempt
+from .packing import quiz_layout
+
+CHOICE_TYPES = ('single', 'multiple', 'true_false')
+
+WRONG_WEIGHT = 4
+MIN_SHARED_WRONG = 2
+THRESHOLD = 0.75
+TIME_WINDOW = datetime.timedelta(minutes=5)
+MAX_PAIRS = 200
+
+EXACT_LIMIT = 6000
+# Cohorts up to this size are re-checked in the analytics request
+INLINE_LIMIT = 500
+REPORT_TIMEOUT = 7 * 24 * 60 * 60
+BLOCK_SIZE = 1024
+
+# MinHash signature length and LSH bands; a pair whose wrong-answer sets have
+# Jaccard similarity s becomes a candidate with probability 1 - (1 - s^ROWS)^BANDS
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+# Buckets bigger than this hold a wrong answer many students share, not a copy
+MAX_BUCKET = 2000
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+@dataclass
+class SuspiciousPair:
+    attempt_ids: tuple
+    student_ids: tuple
+    similarity: float
+    shared_wrong: int
+    both_answered: int
+    start_gap: datetime.timedelta
+    end_gap: datetime.timedelta
+
+    @property
+    def together(self):
+        """Whether the two attempts were taken side by side"""
+        return self.start_gap <= TIME_WINDOW and self.end_gap <= TIME_WINDOW
+
+
+@dataclass
+class CollusionReport:
+    attempts: int = 0
+    # 'exact' or 'minhash'
+    method: str = 'exact'
+    candidates: int = 0
+    pairs: list = field(default_factory=list)
+    computed_at: datetime.datetime = None
+    # analysis_cache_key of the attempts and answer key it was computed from
+    version: str = ''
+
+
+@dataclass
+class AnswerVectors:
+    """The answers of a response matrix, one-hot encoded per attempt"""
+    answered: np.ndarray  # (n, k) answered a presented choice question
+    right: np.ndarray  # (n, k) and got it right
+    wrong: np.ndarray  # (n, t) picked wrong option set t
+    students: np.ndarray  # (n,) student id of each attempt
+
+
+def answer_vectors(matrix, choice_columns, students):
+    """AnswerVectors of a ResponseMatrix, keeping only ``choice_columns``"""
+    selections = matrix.selections[:, choice_columns]
+    answered = matrix.answered[:, choice_columns] & matrix.presented[:, choice_columns] & (selections != 0)
+    right = answered & matrix.correct[:, choice_columns]
+
+    rows, columns = np.nonzero(answered & ~right)
+    # Every distinct (question, wrong option set) is one token
+    keys = np.stack([columns.astype(np.uint64), selections[rows, columns]])
+    tokens = np.unique(keys, axis=1, return_inverse=True)[1].reshape(-1) if len(rows) else np.zeros(0, dtype=np.int64)
+    wrong = np.zeros((len(selections), tokens.max() + 1 if len(tokens) else 0), dtype=bool)
+    wrong[rows, tokens] = True
+    return AnswerVectors(answered, right, wrong, np.asarray(students))
+
+
+def _similarity(both_right, shared_wrong, both_answered):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        similarity = (both_right + WRONG_WEIGHT * shared_wrong) / (
+            both_right + WRONG_WEIGHT * (both_answered - both_right)
+        )
+    return np.nan_to_num(similarity)
+
+
+def _suspicious(vectors, i, j, both_right, shared_wrong, both_answered):
+    similarity = _similarity(both_right, shared_wrong, both_answered)
+    keep = (
+        (shared_wrong >= MIN_SHARED_WRONG) & (similarity >= THRESHOLD)
+        & (vectors.students[i] != vectors.students[j])
+    )
+    return i[keep], j[keep], similarity[keep], shared_wrong[keep], both_answered[keep]
+
+
+def exact_pairs(vectors):
+    """Score every pair i < j; yields arrays (i, j, similarity, shared_wrong, both_answered) of suspicious ones"""
+    answered = vectors.answered.astype(np.float32)
+    right = vectors.right.astype(np.float32)
+    wrong = vectors.wrong.astype(np.float32)
+    n = len(wrong)
+    for start in range(0, n, BLOCK_SIZE):
+        block = slice(start, min(start + BLOCK_SIZE, n))
+        shared_wrong = wrong[block] @ wrong.T
+        both_right = right[block] @ right.T
+        both_answered = answered[block] @ answered.T
+        similarity = _similarity(both_right, shared_wrong, both_answered)
+        # Only pairs right of the diagonal
+        upper = np.arange(block.start, block.stop)[:, None] < np.arange(n)
+        i, j = np.nonzero(upper & (shared_wrong >= MIN_SHARED_WRONG) & (similarity >= THRESHOLD))
+        yield _suspicious(
+            vectors, i + block.start, j,
+            both_right[i, j].astype(np.int64), shared_wrong[i, j].astype(np.int64), both_answered[i, j].astype(np.int64),
+        )
+
+
+def minhash_signatures(wrong, seed=0):
+    """
+    (NUM_HASHES, m) MinHash signatures of the wrong-answer sets of the m
+    attempts with at least MIN_SHARED_WRONG wrong answers, and those rows
+    """
+    rows, tokens = np.nonzero(wrong)
+    counts = np.bincount(rows, minlength=len(wrong))
+    keep = counts[rows] >= MIN_SHARED_WRONG
+    rows, tokens = rows[keep], tokens[keep].astype(np.int64)
+    if not len(rows):
+        return np.zeros((NUM_HASHES, 0), dtype=np.int64), rows
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, size=(NUM_HASHES, 1), dtype=np.int64)
+    b = rng.integers(0, MERSENNE_PRIME, size=(NUM_HASHES, 1), dtype=np.int64)
+    hashes = (a * tokens + b) % MERSENNE_PRIME
+    members, starts = np.unique(rows, return_index=True)
+    return np.minimum.reduceat(hashes, starts, axis=1), members
+
+
+def lsh_candidates(signatures, members):
+    """Pairs (i, j), i < j, of attempts whose signatures agree on a whole band"""
+    found = []
+    for band in range(BANDS):
+        keys = signatures[band * ROWS:(band + 1) * ROWS].T
+        buckets = np.unique(keys, axis=0, return_inverse=True)[1].reshape(-1)
+        order = np.argsort(buckets, kind='stable')
+        sizes = np.bincount(buckets)
+        bounds = np.concatenate([[0], np.cumsum(sizes)])
+        for bucket in np.flatnonzero((sizes > 1) & (sizes <= MAX_BUCKET)):
+            rows = members[order[bounds[bucket]:bounds[bucket + 1]]]
+            first, second = np.triu_indices(len(rows), 1)
+            found.append(np.stack([rows[first], rows[second]]))
+    if not found:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    pairs = np.unique(np.concatenate(found, axis=1), axis=1)
+    return pairs[0], pairs[1]
+
+
+def minhash_pairs(vectors, chunk_size=50_000):
+    """Like exact_pairs, scoring only the LSH candidates"""
+    i, j = lsh_candidates(*minhash_signatures(vectors.wrong))
+    yield len(i)
+    for start in range(0, len(i), chunk_size):
+        a, b = i[start:start + chunk_size], j[start:start + chunk_size]
+        shared_wrong = (vectors.wrong[a] & vectors.wrong[b]).sum(axis=1)
+        both_right = (vectors.right[a] & vectors.right[b]).sum(axis=1)
+        both_answered = (vectors.answered[a] & vectors.answered[b]).sum(axis=1)
+        yield _suspicious(vectors, a, b, both_right, shared_wrong, both_answered)
+
+
+def detect_collusion(quiz, layout=None, exact_limit=EXACT_LIMIT):
+    """A CollusionReport of the completed attempts of ``quiz``"""
+    layout = layout or quiz_layout(quiz)
+    attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).unarchived(quiz)
+    matrix = response_matrix(quiz, attempts, layout)
+    report = CollusionReport(attempts=len(matrix.attempt_ids))
+    if report.attempts < 2:
+        return report
+
+    types = dict(quiz.questions.values_list('id', 'question_type'))
+    choice_columns = [j for j, question in enumerate(layout) if types.get(question['id']) in CHOICE_TYPES]
+    details = {
+        row[0]: row[1:]
+        for row in attempts.values_list('id', 'student_id', 'start_time', 'end_time').iterator(chunk_size=5000)
+    }
+    attempt_ids = matrix.attempt_ids.tolist()
+    vectors = answer_vectors(matrix, choice_columns, [details[attempt_id][0] for attempt_id in attempt_ids])
+
+    if report.attempts <= exact_limit:
+        found = list(exact_pairs(vectors))
+        report.candidates = report.attempts * (report.attempts - 1) // 2
+    else:
+        report.method = 'minhash'
+        scored = minhash_pairs(vectors)
+        report.candidates = next(scored)
+        found = list(scored)
+
+    for i, j, similarity, shared_wrong, both_answered in found:
+        for a, b, score, shared, common in zip(
+            i.tolist(), j.tolist(), similarity.tolist(), shared_wrong.tolist(), both_answered.tolist(),
+        ):
+            first, second = details[attempt_ids[a]], details[attempt_ids[b]]
+            report.pairs.append(SuspiciousPair(
+                attempt_ids=(attempt_ids[a], attempt_ids[b]),
+                student_ids=(first[0], second[0]),
+                similarity=round(score, 3),
+                shared_wrong=int(shared),
+                both_answered=int(common),
+                start_gap=abs(first[1] - second[1]),
+                end_gap=abs((first[2] or first[1]) - (second[2] or second[1])),
+            ))
+    report.pairs.sort(key=lambda pair: (not pair.together, -pair.similarity, -pair.shared_wrong))
+    del report.pairs[MAX_PAIRS:]
+    return report
+
+
+def report_cache_key(quiz_id):
+    return f'quiz:{quiz_id}:collusion'
+
+
+def refresh_collusion_report(quiz, layout=None, version=None):
+    """Run the detection on ``quiz`` and store the report for the analytics page"""
+    layout = layout or quiz_layout(quiz)
+    # Taken first: attempts submitted while this runs make the report stale
+    version = version or analysis_cache_key(quiz, 'collusion', layout)
+    report = detect_collusion(quiz, layout)
+    report.computed_at = timezone.now()
+    report.version = version
+    cache.set(report_cache_key(quiz.id), report, REPORT_TIMEOUT)
+    return report
+
+
+def collusion_report(quiz):
+    """
+    ``(report, stale)``: the last CollusionReport of ``quiz`` (None if there
+    is none yet) and whether attempts or answers changed since it was computed
+    """
+    layout = quiz_layout(quiz)
+    version = analysis_cache_key(quiz, 'collusion', layout)
+    report = cache.get(report_cache_key(quiz.id))
+    if report is not None and report.version == version:
+        return report, False
+    if QuizAttempt.objects.filter(quiz=quiz, is_completed=True).unarchived(quiz).count() > INLINE_LIMIT:
+        # Too big to run in a request; detect_collusion refreshes it
+        return report, True
+    return refresh_collusion_report(quiz, layout, version), False
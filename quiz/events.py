@@ -0,0 +1,162 @@
+"""
+Attempt event bus used to push timer, forced-submit and result events to the
+exam page over server-sent events instead of having every tab poll.
+
+Events are published from synchronous code (grading, Wagtail signals) and
+consumed by the async SSE view. The backend is configured with the
+``QUIZ_EVENT_BACKEND`` setting, in the same shape as ``CACHES``::
+
+    QUIZ_EVENT_BACKEND = {
+        "BACKEND": "quiz.events.RedisEventBackend",
+        "OPTIONS": {"url": "redis://redis:6379/0"},
+    }
+
+``LocalEventBackend`` (the default) only reaches subscribers in the same
+process; use a cross-pod backend when running more than one worker.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+DEFAULT_EVENT_BACKEND = {
+    'BACKEND': 'quiz.events.LocalEventBackend',
+}
+
+
+def attempt_channel(attempt_id):
+    return f'quiz:attempt:{attempt_id}'
+
+
+class LocalSubscription:
+    def __init__(self, queue):
+        self.queue = queue
+
+    async def get(self, timeout=None):
+        """Return the next message, or None if ``timeout`` seconds pass first"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalEventBackend:
+    """
+    In-process pub/sub. Thread-safe on the publishing side, so grading code
+    running in a worker thread can wake subscribers on the event loop.
+    """
+
+    def __init__(self, **options):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                continue
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            yield LocalSubscription(entry[1])
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+
+class RedisEventBackend:
+    """Cross-pod pub/sub over Redis channels (requires the ``redis`` package)"""
+
+    def __init__(self, url='redis://localhost:6379/0', **options):
+        import redis
+        import redis.asyncio
+
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+        self._async_module = redis.asyncio
+
+    def publish(self, channel, message):
+        self._client.publish(channel, json.dumps(message))
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        client = self._async_module.Redis.from_url(self._url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            yield RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_event_backend():
+    """Return the configured event backend, creating it on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'QUIZ_EVENT_BACKEND', DEFAULT_EVENT_BACKEND)
+                backend_class = import_string(config['BACKEND'])
+                _backend = backend_class(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def publish_attempt_event(attempt_id, event, data=None):
+    """Publish ``event`` to the attempt's subscribers once the transaction commits"""
+    message = {'event': event, 'data': data or {}}
+    # Best effort: a failed publish is logged, and the page's status polling
+    # still sees the change, so it must not fail the request that made it
+    transaction.on_commit(
+        lambda: get_event_backend().publish(attempt_channel(attempt_id), message),
+        robust=True,
+    )
+
+
+def completion_data(attempt):
+    """Payload of the ``completed`` event, honouring show_results_immediately"""
+    data = {
+        'redirect_url': reverse('quiz_result', args=[attempt.id]),
+        'score': None,
+        'percentage': None,
+        'passed': None,
+    }
+    if attempt.quiz.show_results_immediately:
+        data.update({
+            'score': float(attempt.score or 0),
+            'percentage': float(attempt.percentage or 0),
+            'passed': attempt.is_passed,
+        })
+    return data
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.forms import UserCreationForm
 from .models import StudentProfile
+from .backends import users_with_email
 
 
 class StudentRegistrationForm(UserCreationForm):
@@ -18,7 +19,7 @@ class StudentRegistrationForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
+        if users_with_email(email).exists():
             raise forms.ValidationError('This email address is already registered.')
         return email
 
@@ -57,7 +58,7 @@ class TeacherRegistrationForm(UserCreationForm):
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
+        if users_with_email(email).exists():
             raise forms.ValidationError('This email address is already registered.')
         return email
 
@@ -0,0 +1,167 @@
+"""
+Automatic grading of short answers.
+
+A short-answer question is correct when the student's text matches any of
+the question's AcceptedAnswers. Each accepted answer is a ``Rule``:
+
+    exact    the normalised text equals the answer
+    numeric  the text is a number within ``tolerance`` of the answer
+    regex    the pattern matches the whole normalised text
+    fuzzy    the normalised text is at most ``max_edits`` insertions,
+             deletions or substitutions away from the answer
+
+Normalising applies Unicode NFKC, trims the text and collapses runs of
+whitespace to one space (or drops whitespace entirely with
+``ignore_spaces``), and folds case unless the rule is ``case_sensitive``.
+
+``grader_for(question)`` returns a Grader with the rules compiled (patterns,
+parsed numbers, normalised answers). Graders are cached by their rules, so
+editing a question's accepted answers picks up a new one. ``grade_many``
+grades a whole column of answers at once: each distinct text is normalised
+and checked once, numbers are compared as one array, and only texts no
+cheaper rule accepted go on to the regex and edit-distance checks.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+MATCH_TYPES = [
+    ('exact', 'Exact text'),
+    ('numeric', 'Number'),
+    ('regex', 'Regular expression'),
+    ('fuzzy', 'Close spelling'),
+]
+
+Rule = namedtuple('Rule', ['match_type', 'answer', 'case_sensitive', 'ignore_spaces', 'tolerance', 'max_edits'])
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text, case_sensitive=False, ignore_spaces=False):
+    text = WHITESPACE.sub('' if ignore_spaces else ' ', unicodedata.normalize('NFKC', text or '')).strip()
+    return text if case_sensitive else text.casefold()
+
+
+def parse_number(text):
+    """``text`` as a float, or None; accepts thousands separators like 1,000"""
+    try:
+        return float(text.replace(',', '').replace(' ', ''))
+    except ValueError:
+        return None
+
+
+def rule_error(rule):
+    """Why ``rule`` cannot be used, or None"""
+    if rule.match_type == 'numeric' and parse_number(rule.answer) is None:
+        return f'{rule.answer!r} is not a number'
+    if rule.match_type == 'regex':
+        try:
+            re.compile(rule.answer)
+        except re.error as e:
+            return f'Invalid regular expression: {e}'
+    return None
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class Grader:
+    """The accepted answers of one question, compiled"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        # Rules grouped by how they normalise text: {(case_sensitive, ignore_spaces): ...}
+        self.exact = {}
+        self.numbers = []
+        self.patterns = {}
+        self.fuzzy = {}
+        for rule in rules:
+            if rule_error(rule):
+                continue
+            policy = (rule.case_sensitive, rule.ignore_spaces)
+            if rule.match_type == 'numeric':
+                self.numbers.append((parse_number(rule.answer), rule.tolerance or 0))
+            elif rule.match_type == 'regex':
+                flags = 0 if rule.case_sensitive else re.IGNORECASE
+                self.patterns.setdefault(policy, []).append(re.compile(rule.answer, flags))
+            elif rule.match_type == 'fuzzy':
+                self.fuzzy.setdefault(policy, []).append((normalize(rule.answer, *policy), rule.max_edits))
+            else:
+                self.exact.setdefault(policy, set()).add(normalize(rule.answer, *policy))
+
+    def grade(self, text):
+        return bool(self.grade_many([text])[0])
+
+    def grade_many(self, texts):
+        """A boolean array: whether each of ``texts`` is accepted"""
+        texts = [text or '' for text in texts]
+        if not texts or not self.rules:
+            return np.zeros(len(texts), dtype=bool)
+        # Not np.unique: its fixed-width string array pads every answer to the longest
+        unique = list(dict.fromkeys(texts))
+        index = {text: i for i, text in enumerate(unique)}
+        inverse = np.fromiter((index[text] for text in texts), dtype=np.intp, count=len(texts))
+        accepted = np.zeros(len(unique), dtype=bool)
+
+        normalized = {}
+
+        def column(policy):
+            if policy not in normalized:
+                normalized[policy] = [normalize(text, *policy) for text in unique]
+            return normalized[policy]
+
+        for policy, answers in self.exact.items():
+            accepted |= np.fromiter((text in answers for text in column(policy)), dtype=bool, count=len(unique))
+
+        if self.numbers:
+            values = np.array([
+                np.nan if (number := parse_number(text)) is None else number
+                for text in column((False, True))
+            ])
+            targets, tolerances = np.array(self.numbers).T
+            with np.errstate(invalid='ignore'):
+                accepted |= (np.abs(values[:, None] - targets) <= tolerances).any(axis=1)
+
+        for policy, patterns in self.patterns.items():
+            texts = column(policy)
+            for i in np.flatnonzero(~accepted):
+                accepted[i] = any(pattern.fullmatch(texts[i]) for pattern in patterns)
+
+        for policy, answers in self.fuzzy.items():
+            texts = column(policy)
+            for i in np.flatnonzero(~accepted):
+                accepted[i] = any(edit_distance(texts[i], answer, limit) <= limit for answer, limit in answers)
+
+        return accepted[inverse]
+
+
+@lru_cache(maxsize=1024)
+def compile_rules(rules):
+    return Grader(rules)
+
+
+def question_rules(question):
+    return tuple(
+        Rule(a.match_type, a.answer, a.case_sensitive, a.ignore_spaces, a.tolerance, a.max_edits)
+        for a in question.accepted_answers.all()
+    )
+
+
+def grader_for(question):
+    """The compiled Grader for ``question``'s accepted answers"""
+    return compile_rules(question_rules(question))
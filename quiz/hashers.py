@@ -0,0 +1,46 @@
+"""
+Password hashers selectable through ``PASSWORD_HASHER_POLICY``.
+
+The policy's hasher is listed first in ``PASSWORD_HASHERS`` (settings/base.py)
+and the rest stay listed, so existing hashes keep verifying and Django rehashes
+a password with the preferred hasher and parameters the next time its user
+logs in. Measure a policy before deploying it with
+``python -m pytest benchmarks -k hasher``.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from the
+    ``PASSWORD_HASH_ITERATIONS`` setting. It keeps the ``pbkdf2_sha256``
+    algorithm name, so hashes made by Django's default hasher verify with it
+    and are upgraded on login whenever the iteration count differs.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+
+def hash_passwords(passwords, workers=1, chunksize=32):
+    """
+    Yield ``make_password(p)`` for each password, in order, hashing in a pool
+    of ``workers`` processes when more than one is requested.
+
+    Processes spread the work across cores whichever hasher is configured.
+    The pool uses the spawn start method so it is safe to start from a
+    threaded web worker; the children only need settings, which they load
+    from DJANGO_SETTINGS_MODULE.
+    """
+    if workers <= 1:
+        yield from map(make_password, passwords)
+        return
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        yield from pool.map(make_password, passwords, chunksize=chunksize)
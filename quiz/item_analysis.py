@@ -0,0 +1,285 @@
+"""
+Classical item analysis of a quiz's questions.
+
+``response_matrix`` loads the completed (unarchived) attempts of a quiz as
+NumPy arrays with one row per attempt and one column per question of the
+current answer key (quiz/packing.py): whether the question was on the
+attempt's paper (quiz/papers.py), answered and answered correctly, and the
+options picked as a bitmap. Packed attempts are decoded in bulk per answer
+key and row-form ones are read with one query for answers and one for
+selections.
+
+``item_statistics`` then works on whole columns at a time, counting for
+each question only the attempts it was presented to:
+
+    difficulty      share of attempts that got the question right (p)
+    discrimination  p in the top 27% of attempts by total score minus p in
+                    the bottom 27%
+    point_biserial  correlation between getting the question right and the
+                    total score on the other questions
+    options         how many attempts picked each option (the distractors
+                    are the incorrect ones)
+    reliability     Cronbach's alpha over mark-weighted question scores,
+                    which is KR-20 when every question has the same marks;
+                    only when every attempt was presented every question
+
+Total scores are taken as a share of each attempt's paper, so attempts that
+drew different questions from a pool rank on the same scale.
+
+``item_analysis(quiz)`` caches the result per quiz and answer key version
+(the digest of the current questions and options), keyed as well on a
+signature of the completed attempts so new submissions and regrades are
+picked up.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+
+from .models import AnswerKey, AttemptPaper, QuizAttempt, StudentAnswer, StudentAnswerSelection
+from .packing import ANSWERED, CORRECT, decode_many, layout_digest, quiz_layout
+
+# Share of attempts in each of the upper and lower groups for discrimination
+GROUP_SHARE = 0.27
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+@dataclass
+class ResponseMatrix:
+    attempt_ids: np.ndarray
+    answered: np.ndarray
+    correct: np.ndarray
+    selections: np.ndarray
+    presented: np.ndarray = None
+
+    def __post_init__(self):
+        if self.presented is None:
+            self.presented = np.ones(self.correct.shape, dtype=bool)
+
+
+@dataclass
+class ItemAnalysis:
+    attempts: int = 0
+    reliability: float = None
+    # {question_id: {'difficulty', 'discrimination', 'point_biserial', 'options'}}
+    items: dict = field(default_factory=dict)
+
+
+def _empty_matrix(rows, columns):
+    return ResponseMatrix(
+        attempt_ids=np.zeros(rows, dtype=np.int64),
+        answered=np.zeros((rows, columns), dtype=bool),
+        correct=np.zeros((rows, columns), dtype=bool),
+        selections=np.zeros((rows, columns), dtype=np.uint64),
+        presented=np.ones((rows, columns), dtype=bool),
+    )
+
+
+def _remap(layout, key_layout):
+    """For each question of ``key_layout``: its column in ``layout`` and its option bits there"""
+    columns = {question['id']: j for j, question in enumerate(layout)}
+    remap = []
+    for question in key_layout:
+        j = columns.get(question['id'])
+        if j is None:
+            remap.append(None)
+            continue
+        bits = {option_id: bit for bit, option_id in enumerate(layout[j]['options'])}
+        remap.append((j, [bits.get(option_id) for option_id in question['options']]))
+    return remap
+
+
+def _lookup(keys, values):
+    """The index in ``keys`` of each of ``values``, or -1 where it is not there"""
+    if not len(keys):
+        return np.full(len(values), -1)
+    order = np.argsort(keys)
+    found = order[np.searchsorted(keys, values, sorter=order).clip(max=len(keys) - 1)]
+    return np.where(keys[found] == values, found, -1)
+
+
+def response_matrix(quiz, attempts, layout):
+    """The answers of ``attempts`` (completed attempts of ``quiz``) against ``layout``"""
+    packed = attempts.filter(packed_answers__isnull=False).order_by()
+    row_ids = np.array(
+        sorted(attempts.filter(packed_answers__isnull=True).values_list('id', flat=True)), dtype=np.int64
+    )
+    keys = list(AnswerKey.objects.filter(pk__in=packed.values('answer_key')))
+    blocks = []
+    for key in keys:
+        rows = packed.filter(answer_key=key).values_list('id', 'packed_answers')
+        ids, blobs = zip(*rows.iterator(chunk_size=2000)) if rows.exists() else ((), ())
+        blocks.append((key, ids, blobs))
+
+    total = len(row_ids) + sum(len(ids) for _, ids, _ in blocks)
+    matrix = _empty_matrix(total, len(layout))
+    start = 0
+    for key, ids, blobs in blocks:
+        stop = start + len(ids)
+        matrix.attempt_ids[start:stop] = ids
+        selections, flags = decode_many(blobs, key.layout)
+        selections = selections.astype(np.uint64)
+        for i, target in enumerate(_remap(layout, key.layout)):
+            if target is None:
+                continue
+            j, bits = target
+            matrix.answered[start:stop, j] = flags[:, i] & ANSWERED != 0
+            matrix.correct[start:stop, j] = flags[:, i] & CORRECT != 0
+            for old_bit, bit in enumerate(bits):
+                if bit is not None:
+                    picked = (selections[:, i] >> np.uint64(old_bit)) & np.uint64(1)
+                    matrix.selections[start:stop, j] |= picked << np.uint64(bit)
+        start = stop
+
+    if len(row_ids):
+        matrix.attempt_ids[start:] = row_ids
+        question_ids = np.array([question['id'] for question in layout], dtype=np.int64)
+        answers = (
+            StudentAnswer.objects.for_quiz(quiz)
+            .filter(attempt__in=attempts.filter(packed_answers__isnull=True))
+        )
+        values = np.array(list(answers.values_list('attempt_id', 'question_id', 'is_correct')), dtype=np.int64)
+        if len(values):
+            rows = start + _lookup(row_ids, values[:, 0])
+            columns = _lookup(question_ids, values[:, 1])
+            known = columns >= 0
+            matrix.answered[rows[known], columns[known]] = True
+            matrix.correct[rows[known], columns[known]] = values[known, 2].astype(bool)
+
+        values = np.array(list(
+            StudentAnswerSelection.objects.filter(studentanswer__in=answers)
+            .values_list('studentanswer__attempt_id', 'studentanswer__question_id', 'answeroption_id')
+        ), dtype=np.int64)
+        if len(values):
+            option_ids = np.array([o for question in layout for o in question['options']], dtype=np.int64)
+            option_bits = np.array([bit for question in layout for bit in range(len(question['options']))])
+            rows = start + _lookup(row_ids, values[:, 0])
+            columns = _lookup(question_ids, values[:, 1])
+            options = _lookup(option_ids, values[:, 2])
+            known = (columns >= 0) & (options >= 0)
+            np.bitwise_or.at(
+                matrix.selections, (rows[known], columns[known]),
+                np.left_shift(np.uint64(1), option_bits[options[known]].astype(np.uint64)),
+            )
+
+    # Attempts with a paper were presented only its questions; older ones all of them
+    papers = list(AttemptPaper.objects.filter(attempt__in=attempts.order_by()).values_list('attempt_id', 'question_ids'))
+    if papers:
+        question_ids = np.array([question['id'] for question in layout], dtype=np.int64)
+        rows = _lookup(matrix.attempt_ids, np.array([attempt_id for attempt_id, _ in papers], dtype=np.int64))
+        matrix.presented[rows] = False
+        values = np.array([i for _, ids in papers for i in ids], dtype=np.int64)
+        rows = np.repeat(rows, [len(ids) for _, ids in papers])
+        columns = _lookup(question_ids, values)
+        known = columns >= 0
+        matrix.presented[rows[known], columns[known]] = True
+    return matrix
+
+
+def _masked_mean(values, mask):
+    """Column means of ``values`` over the rows ``mask`` selects; NaN where it selects none"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values * mask).sum(axis=0) / mask.sum(axis=0)
+
+
+def _correlations(x, y, mask):
+    """Column-wise Pearson correlation of two (n, k) arrays over the rows ``mask`` selects; NaN where either is constant"""
+    x = (x - _masked_mean(x, mask)) * mask
+    y = (y - _masked_mean(y, mask)) * mask
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (x * y).sum(axis=0) / np.sqrt((x * x).sum(axis=0) * (y * y).sum(axis=0))
+
+
+def _value(number):
+    return None if np.isnan(number) else round(float(number), 3)
+
+
+def item_statistics(matrix, layout, marks):
+    """Item statistics of a ResponseMatrix; ``marks`` lists each question's marks in layout order"""
+    n, k = matrix.correct.shape
+    analysis = ItemAnalysis(attempts=n)
+    if not n or not k:
+        return analysis
+
+    marks = np.asarray(marks, dtype=float)
+    presented = matrix.presented
+    correct = (matrix.correct & presented).astype(float)
+    scores = correct * marks
+    totals = scores.sum(axis=1)
+    possible = presented @ marks
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shares = np.where(possible > 0, totals / possible, 0)
+        rest = (totals[:, None] - scores) / (possible[:, None] - marks)
+
+    difficulty = _masked_mean(correct, presented)
+
+    discrimination = np.full(k, np.nan)
+    if n >= 2:
+        group = max(1, int(round(n * GROUP_SHARE)))
+        ranked = np.argsort(shares, kind='stable')
+        upper, lower = ranked[-group:], ranked[:group]
+        discrimination = (
+            _masked_mean(correct[upper], presented[upper]) - _masked_mean(correct[lower], presented[lower])
+        )
+
+    point_biserial = _correlations(correct, np.nan_to_num(rest), presented)
+
+    if n >= 2 and k >= 2 and presented.all() and totals.var(ddof=1) > 0:
+        analysis.reliability = round(
+            float(k / (k - 1) * (1 - scores.var(axis=0, ddof=1).sum() / totals.var(ddof=1))), 3
+        )
+
+    for j, question in enumerate(layout):
+        column = matrix.selections[:, j]
+        analysis.items[question['id']] = {
+            'difficulty': _value(difficulty[j]),
+            'discrimination': _value(discrimination[j]),
+            'point_biserial': _value(point_biserial[j]),
+            'options': [
+                {
+                    'option_id': option_id,
+                    'count': int(np.count_nonzero((column >> np.uint64(bit)) & np.uint64(1))),
+                    'is_correct': option_id in question['correct'],
+                }
+                for bit, option_id in enumerate(question['options'])
+            ],
+        }
+    return analysis
+
+
+def compute_item_analysis(quiz, layout=None):
+    layout = layout or quiz_layout(quiz)
+    attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).unarchived(quiz)
+    marks = dict(quiz.questions.values_list('id', 'marks'))
+    matrix = response_matrix(quiz, attempts, layout)
+    return item_statistics(matrix, layout, [marks.get(question['id'], 1) for question in layout])
+
+
+def analysis_cache_key(quiz, name, layout):
+    """
+    Cache key for the analysis ``name`` of ``quiz``'s completed attempts
+    against ``layout``. It names the answer key version by its digest, so
+    this never has to create an AnswerKey (analytics reads from the
+    replica), and changes with new submissions and regrades.
+    """
+    signature = (
+        QuizAttempt.objects.filter(quiz=quiz, is_completed=True).unarchived(quiz)
+        .aggregate(count=Count('id'), last=Max('id'), scores=Sum('score'))
+    )
+    return (
+        f'quiz:{quiz.id}:{name}:{layout_digest(layout)[:16]}:'
+        f'{signature["count"]}:{signature["last"]}:{signature["scores"]}'
+    )
+
+
+def item_analysis(quiz):
+    """Cached item analysis of ``quiz`` against its questions as they are now"""
+    layout = quiz_layout(quiz)
+    cache_key = analysis_cache_key(quiz, 'item-analysis', layout)
+    analysis = cache.get(cache_key)
+    if analysis is None:
+        analysis = compute_item_analysis(quiz, layout)
+        cache.set(cache_key, analysis, CACHE_TIMEOUT)
+    return analysis
@@ -0,0 +1,336 @@
+"""
+Per-quiz leaderboards: each student's best completed attempt, ranked by
+percentage with ties going to the earlier submission.
+
+A leaderboard is a sorted set of students scored with ``entry_score``,
+which packs the percentage and the end time into one integer so that a
+higher score is always the better entry. It is kept up to date as attempts
+are graded (``record_attempt``, called by ``QuizAttempt.calculate_score``
+once the transaction commits) instead of being re-sorted on every request:
+an update is O(log n) in Redis (a binary search and a list insert in
+memory), and the top k or one student's rank are read in O(log n + k).
+Regrading and archiving change past results, so they drop
+the quiz's leaderboard (``reset_leaderboard``) and the next read rebuilds
+it from the attempts still held in full, like the analytics page does.
+
+The backend is configured with the ``QUIZ_LEADERBOARD_BACKEND`` setting,
+in the same shape as ``CACHES``::
+
+    QUIZ_LEADERBOARD_BACKEND = {
+        "BACKEND": "quiz.leaderboard.RedisLeaderboardBackend",
+        "OPTIONS": {"url": "redis://redis:6379/0"},
+    }
+
+``LocalLeaderboardBackend`` (the default) keeps the sets in process
+memory, so each worker holds its own copy and only sees the attempts it
+graded itself; its boards are rebuilt every ``timeout`` seconds to pick up
+the rest. Use Redis when running more than one worker.
+"""
+import datetime
+import threading
+import time
+import uuid
+from bisect import bisect_left, insort
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_LEADERBOARD_BACKEND = {
+    'BACKEND': 'quiz.leaderboard.LocalLeaderboardBackend',
+}
+
+# Low bits of an entry score: the end time, reversed so earlier is higher
+TIME_BITS = 32
+TIME_MASK = (1 << TIME_BITS) - 1
+
+LeaderboardEntry = namedtuple('LeaderboardEntry', ['rank', 'student_id', 'attempt_id', 'percentage', 'end_time'])
+
+
+def leaderboard_key(quiz_id):
+    return f'quiz:{quiz_id}:leaderboard'
+
+
+def entry_score(percentage, end_time):
+    """
+    One integer ordering attempts like the leaderboard: higher percentage
+    first, then earlier end time (to the second). It stays below 2**53, so
+    it is exact as a Redis score.
+    """
+    hundredths = int(Decimal(percentage or 0).quantize(Decimal('0.01')) * 100)
+    return (hundredths << TIME_BITS) | (TIME_MASK - int(end_time.timestamp()))
+
+
+def decode_score(score):
+    """``(percentage, end_time)`` of an entry score"""
+    score = int(score)
+    percentage = Decimal(score >> TIME_BITS) / 100
+    end_time = datetime.datetime.fromtimestamp(TIME_MASK - (score & TIME_MASK), tz=datetime.timezone.utc)
+    return percentage, end_time
+
+
+class _SortedSet:
+    """Members kept sorted by descending score (then member) in a list, with a score index"""
+
+    def __init__(self):
+        self.order = []
+        self.scores = {}
+        self.attempts = {}
+
+    def add(self, member, attempt_id, score):
+        """Enter ``member`` unless it is already there with a score at least as high"""
+        old = self.scores.get(member)
+        if old is not None:
+            if old >= score:
+                return False
+            del self.order[bisect_left(self.order, (-old, member))]
+        insort(self.order, (-score, member))
+        self.scores[member] = score
+        self.attempts[member] = attempt_id
+        return True
+
+    def rank(self, member):
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return bisect_left(self.order, (-score, member)), self.attempts[member], score
+
+
+class LocalLeaderboardBackend:
+    """In-process sorted sets, dropped ``timeout`` seconds after they were built; thread-safe"""
+
+    def __init__(self, timeout=60, **options):
+        self._sets = {}
+        self._built = {}
+        self._timeout = timeout
+        self._lock = threading.Lock()
+
+    def exists(self, key):
+        with self._lock:
+            if key in self._sets and time.monotonic() - self._built[key] >= self._timeout:
+                del self._sets[key]
+            return key in self._sets
+
+    def replace(self, key, entries):
+        board = _SortedSet()
+        for member, attempt_id, score in entries:
+            board.add(member, attempt_id, score)
+        with self._lock:
+            self._sets[key] = board
+            self._built[key] = time.monotonic()
+
+    def update(self, key, member, attempt_id, score):
+        with self._lock:
+            board = self._sets.get(key)
+            return board.add(member, attempt_id, score) if board is not None else False
+
+    def top(self, key, k):
+        with self._lock:
+            board = self._sets.get(key)
+            if board is None:
+                return []
+            return [(member, board.attempts[member], -score) for score, member in board.order[:k]]
+
+    def rank(self, key, member):
+        with self._lock:
+            board = self._sets.get(key)
+            return board.rank(member) if board is not None else None
+
+    def count(self, key):
+        with self._lock:
+            board = self._sets.get(key)
+            return len(board.order) if board is not None else 0
+
+    def delete(self, key):
+        with self._lock:
+            self._sets.pop(key, None)
+
+
+class RedisLeaderboardBackend:
+    """
+    Redis sorted sets (requires the ``redis`` package and Redis 6.2+ for
+    ``ZADD GT``). Each student's attempt id is kept in a hash next to the set.
+
+    Every update is also appended to a short log next to the board. A
+    rebuild writes the new board under a temporary key, then, in one
+    script, renames it into place and replays the log, so an attempt
+    graded while the attempts were being read is not lost until the board
+    expires.
+    """
+
+    # KEYS: board, attempts, log; ARGV: member, attempt id, score, log length, log timeout
+    UPDATE_SCRIPT = """
+        redis.call('RPUSH', KEYS[3], ARGV[1], ARGV[2], ARGV[3])
+        redis.call('LTRIM', KEYS[3], -3 * tonumber(ARGV[4]), -1)
+        redis.call('EXPIRE', KEYS[3], ARGV[5])
+        if redis.call('EXISTS', KEYS[1]) == 0 then
+            return 0
+        end
+        if redis.call('ZADD', KEYS[1], 'GT', 'CH', ARGV[3], ARGV[1]) == 0 then
+            return 0
+        end
+        redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+        return 1
+    """
+
+    # KEYS: board, attempts, new board, new attempts, log; ARGV: board timeout
+    REPLACE_SCRIPT = """
+        redis.call('RENAME', KEYS[3], KEYS[1])
+        if redis.call('EXISTS', KEYS[4]) == 1 then
+            redis.call('RENAME', KEYS[4], KEYS[2])
+        else
+            redis.call('DEL', KEYS[2])
+        end
+        local log = redis.call('LRANGE', KEYS[5], 0, -1)
+        for i = 1, #log - 2, 3 do
+            if redis.call('ZADD', KEYS[1], 'GT', 'CH', log[i + 2], log[i]) == 1 then
+                redis.call('HSET', KEYS[2], log[i], log[i + 1])
+            end
+        end
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+        redis.call('EXPIRE', KEYS[2], ARGV[1])
+        return 1
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', timeout=7 * 24 * 60 * 60,
+                 log_length=1000, log_timeout=10 * 60, **options):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._timeout = timeout
+        # Updates kept for replay; a rebuild must finish within these
+        self._log_length = log_length
+        self._log_timeout = log_timeout
+        self._update = self._client.register_script(self.UPDATE_SCRIPT)
+        self._replace = self._client.register_script(self.REPLACE_SCRIPT)
+
+    def exists(self, key):
+        return bool(self._client.exists(key))
+
+    def replace(self, key, entries):
+        entries = list(entries)
+        new_key = f'{key}:rebuild:{uuid.uuid4().hex}'
+        pipe = self._client.pipeline()
+        if entries:
+            pipe.zadd(new_key, {member: score for member, _, score in entries})
+            pipe.hset(f'{new_key}:attempts', mapping={member: attempt_id for member, attempt_id, _ in entries})
+        else:
+            # An empty board still exists, so it is not rebuilt on every read
+            pipe.zadd(new_key, {'': -1})
+        # Left behind only if this process dies before the rename
+        pipe.expire(new_key, self._log_timeout)
+        pipe.expire(f'{new_key}:attempts', self._log_timeout)
+        pipe.execute()
+        self._replace(
+            keys=[key, f'{key}:attempts', new_key, f'{new_key}:attempts', f'{key}:log'],
+            args=[self._timeout],
+        )
+
+    def update(self, key, member, attempt_id, score):
+        return bool(self._update(
+            keys=[key, f'{key}:attempts', f'{key}:log'],
+            args=[member, attempt_id, score, self._log_length, self._log_timeout],
+        ))
+
+    def top(self, key, k):
+        rows = [(m, s) for m, s in self._client.zrevrange(key, 0, k, withscores=True) if m != b''][:k]
+        attempts = self._client.hmget(f'{key}:attempts', [m for m, _ in rows]) if rows else []
+        return [(int(m), int(a), int(s)) for (m, s), a in zip(rows, attempts)]
+
+    def rank(self, key, member):
+        pipe = self._client.pipeline()
+        pipe.zrevrank(key, member)
+        pipe.zscore(key, member)
+        pipe.hget(f'{key}:attempts', member)
+        rank, score, attempt_id = pipe.execute()
+        return None if rank is None else (rank, int(attempt_id), int(score))
+
+    def count(self, key):
+        return self._client.zcount(key, 0, '+inf')
+
+    def delete(self, key):
+        # The log goes too: its scores may be the ones a regrade just changed
+        self._client.delete(key, f'{key}:attempts', f'{key}:log')
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_leaderboard_backend():
+    """Return the configured leaderboard backend, creating it on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'QUIZ_LEADERBOARD_BACKEND', DEFAULT_LEADERBOARD_BACKEND)
+                backend_class = import_string(config['BACKEND'])
+                _backend = backend_class(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def best_attempts(quiz):
+    """``(student_id, attempt_id, entry_score)`` of each student's best completed attempt"""
+    rows = (
+        quiz.attempts.filter(is_completed=True).unarchived(quiz)
+        .order_by('student_id', '-percentage', 'end_time', 'id')
+        .values_list('student_id', 'id', 'percentage', 'end_time', 'start_time')
+    )
+    previous = None
+    for student_id, attempt_id, percentage, end_time, start_time in rows.iterator(chunk_size=5000):
+        if student_id != previous:
+            previous = student_id
+            yield student_id, attempt_id, entry_score(percentage, end_time or start_time)
+
+
+def rebuild_leaderboard(quiz):
+    get_leaderboard_backend().replace(leaderboard_key(quiz.id), best_attempts(quiz))
+
+
+def _board(quiz):
+    """The quiz's leaderboard key, rebuilding the board first if there is none"""
+    key = leaderboard_key(quiz.id)
+    if not get_leaderboard_backend().exists(key):
+        rebuild_leaderboard(quiz)
+    return key
+
+
+def record_attempt(attempt):
+    """Enter a graded attempt on its quiz's leaderboard once the transaction commits"""
+    def update():
+        score = entry_score(attempt.percentage, attempt.end_time or attempt.start_time)
+        # Without a board this changes nothing: the next read rebuilds it, this
+        # attempt included (Redis also logs it, in case a rebuild is under way)
+        get_leaderboard_backend().update(leaderboard_key(attempt.quiz_id), attempt.student_id, attempt.id, score)
+    # A failed update is only logged: it must not fail the student's submission
+    transaction.on_commit(update, robust=True)
+
+
+def reset_leaderboard(quiz):
+    """Drop the quiz's leaderboard after its past results changed; the next read rebuilds it"""
+    key = leaderboard_key(quiz.id)
+    # Logged rather than raised, so a backend outage cannot abort a regrade or archive
+    transaction.on_commit(lambda: get_leaderboard_backend().delete(key), robust=True)
+
+
+def _entry(rank, student_id, attempt_id, score):
+    return LeaderboardEntry(rank + 1, int(student_id), int(attempt_id), *decode_score(score))
+
+
+def top_entries(quiz, k):
+    """The first ``k`` LeaderboardEntries of ``quiz``"""
+    rows = get_leaderboard_backend().top(_board(quiz), k)
+    return [_entry(rank, *row) for rank, row in enumerate(rows)]
+
+
+def student_rank(quiz, student_id):
+    """The student's LeaderboardEntry on ``quiz``, or None if they have no completed attempt"""
+    found = get_leaderboard_backend().rank(_board(quiz), student_id)
+    return None if found is None else _entry(found[0], student_id, *found[1:])
+
+
+def leaderboard_size(quiz):
+    """Number of students on the quiz's leaderboard"""
+    return get_leaderboard_backend().count(_board(quiz))
@@ -0,0 +1,57 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from quiz import partitioning
+
+
+def parse_month(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+        raise CommandError(f'Expected a month as YYYY-MM, not {value!r}')
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly student answer partitions and detach old ones (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=partitioning.DEFAULT_MONTHS_AHEAD,
+            help='Months to create ahead of the current one',
+        )
+        parser.add_argument(
+            '--detach-before', metavar='YYYY-MM',
+            help='Detach the partitions of every month before this one',
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help='Drop detached partitions instead of keeping them as tables for archiving',
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not partitioning.is_partitioned(connection):
+            self.stdout.write(self.style.WARNING(
+                f'Student answers are not partitioned on this {connection.vendor} database, nothing to do'
+            ))
+            return
+
+        for name in partitioning.ensure_partitions(connection, options['ahead']):
+            self.stdout.write(self.style.SUCCESS(f'✓ Created {name}'))
+
+        if options['detach_before']:
+            before = parse_month(options['detach_before'])
+            detached = partitioning.detach_partitions(connection, before, drop=options['drop'])
+            verb = 'Dropped' if options['drop'] else 'Detached'
+            for name in detached:
+                self.stdout.write(self.style.SUCCESS(f'✓ {verb} {name}'))
+            if not detached:
+                self.stdout.write(f'No partitions before {before:%Y-%m}')
+
+        self.stdout.write(self.style.WARNING('\nCurrent partitions:'))
+        for table in partitioning.TABLES:
+            for name, rows in partitioning.list_partitions(connection, table):
+                self.stdout.write(f'  - {name}: ~{rows} rows')
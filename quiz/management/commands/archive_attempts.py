@@ -0,0 +1,53 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from quiz.archive import DELETE_BATCH_SIZE, archive_quiz, delete_archived_attempts
+from quiz.models import AttemptArchive, Quiz
+
+
+class Command(BaseCommand):
+    help = 'Export completed attempts older than a cutoff to archive files and delete them'
+
+    def add_arguments(self, parser):
+        cutoff = parser.add_mutually_exclusive_group()
+        cutoff.add_argument(
+            '--older-than-days', type=int, default=365,
+            help='Archive attempts completed more than this many days ago (default: 365)',
+        )
+        cutoff.add_argument('--before', metavar='YYYY-MM-DD', help='Archive attempts completed before this date')
+        parser.add_argument('--quiz', type=int, help='Only archive attempts of this quiz id')
+        parser.add_argument('--batch-size', type=int, default=DELETE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = datetime.datetime.strptime(options['before'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError(f'Expected a date as YYYY-MM-DD, not {options["before"]!r}')
+            cutoff = cutoff.replace(tzinfo=datetime.timezone.utc)
+        else:
+            cutoff = timezone.now() - datetime.timedelta(days=options['older_than_days'])
+
+        # Finish deletes an earlier run did not get through
+        for archive in AttemptArchive.objects.filter(deleted_at__isnull=True).select_related('quiz'):
+            deleted = delete_archived_attempts(archive, options['batch_size'])
+            self.stdout.write(f'Deleted {deleted} attempt(s) left over from {archive}')
+
+        quizzes = Quiz.objects.filter(
+            attempts__is_completed=True, attempts__end_time__lt=cutoff
+        ).distinct().order_by('id')
+        if options['quiz']:
+            quizzes = quizzes.filter(id=options['quiz'])
+
+        archived = 0
+        for quiz in quizzes:
+            archive = archive_quiz(quiz, cutoff, options['batch_size'])
+            if archive:
+                archived += archive.attempt_count
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ {quiz.title}: archived {archive.attempt_count} attempt(s) to {archive.file}'
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Archived {archived} attempt(s) before {cutoff:%Y-%m-%d}'))
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from quiz.models import QuizAttempt
+from quiz.packing import PackingError, compact_attempt, current_answer_key
+
+
+class Command(BaseCommand):
+    help = 'Pack the answers of graded attempts and delete their answer rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=60, metavar='MINUTES',
+            help='Only pack attempts completed at least this long ago (default: 60)',
+        )
+        parser.add_argument('--quiz', type=int, help='Only pack attempts of this quiz id')
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Pack at most this many attempts in this run',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        attempts = QuizAttempt.objects.filter(
+            is_completed=True, packed_answers__isnull=True, end_time__lte=cutoff,
+        ).select_related('quiz').order_by('quiz_id', 'id')
+        if options['quiz']:
+            attempts = attempts.filter(quiz_id=options['quiz'])
+        if options['limit']:
+            attempts = attempts[:options['limit']]
+
+        packed = 0
+        keys = {}
+        for attempt in attempts.iterator(chunk_size=500):
+            try:
+                if attempt.quiz_id not in keys:
+                    keys[attempt.quiz_id] = current_answer_key(attempt.quiz)
+                if compact_attempt(attempt, keys[attempt.quiz_id]):
+                    packed += 1
+            except PackingError as e:
+                self.stdout.write(self.style.WARNING(f'Skipped attempt {attempt.id}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Packed {packed} attempt(s)'))
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.collusion import refresh_collusion_report, report_cache_key
+from quiz.item_analysis import analysis_cache_key
+from quiz.models import Quiz
+from quiz.packing import quiz_layout
+
+
+class Command(BaseCommand):
+    help = "Find pairs of a quiz's attempts with suspiciously similar answers and store them for the analytics page"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz', type=int, nargs='?', help='Quiz id')
+        parser.add_argument('--all', action='store_true', help='Refresh every live quiz whose report is out of date')
+        parser.add_argument('--limit', type=int, default=20, help='Pairs to print')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            return self.refresh_all()
+        if options['quiz'] is None:
+            raise CommandError('Give a quiz id or --all')
+        try:
+            quiz = Quiz.objects.get(id=options['quiz'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f'Quiz {options["quiz"]} does not exist')
+
+        report = refresh_collusion_report(quiz)
+
+        self.stdout.write(
+            f'{report.attempts} attempt(s), {report.candidates} pair(s) compared ({report.method})'
+        )
+        for pair in report.pairs[:options['limit']]:
+            together = ' side by side' if pair.together else ''
+            self.stdout.write(
+                f'  attempts {pair.attempt_ids[0]} and {pair.attempt_ids[1]}: '
+                f'{pair.similarity:.0%} similar, {pair.shared_wrong} identical wrong answer(s){together}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✓ Found {len(report.pairs)} suspicious pair(s)'))
+
+    def refresh_all(self):
+        refreshed = 0
+        for quiz in Quiz.objects.live():
+            layout = quiz_layout(quiz)
+            version = analysis_cache_key(quiz, 'collusion', layout)
+            report = cache.get(report_cache_key(quiz.id))
+            if report is not None and report.version == version:
+                continue
+            report = refresh_collusion_report(quiz, layout, version)
+            refreshed += 1
+            self.stdout.write(f'  {quiz.title}: {len(report.pairs)} suspicious pair(s) in {report.attempts} attempt(s)')
+        self.stdout.write(self.style.SUCCESS(f'✓ Refreshed {refreshed} quiz report(s)'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz.roster import BATCH_SIZE, RosterImport, default_workers, read_roster
+
+
+class Command(BaseCommand):
+    help = 'Create student accounts from a CSV roster (email, first_name, last_name, password)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help='Path to the roster CSV file')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Password hashing processes (default: one per available CPU)',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate the roster without creating any accounts',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['roster'], encoding='utf-8-sig') as f:
+                rows, errors = read_roster(f.read())
+        except OSError as e:
+            raise CommandError(f'Cannot read roster: {e}')
+
+        for error in errors:
+            self.stdout.write(self.style.WARNING(error))
+        if not rows:
+            raise CommandError('No valid students in the roster')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(rows)} valid student(s), nothing imported'))
+            return
+
+        workers = options['workers'] or default_workers()
+        self.stdout.write(f'Importing {len(rows)} student(s) with {workers} hashing process(es)')
+
+        job = RosterImport(rows, workers=workers, batch_size=options['batch_size'])
+        for stage, done, total in job.run():
+            self.stdout.write(f'  {stage}: {done}/{total}')
+            self.stdout.flush()
+        result = job.result
+
+        if result.existing:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {len(result.existing)} student(s) that are already registered'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'✓ Created {result.created} student account(s)'))
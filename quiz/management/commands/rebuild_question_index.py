@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from quiz.question_search import CHUNK_SIZE, rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the question bank search entries of every question'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Questions indexed per transaction')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Indexed {indexed} question(s) ({search_backend(connection)} search)'
+        ))
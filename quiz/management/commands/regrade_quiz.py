@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.models import Quiz
+from quiz.regrade import CHUNK_SIZE, QuizRegrade, write_report
+
+
+class Command(BaseCommand):
+    help = "Re-score a quiz's completed attempts against its current answer key, keeping their timestamps"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz', type=int, help='Quiz id')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Attempts per pass')
+        parser.add_argument('--report', metavar='PATH', help='Write the changed outcomes to this CSV file')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would change without saving anything',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(id=options['quiz'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f'Quiz {options["quiz"]} does not exist')
+
+        job = QuizRegrade(quiz, dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+        for stage, done, total in job.run():
+            self.stdout.write(f'  {stage}: {done}/{total}')
+            self.stdout.flush()
+        report = job.report
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as f:
+                write_report(report, f)
+
+        verb = 'Would change' if options['dry_run'] else 'Changed'
+        self.stdout.write(
+            f'{report.attempts} attempt(s) checked, {report.answers_changed} answer(s) regraded; '
+            f'{report.newly_passed} now pass, {report.newly_failed} now fail'
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ {verb} the result of {len(report.changes)} attempt(s)'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from quiz.models import Quiz
+from quiz.regrade import regrade_short_answers
+
+
+class Command(BaseCommand):
+    help = 'Grade the short answers of completed attempts against the current accepted answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help='Only regrade attempts of this quiz id')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report how many answers would change without saving anything',
+        )
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.filter(questions__question_type='short_answer').distinct().order_by('id')
+        if options['quiz']:
+            quizzes = quizzes.filter(id=options['quiz'])
+
+        changed = 0
+        for quiz in quizzes:
+            report = regrade_short_answers(quiz, dry_run=options['dry_run'])
+            changed += report.answers_changed
+            self.stdout.write(
+                f'{quiz.title}: {report.attempts} attempt(s) checked, {report.answers_changed} answer(s) '
+                f'and {len(report.changes)} result(s) changed'
+            )
+
+        verb = 'Would change' if options['dry_run'] else 'Changed'
+        self.stdout.write(self.style.SUCCESS(f'✓ {verb} {changed} short answer(s)'))
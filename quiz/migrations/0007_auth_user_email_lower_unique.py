@@ -0,0 +1,51 @@
+from django.db import migrations
+
+INDEX_NAME = 'quiz_auth_user_email_lower_uniq'
+
+
+def create_email_index(apps, schema_editor):
+    """
+    Unique index on lower(email) for the email login lookup.
+
+    Blank emails (e.g. superusers created without one) are excluded. Both
+    PostgreSQL and SQLite support expression and partial indexes; PostgreSQL
+    builds it CONCURRENTLY so the users table is not locked while it runs.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT LOWER(email) FROM auth_user WHERE email <> '' "
+            "GROUP BY LOWER(email) HAVING COUNT(*) > 1"
+        )
+        duplicates = [row[0] for row in cursor.fetchall()]
+    if duplicates:
+        raise RuntimeError(
+            'Cannot add a unique index on lower(email): these emails belong to '
+            'more than one user: %s' % ', '.join(duplicates)
+        )
+
+    concurrently = 'CONCURRENTLY ' if connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f"CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} "
+        f"ON auth_user (LOWER(email)) WHERE email <> ''"
+    )
+
+
+def drop_email_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('quiz', '0006_alter_quiz_auto_submit_on_violations_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
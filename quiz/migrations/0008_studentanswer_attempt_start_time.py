@@ -0,0 +1,66 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_auth_user_email_lower_unique'),
+    ]
+
+    operations = [
+        # The selected_options table becomes an explicit through model so it
+        # can carry the partition key; the table itself is unchanged
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='StudentAnswerSelection',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('answeroption', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.answeroption')),
+                        ('studentanswer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.studentanswer')),
+                    ],
+                    options={
+                        'db_table': 'quiz_studentanswer_selected_options',
+                        'unique_together': {('studentanswer', 'answeroption')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='studentanswer',
+                    name='selected_options',
+                    field=models.ManyToManyField(blank=True, related_name='student_answers', through='quiz.StudentAnswerSelection', to='quiz.answeroption'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='studentanswer',
+            name='attempt_start_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentanswerselection',
+            name='attempt_start_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunSQL(
+            [
+                'UPDATE quiz_studentanswer SET attempt_start_time = ('
+                'SELECT start_time FROM quiz_quizattempt '
+                'WHERE quiz_quizattempt.id = quiz_studentanswer.attempt_id)',
+                'UPDATE quiz_studentanswer_selected_options SET attempt_start_time = ('
+                'SELECT attempt_start_time FROM quiz_studentanswer '
+                'WHERE quiz_studentanswer.id = quiz_studentanswer_selected_options.studentanswer_id)',
+            ],
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='studentanswer',
+            name='attempt_start_time',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='studentanswerselection',
+            name='attempt_start_time',
+            field=models.DateTimeField(),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from quiz import partitioning
+
+
+def partition(apps, schema_editor):
+    """
+    Range partition the answer tables by attempt start month on PostgreSQL
+    (see quiz/partitioning.py). Other databases keep plain tables.
+    """
+    partitioning.partition_tables(schema_editor.connection)
+
+
+def unpartition(apps, schema_editor):
+    partitioning.unpartition_tables(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_studentanswer_attempt_start_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_attempt_packed_answers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cutoff', models.DateTimeField()),
+                ('file', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('duration_seconds_sum', models.FloatField(default=0)),
+                ('score_distribution', models.JSONField(default=list)),
+                ('question_totals', models.JSONField(default=dict)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_archives', to='quiz.quiz')),
+            ],
+            options={
+                'ordering': ['cutoff'],
+                'unique_together': {('quiz', 'cutoff')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedStudentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField()),
+                ('percentage_sum', models.FloatField()),
+                ('best_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('best_end_time', models.DateTimeField()),
+                ('best_passed', models.BooleanField()),
+                ('first_start_time', models.DateTimeField()),
+                ('first_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('latest_start_time', models.DateTimeField()),
+                ('latest_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempt_summaries', to=settings.AUTH_USER_MODEL)),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='students', to='quiz.attemptarchive')),
+            ],
+            options={
+                'unique_together': {('archive', 'student')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:50
+
+import django.core.validators
+import django.db.models.deletion
+import modelcluster.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_attempt_archives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcceptedAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sort_order', models.IntegerField(blank=True, editable=False, null=True)),
+                ('answer', models.CharField(help_text='Text, number or regular expression, depending on how it is matched', max_length=500)),
+                ('match_type', models.CharField(choices=[('exact', 'Exact text'), ('numeric', 'Number'), ('regex', 'Regular expression'), ('fuzzy', 'Close spelling')], default='exact', max_length=20)),
+                ('case_sensitive', models.BooleanField(default=False)),
+                ('ignore_spaces', models.BooleanField(default=False, help_text='Ignore all whitespace (otherwise each run of whitespace counts as one space)')),
+                ('tolerance', models.FloatField(default=0, help_text='For numbers: the largest difference accepted', validators=[django.core.validators.MinValueValidator(0)])),
+                ('max_edits', models.PositiveSmallIntegerField(default=1, help_text='For close spelling: the most typos accepted (letters added, removed or changed)')),
+                ('question', modelcluster.fields.ParentalKey(on_delete=django.db.models.deletion.CASCADE, related_name='accepted_answers', to='quiz.question')),
+            ],
+            options={
+                'ordering': ['sort_order'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:05
+
+import django.core.validators
+import django.db.models.deletion
+import modelcluster.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_accepted_answers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptPaper',
+            fields=[
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='paper', serialize=False, to='quiz.quizattempt')),
+                ('question_ids', models.JSONField()),
+                ('total_marks', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='pool',
+            field=models.CharField(blank=True, help_text="Name of a question pool of this quiz; each attempt gets only the pool's draw count of its questions", max_length=100),
+        ),
+        migrations.CreateModel(
+            name='QuestionPool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sort_order', models.IntegerField(blank=True, editable=False, null=True)),
+                ('name', models.CharField(max_length=100)),
+                ('draw_count', models.PositiveIntegerField(default=1, help_text='Questions each attempt draws from this pool', validators=[django.core.validators.MinValueValidator(1)])),
+                ('quiz', modelcluster.fields.ParentalKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_pools', to='quiz.quiz')),
+            ],
+            options={
+                'ordering': ['sort_order'],
+                'unique_together': {('quiz', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0013_question_pools'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='violation_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProctoringEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Switched tab or minimised the browser'), (2, 'Left the quiz window'), (3, 'Exited fullscreen'), (4, 'Reloaded or left the page'), (5, 'Tried to copy'), (6, 'Tried to paste'), (7, 'Tried to cut'), (8, 'Opened the context menu'), (9, 'Pressed a blocked shortcut')])),
+                ('occurred_at', models.DateTimeField()),
+                ('count', models.PositiveSmallIntegerField(default=1)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proctoring_events', to='quiz.quizattempt')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['attempt', 'occurred_at'], name='quiz_procto_attempt_c1b90d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from quiz import question_search
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Add the full-text index over the documents (a GIN-indexed tsvector
+    column on PostgreSQL, an FTS5 table on SQLite; see
+    quiz/question_search.py), then index the existing questions.
+    """
+    question_search.create_index(schema_editor.connection)
+    Question = apps.get_model('quiz', 'Question')
+    AnswerOption = apps.get_model('quiz', 'AnswerOption')
+    QuestionSearchEntry = apps.get_model('quiz', 'QuestionSearchEntry')
+    question_ids = list(Question.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(question_ids), question_search.CHUNK_SIZE):
+        chunk = question_ids[start:start + question_search.CHUNK_SIZE]
+        question_search.save_entries(
+            QuestionSearchEntry, question_search.build_entries(Question, AnswerOption, QuestionSearchEntry, chunk),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    question_search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0014_proctoring_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSearchEntry',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='quiz.question')),
+                ('document', models.TextField()),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='quiz.quiz')),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
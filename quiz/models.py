@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.urls import reverse
 from django.utils import timezone
 from wagtail.models import Page, Orderable, ClusterableModel
 from wagtail.fields import RichTextField
@@ -9,6 +12,14 @@ from wagtail.snippets.models import register_snippet
 from modelcluster.fields import ParentalKey
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from taggit.models import TaggedItemBase
+from quizapp.db_routers import read_from_replica
+
+from .events import completion_data, publish_attempt_event
+from .grading import MATCH_TYPES, Rule, grader_for, rule_error
+from .leaderboard import record_attempt
+from .papers import PaperQuestion, draw_paper, paper_size
+from .proctoring import EVENT_CHOICES, violations
+from .ownership import is_quiz_owner
 
 
 # Quiz Category Tag
@@ -138,6 +149,7 @@ class Quiz(Page):
         #     FieldPanel('prevent_browser_back'),
         # ], heading="Security & Anti-Cheating"),
         FieldPanel('tags'),
+        InlinePanel('question_pools', label="Question Pools"),
         InlinePanel('questions', label="Questions"),
     ]
 
@@ -153,10 +165,19 @@ class Quiz(Page):
 
     def serve(self, request):
         """
-        Override the serve method to redirect to the custom quiz detail view
+        Render the quiz detail page at the quiz's own URL, without a redirect
+        to ``quiz_detail``
         """
-        from django.shortcuts import redirect
-        return redirect('quiz_detail', quiz_id=self.id)
+        from .views import render_quiz_detail
+        if not request.user.is_authenticated:
+            from django.contrib.auth.views import redirect_to_login
+            return redirect_to_login(request.get_full_path())
+        return render_quiz_detail(request, self)
+
+    def get_detail_url(self, request=None):
+        """The quiz's page URL, or the ``quiz_detail`` view's while the quiz is not live"""
+        url = self.get_url(request) if self.live else None
+        return url or reverse('quiz_detail', args=[self.id])
 
     def clean(self):
         """Validate quiz fields"""
@@ -181,13 +202,43 @@ class Quiz(Page):
             return False
         return True
 
+    def get_security_settings(self):
+        """Security settings the quiz page enforces; they are always on, whatever the flags above say"""
+        return {
+            'monitor_tab_switching': True,
+            'max_tab_switches': self.max_tab_switches if self.max_tab_switches > 0 else 3,
+            'auto_submit_on_violations': True,
+            'enable_fullscreen': True,
+            'disable_right_click': True,
+            'disable_copy_paste': True,
+            'prevent_browser_back': True,
+        }
+
+    def _paper_plan(self):
+        questions = [PaperQuestion(*row) for row in self.questions.values_list('id', 'sort_order', 'pool', 'marks')]
+        pools = dict(self.question_pools.values_list('name', 'draw_count'))
+        return questions, pools
+
+    def draw_paper(self, seed):
+        """The questions of one attempt's paper, as PaperQuestions (see quiz/papers.py)"""
+        questions, pools = self._paper_plan()
+        return draw_paper(questions, pools, seed, shuffle=self.randomize_questions)
+
+    def get_question_count(self):
+        """Number of questions on each attempt's paper"""
+        return paper_size(*self._paper_plan())[0]
+
     def get_total_marks(self):
-        """Calculate total marks for this quiz"""
-        return sum(question.marks for question in self.questions.all())
+        """Calculate total marks for this quiz (of one attempt's paper when drawing from pools)"""
+        return paper_size(*self._paper_plan())[1]
 
     def get_student_attempts_count(self, user):
-        """Get number of attempts by a student"""
-        return QuizAttempt.objects.filter(quiz=self, student=user).count()
+        """Get number of attempts by a student, including archived ones"""
+        count = QuizAttempt.objects.filter(quiz=self, student=user).unarchived(self).count()
+        archived = ArchivedStudentSummary.objects.filter(
+            archive__quiz=self, student=user
+        ).aggregate(total=models.Sum('attempts'))['total']
+        return count + (archived or 0)
 
     def can_attempt(self, user):
         """Check if student can attempt this quiz"""
@@ -200,12 +251,26 @@ class Quiz(Page):
         
         return True, "You can attempt this quiz"
     
+    def end_open_attempts(self, reason='ended'):
+        """
+        Force-submit every in-progress attempt, notifying the students' exam
+        pages. Returns the number of attempts submitted.
+        """
+        open_attempts = list(self.attempts.filter(is_completed=False).select_related('quiz'))
+        for attempt in open_attempts:
+            publish_attempt_event(attempt.id, 'submitted', {'reason': reason})
+            attempt.calculate_score()
+        return len(open_attempts)
+    
     def is_owner(self, user):
         """Check if the user is the creator of this quiz"""
         if not user or not user.is_authenticated:
             return False
-        # Check both created_by field and owner field (Wagtail's built-in)
-        return self.created_by == user or self.owner == user
+        if self.pk is None:
+            # Not saved yet, so it cannot be in the resolved set
+            return user.pk in (self.created_by_id, self.owner_id)
+        # Covers both created_by and Wagtail's built-in owner field
+        return is_quiz_owner(user, self.pk)
     
     def permissions_for_user(self, user):
         """
@@ -332,6 +397,11 @@ class Question(ClusterableModel, Orderable):
         help_text="Explanation shown after answer submission"
     )
     is_required = models.BooleanField(default=True)
+    pool = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Name of a question pool of this quiz; each attempt gets only the pool's draw count of its questions"
+    )
 
     panels = [
         FieldPanel('question_text'),
@@ -339,7 +409,9 @@ class Question(ClusterableModel, Orderable):
         FieldPanel('marks'),
         FieldPanel('explanation'),
         FieldPanel('is_required'),
+        FieldPanel('pool'),
         InlinePanel('options', label="Answer Options"),
+        InlinePanel('accepted_answers', label="Accepted Answers (short answer)"),
     ]
 
     class Meta:
@@ -349,6 +421,33 @@ class Question(ClusterableModel, Orderable):
         return f"Question {self.sort_order + 1} - {self.quiz.title}"
 
 
+# Question Pool Model
+class QuestionPool(Orderable):
+    """
+    A bank of a quiz's questions (those whose ``pool`` is ``name``) from
+    which each attempt draws ``draw_count`` at random (see quiz/papers.py)
+    """
+    quiz = ParentalKey(Quiz, on_delete=models.CASCADE, related_name='question_pools')
+    name = models.CharField(max_length=100)
+    draw_count = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text="Questions each attempt draws from this pool"
+    )
+
+    panels = [
+        FieldPanel('name'),
+        FieldPanel('draw_count'),
+    ]
+
+    class Meta:
+        ordering = ['sort_order']
+        unique_together = ['quiz', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.draw_count} per attempt)"
+
+
 # Answer Option Model
 class AnswerOption(Orderable):
     """
@@ -373,7 +472,103 @@ class AnswerOption(Orderable):
         return self.option_text
 
 
+# Accepted Answer Model
+class AcceptedAnswer(Orderable):
+    """
+    An answer that a short answer question accepts (see quiz/grading.py)
+    """
+    question = ParentalKey(Question, on_delete=models.CASCADE, related_name='accepted_answers')
+    answer = models.CharField(
+        max_length=500,
+        help_text="Text, number or regular expression, depending on how it is matched"
+    )
+    match_type = models.CharField(max_length=20, choices=MATCH_TYPES, default='exact')
+    case_sensitive = models.BooleanField(default=False)
+    ignore_spaces = models.BooleanField(
+        default=False,
+        help_text="Ignore all whitespace (otherwise each run of whitespace counts as one space)"
+    )
+    tolerance = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0)],
+        help_text="For numbers: the largest difference accepted"
+    )
+    max_edits = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="For close spelling: the most typos accepted (letters added, removed or changed)"
+    )
+
+    panels = [
+        FieldPanel('answer'),
+        FieldPanel('match_type'),
+        FieldPanel('case_sensitive'),
+        FieldPanel('ignore_spaces'),
+        FieldPanel('tolerance'),
+        FieldPanel('max_edits'),
+    ]
+
+    class Meta:
+        ordering = ['sort_order']
+
+    def __str__(self):
+        return self.answer
+
+    def clean(self):
+        error = rule_error(Rule(
+            self.match_type, self.answer, self.case_sensitive, self.ignore_spaces, self.tolerance, self.max_edits
+        ))
+        if error:
+            raise ValidationError({'answer': error})
+
+
+# Question Search Entry Model
+class QuestionSearchEntry(models.Model):
+    """
+    A question's search document (see quiz/question_search.py). The
+    database's full-text index over ``document`` is created by migration
+    0015 and is not part of the model.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='+')
+    document = models.TextField()
+
+    def __str__(self):
+        return f"Search entry of question {self.question_id}"
+
+
+# Answer Key Model
+class AnswerKey(models.Model):
+    """
+    A version of a quiz's questions and options, as used to pack graded
+    attempts (see quiz/packing.py). ``layout`` lists the questions in order,
+    each with its option ids in bit order and the ids of the correct options.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='answer_keys')
+    version = models.PositiveIntegerField()
+    digest = models.CharField(max_length=64)
+    layout = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [['quiz', 'version'], ['quiz', 'digest']]
+
+    def __str__(self):
+        return f"{self.quiz.title} - answer key v{self.version}"
+
+
 # Quiz Attempt Model
+class QuizAttemptQuerySet(models.QuerySet):
+    def unarchived(self, quiz):
+        """
+        Leave out attempts of ``quiz`` that are already rolled up into one of
+        its archives (they are deleted in batches after the archive is made)
+        """
+        cutoff = quiz.attempt_archives.aggregate(cutoff=models.Max('cutoff'))['cutoff']
+        if cutoff is None:
+            return self
+        return self.exclude(is_completed=True, end_time__lt=cutoff)
+
+
 class QuizAttempt(models.Model):
     """
     Records of student quiz attempts
@@ -396,6 +591,16 @@ class QuizAttempt(models.Model):
     )
     is_completed = models.BooleanField(default=False)
     is_passed = models.BooleanField(default=False)
+    # Graded answers packed by the compact_attempts command, which then
+    # deletes the attempt's StudentAnswer rows
+    answer_key = models.ForeignKey(
+        AnswerKey, on_delete=models.PROTECT, null=True, blank=True, editable=False
+    )
+    packed_answers = models.BinaryField(null=True, blank=True, editable=False)
+    # Proctoring violations reported so far (see quiz/proctoring.py)
+    violation_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = QuizAttemptQuerySet.as_manager()
 
     class Meta:
         ordering = ['-start_time']
@@ -413,16 +618,59 @@ class QuizAttempt(models.Model):
             start_time__lte=self.start_time
         ).count()
 
+    def get_time_remaining(self, now=None):
+        """Get the seconds left before this attempt's time limit (never negative)"""
+        now = now or timezone.now()
+        time_elapsed = (now - self.start_time).total_seconds()
+        return max(0, self.quiz.duration_minutes * 60 - time_elapsed)
+
+    @property
+    def is_packed(self):
+        return self.packed_answers is not None
+
+    def create_paper(self):
+        """Draw this attempt's questions, seeded by its id, and store them"""
+        paper = self.quiz.draw_paper(seed=self.id)
+        return AttemptPaper.objects.create(
+            attempt=self,
+            question_ids=[question.id for question in paper],
+            total_marks=sum(question.marks for question in paper),
+        )
+
+    def get_question_ids(self):
+        """Ids of this attempt's questions in the order they are shown"""
+        try:
+            return self.paper.question_ids
+        except AttemptPaper.DoesNotExist:
+            # Attempts started before papers were stored get every question
+            return list(self.quiz.questions.values_list('id', flat=True))
+
+    def get_questions(self, queryset=None):
+        """This attempt's questions in the order they are shown"""
+        question_ids = self.get_question_ids()
+        queryset = queryset if queryset is not None else Question.objects.all()
+        questions = queryset.filter(quiz_id=self.quiz_id).in_bulk(question_ids)
+        return [questions[question_id] for question_id in question_ids if question_id in questions]
+
+    def get_total_marks(self):
+        try:
+            return self.paper.total_marks
+        except AttemptPaper.DoesNotExist:
+            return self.quiz.get_total_marks()
+
     def calculate_score(self):
         """Calculate and save the score for this attempt"""
-        # Calculate total marks from all questions in the quiz
-        total_marks = sum(q.marks for q in self.quiz.questions.all())
+        if self.is_packed:
+            raise ValueError(f'Attempt {self.pk} is packed; its answer rows no longer exist')
+        questions = self.get_questions()
+        # Calculate total marks from the questions on this attempt's paper
+        total_marks = sum(q.marks for q in questions)
         earned_marks = 0
 
         # Create a map of answers for easy lookup
-        student_answers = {a.question_id: a for a in self.answers.all()}
+        student_answers = {a.question_id: a for a in StudentAnswer.objects.for_attempt(self)}
 
-        for question in self.quiz.questions.all():
+        for question in questions:
             if question.id not in student_answers:
                 continue
                 
@@ -454,17 +702,31 @@ class QuizAttempt(models.Model):
                 if selected_options.count() == 1 and selected_options.first().is_correct:
                     earned_marks += question.marks
                     is_answer_correct = True
+
+            elif question.question_type == 'short_answer':
+                if grader_for(question).grade(answer.text_answer):
+                    earned_marks += question.marks
+                    is_answer_correct = True
             
             # Update the is_correct field on the answer
             answer.is_correct = is_answer_correct
             answer.save()
 
+        # Keep the paper's total in step if marks were edited during the attempt
+        paper = getattr(self, 'paper', None)
+        if paper is not None and paper.total_marks != total_marks:
+            paper.total_marks = total_marks
+            paper.save(update_fields=['total_marks'])
+
         self.score = earned_marks
         self.percentage = (earned_marks / total_marks * 100) if total_marks > 0 else 0
         self.is_passed = self.percentage >= self.quiz.pass_percentage
         self.is_completed = True
         self.end_time = timezone.now()
-        self.save()
+        # Leave violation_count alone: proctoring batches update it concurrently
+        self.save(update_fields=['score', 'percentage', 'is_passed', 'is_completed', 'end_time'])
+        publish_attempt_event(self.id, 'completed', completion_data(self))
+        record_attempt(self)
 
         return {
             'score': self.score,
@@ -473,8 +735,139 @@ class QuizAttempt(models.Model):
             'passed': self.is_passed
         }
 
+    def record_proctoring_events(self, events):
+        """
+        Append a batch of parsed proctoring events to this attempt's log and
+        count its violations, finalizing the attempt once the quiz's
+        violation limit is reached. Returns True if this batch finalized it.
+        """
+        added = violations(events)
+        settings = self.quiz.get_security_settings()
+        with transaction.atomic():
+            ProctoringEvent.objects.bulk_create([
+                ProctoringEvent(attempt=self, kind=event.kind, occurred_at=event.occurred_at, count=event.count)
+                for event in events
+            ])
+            if added:
+                QuizAttempt.objects.filter(pk=self.pk).update(violation_count=F('violation_count') + added)
+            # Locks the attempt so concurrent batches cannot both finalize it
+            current = QuizAttempt.objects.select_for_update().values('violation_count', 'is_completed').get(pk=self.pk)
+            self.violation_count = current['violation_count']
+            if (
+                current['is_completed']
+                or not settings['auto_submit_on_violations']
+                or self.violation_count < settings['max_tab_switches']
+            ):
+                return False
+            self.calculate_score()
+            return True
+
+
+# Attempt Paper Model
+class AttemptPaper(models.Model):
+    """
+    The questions drawn for an attempt when it started, in the order they
+    are shown (see quiz/papers.py)
+    """
+    attempt = models.OneToOneField(QuizAttempt, on_delete=models.CASCADE, primary_key=True, related_name='paper')
+    question_ids = models.JSONField()
+    total_marks = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"Paper of {self.attempt_id}: {len(self.question_ids)} questions"
+
+
+# Proctoring Event Model
+class ProctoringEvent(models.Model):
+    """
+    One coalesced entry of an attempt's proctoring log: ``count`` events of
+    ``kind`` reported by the quiz page (see quiz/proctoring.py)
+    """
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='proctoring_events')
+    kind = models.PositiveSmallIntegerField(choices=EVENT_CHOICES)
+    occurred_at = models.DateTimeField()
+    count = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [models.Index(fields=['attempt', 'occurred_at'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} x{self.count} - attempt {self.attempt_id}"
+
+
+# Attempt Archive Models
+class AttemptArchive(models.Model):
+    """
+    Completed attempts of a quiz that ended before ``cutoff`` (and after the
+    previous archive's cutoff), exported to ``file`` on the default storage
+    and rolled up here by the archive_attempts command (see quiz/archive.py)
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempt_archives')
+    cutoff = models.DateTimeField()
+    file = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set once every archived attempt has been deleted from QuizAttempt
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    attempt_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    percentage_sum = models.FloatField(default=0)
+    duration_seconds_sum = models.FloatField(default=0)
+    # Attempt counts for the score ranges on the analytics page
+    score_distribution = models.JSONField(default=list)
+    # {question_id: [answered, correct]}
+    question_totals = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['cutoff']
+        unique_together = ['quiz', 'cutoff']
+
+    def __str__(self):
+        return f"{self.quiz.title} - attempts before {self.cutoff:%Y-%m-%d}"
+
+
+class ArchivedStudentSummary(models.Model):
+    """One student's attempts in an AttemptArchive"""
+    archive = models.ForeignKey(AttemptArchive, on_delete=models.CASCADE, related_name='students')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_attempt_summaries')
+    attempts = models.PositiveIntegerField()
+    percentage_sum = models.FloatField()
+    best_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    best_end_time = models.DateTimeField()
+    best_passed = models.BooleanField()
+    first_start_time = models.DateTimeField()
+    first_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    latest_start_time = models.DateTimeField()
+    latest_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        unique_together = ['archive', 'student']
+
 
 # Student Answer Model
+class StudentAnswerQuerySet(models.QuerySet):
+    """
+    Filters that include ``attempt_start_time``, the column answers are
+    partitioned by on PostgreSQL (see quiz/partitioning.py), so the planner
+    only visits the partitions that can hold the rows.
+    """
+
+    def for_attempt(self, attempt):
+        return self.filter(attempt=attempt, attempt_start_time=attempt.start_time)
+
+    def for_quiz(self, quiz):
+        span = QuizAttempt.objects.filter(quiz=quiz).aggregate(
+            first=models.Min('start_time'), last=models.Max('start_time')
+        )
+        if span['first'] is None:
+            return self.none()
+        return self.filter(
+            attempt__quiz=quiz,
+            attempt_start_time__gte=span['first'],
+            attempt_start_time__lte=span['last'],
+        )
+
+
 class StudentAnswer(models.Model):
     """
     Student's answer for each question
@@ -484,11 +877,14 @@ class StudentAnswer(models.Model):
         on_delete=models.CASCADE,
         related_name='answers'
     )
+    # Copy of attempt.start_time: the partition key on PostgreSQL
+    attempt_start_time = models.DateTimeField(editable=False)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_options = models.ManyToManyField(
         AnswerOption,
         blank=True,
-        related_name='student_answers'
+        related_name='student_answers',
+        through='StudentAnswerSelection',
     )
     text_answer = models.TextField(
         blank=True,
@@ -496,6 +892,8 @@ class StudentAnswer(models.Model):
     )
     is_correct = models.BooleanField(default=False)
 
+    objects = StudentAnswerQuerySet.as_manager()
+
     class Meta:
         unique_together = ['attempt', 'question']
         verbose_name = "Student Answer"
@@ -504,6 +902,30 @@ class StudentAnswer(models.Model):
     def __str__(self):
         return f"{self.attempt.student.username} - Question {self.question.sort_order + 1}"
 
+    def save(self, *args, **kwargs):
+        if self.attempt_start_time is None:
+            self.attempt_start_time = self.attempt.start_time
+        super().save(*args, **kwargs)
+
+    def select_options(self, *options):
+        """Add selected options; each selection row carries the answer's partition key"""
+        self.selected_options.add(
+            *options, through_defaults={'attempt_start_time': self.attempt_start_time}
+        )
+
+
+class StudentAnswerSelection(models.Model):
+    """
+    An option selected in a StudentAnswer (the selected_options through table)
+    """
+    studentanswer = models.ForeignKey(StudentAnswer, on_delete=models.CASCADE)
+    answeroption = models.ForeignKey(AnswerOption, on_delete=models.CASCADE)
+    attempt_start_time = models.DateTimeField()
+
+    class Meta:
+        db_table = 'quiz_studentanswer_selected_options'
+        unique_together = ['studentanswer', 'answeroption']
+
 
 # Student Profile (extends User model)
 @register_snippet
@@ -527,6 +949,7 @@ class StudentProfile(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.email}"
 
+    @read_from_replica()
     def get_quiz_statistics(self):
         """Get statistics for this student"""
         attempts = QuizAttempt.objects.filter(student=self.user, is_completed=True)
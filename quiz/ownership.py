@@ -0,0 +1,44 @@
+"""
+Per-request resolution of which quizzes a user owns.
+
+Admin listing hooks and permission checks run once per page row, and comparing
+``created_by`` and ``owner`` on every row fetches both users. Instead, the ids
+of all quizzes the user owns are loaded with a single query and memoized, so
+each ownership check is a set lookup.
+
+The memo is stored on the user object. ``request.user`` is loaded afresh by
+AuthenticationMiddleware for every request, so the memo lives exactly as long
+as the request, and hooks that are only given ``user`` can share it.
+"""
+from django.db.models import Q
+
+# Bumped whenever a quiz is saved or deleted, so a memo built before the
+# change (e.g. in a long-running command or test) is never reused after it
+_generation = 0
+
+
+def invalidate():
+    global _generation
+    _generation += 1
+
+
+def owned_quiz_ids(user):
+    """Return the ids of every quiz created or owned by ``user``"""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    memo = getattr(user, '_owned_quiz_ids', None)
+    if memo is not None and memo[0] == _generation:
+        return memo[1]
+
+    from .models import Quiz
+    quiz_ids = frozenset(
+        Quiz.objects.filter(Q(created_by=user) | Q(owner=user)).values_list('id', flat=True)
+    )
+    user._owned_quiz_ids = (_generation, quiz_ids)
+    return quiz_ids
+
+
+def is_quiz_owner(user, quiz_id):
+    """Check whether ``user`` owns the quiz with id ``quiz_id``"""
+    return quiz_id in owned_quiz_ids(user)
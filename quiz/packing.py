@@ -0,0 +1,272 @@
+"""
+Packed answers for graded attempts.
+
+A graded attempt's answers never change, but as rows they cost one
+StudentAnswer per question plus one selection row per picked option, each
+with its own indexes. ``compact_attempt`` replaces them with a single
+``QuizAttempt.packed_answers`` value laid out against an AnswerKey (the
+quiz's questions and options in a fixed order):
+
+    header      format, option width in bytes, question count, text length
+    selections  one little-endian unsigned integer per question; bit i is
+                the i-th option of that question in the answer key
+    flags       one byte per question: answered, correct
+    text        zlib-compressed JSON of the non-empty text answers by
+                question index (absent when there are none)
+
+Attempts packed against the same key share the fixed-size part, so many of
+them decode at once into NumPy arrays (``decode_many``) for analytics.
+In-progress attempts keep the row form, and every reader here handles both.
+"""
+import hashlib
+import json
+import struct
+import zlib
+from collections import namedtuple
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+
+from .models import AnswerKey, QuizAttempt, StudentAnswer
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BBHI')
+
+ANSWERED = 1
+CORRECT = 2
+
+# Bytes per question's selection bitmap, by the most options any question has
+WIDTHS = (1, 2, 4, 8)
+
+AttemptAnswer = namedtuple(
+    'AttemptAnswer', ['question_id', 'selected_option_ids', 'text_answer', 'is_correct']
+)
+
+
+class PackingError(ValueError):
+    pass
+
+
+def quiz_layout(quiz):
+    """The current questions of ``quiz`` with their options in bit order"""
+    layout = []
+    for question in quiz.questions.prefetch_related('options'):
+        options = sorted(question.options.all(), key=lambda o: (o.sort_order or 0, o.id))
+        layout.append({
+            'id': question.id,
+            'options': [o.id for o in options],
+            'correct': [o.id for o in options if o.is_correct],
+        })
+    return layout
+
+
+def layout_digest(layout):
+    return hashlib.sha256(json.dumps(layout, sort_keys=True).encode()).hexdigest()
+
+
+def current_answer_key(quiz):
+    """Return the AnswerKey matching the quiz as it is now, creating a new version if needed"""
+    layout = quiz_layout(quiz)
+    digest = layout_digest(layout)
+    for _ in range(3):
+        key = AnswerKey.objects.filter(quiz=quiz, digest=digest).first()
+        if key:
+            return key
+        latest = AnswerKey.objects.filter(quiz=quiz).order_by('-version').first()
+        try:
+            with transaction.atomic():
+                return AnswerKey.objects.create(
+                    quiz=quiz,
+                    version=(latest.version + 1) if latest else 1,
+                    digest=digest,
+                    layout=layout,
+                )
+        except IntegrityError:
+            # Another compaction created this version first
+            continue
+    raise PackingError(f'Could not create an answer key for quiz {quiz.pk}')
+
+
+def option_width(layout):
+    most = max((len(q['options']) for q in layout), default=0)
+    for width in WIDTHS:
+        if most <= width * 8:
+            return width
+    raise PackingError(f'Questions with more than {WIDTHS[-1] * 8} options cannot be packed')
+
+
+def pack(answers, layout):
+    """Pack ``AttemptAnswer``s against an answer key layout"""
+    width = option_width(layout)
+    by_question = {answer.question_id: answer for answer in answers}
+    selections = np.zeros(len(layout), dtype=f'<u{width}')
+    flags = np.zeros(len(layout), dtype=np.uint8)
+    texts = {}
+    for index, question in enumerate(layout):
+        answer = by_question.pop(question['id'], None)
+        if answer is None:
+            continue
+        bits = {option_id: bit for bit, option_id in enumerate(question['options'])}
+        mask = 0
+        for option_id in answer.selected_option_ids:
+            if option_id not in bits:
+                raise PackingError(f'Option {option_id} is not in the answer key')
+            mask |= 1 << bits[option_id]
+        selections[index] = mask
+        flags[index] = ANSWERED | (CORRECT if answer.is_correct else 0)
+        if answer.text_answer:
+            texts[str(index)] = answer.text_answer
+    if by_question:
+        raise PackingError(f'Questions {sorted(by_question)} are not in the answer key')
+
+    text = zlib.compress(json.dumps(texts).encode()) if texts else b''
+    return (
+        HEADER.pack(FORMAT_VERSION, width, len(layout), len(text))
+        + selections.tobytes() + flags.tobytes() + text
+    )
+
+
+def _read_header(blob, layout):
+    version, width, count, text_length = HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION or count != len(layout):
+        raise PackingError('Packed answers do not match the answer key')
+    return width, count, text_length
+
+
+def unpack(blob, layout):
+    """Decode one packed attempt into ``AttemptAnswer``s, in answer key order"""
+    blob = bytes(blob)
+    width, count, text_length = _read_header(blob, layout)
+    offset = HEADER.size
+    selections = np.frombuffer(blob, dtype=f'<u{width}', count=count, offset=offset)
+    offset += count * width
+    flags = np.frombuffer(blob, dtype=np.uint8, count=count, offset=offset)
+    offset += count
+    texts = json.loads(zlib.decompress(blob[offset:offset + text_length])) if text_length else {}
+
+    answers = []
+    for index in np.flatnonzero(flags & ANSWERED):
+        question = layout[index]
+        mask = int(selections[index])
+        answers.append(AttemptAnswer(
+            question_id=question['id'],
+            selected_option_ids=[
+                option_id for bit, option_id in enumerate(question['options']) if mask >> bit & 1
+            ],
+            text_answer=texts.get(str(index), ''),
+            is_correct=bool(flags[index] & CORRECT),
+        ))
+    return answers
+
+
+def with_correct(blob, layout, corrections):
+    """
+    A copy of a packed attempt with the correct flag of the questions in
+    ``corrections`` (``{question_id: is_correct}``) replaced
+    """
+    blob = bytearray(blob)
+    width, count, _ = _read_header(bytes(blob), layout)
+    offset = HEADER.size + count * width
+    for index, question in enumerate(layout):
+        if question['id'] in corrections:
+            flags = blob[offset + index] & ~CORRECT
+            blob[offset + index] = flags | (CORRECT if corrections[question['id']] else 0)
+    return bytes(blob)
+
+
+def decode_many(blobs, layout):
+    """
+    Decode the fixed-size part of many attempts packed against one key.
+
+    Returns ``(selections, flags)``: arrays of shape (attempts, questions)
+    holding each question's option bitmap and its answered/correct flags.
+    """
+    width = option_width(layout)
+    count = len(layout)
+    if not count:
+        return np.zeros((0, 0), dtype=f'<u{width}'), np.zeros((0, 0), dtype=np.uint8)
+    row = count * width + count
+    fixed = bytearray()
+    for blob in blobs:
+        blob = bytes(blob)
+        _read_header(blob, layout)
+        fixed += blob[HEADER.size:HEADER.size + row]
+    table = np.frombuffer(bytes(fixed), dtype=np.uint8).reshape(-1, row)
+    selections = table[:, :count * width].copy().view(f'<u{width}')
+    flags = table[:, count * width:]
+    return selections, flags
+
+
+def option_counts(selections, layout):
+    """How many attempts picked each option: ``{option_id: count}``"""
+    counts = {}
+    for index, question in enumerate(layout):
+        column = selections[:, index]
+        for bit, option_id in enumerate(question['options']):
+            counts[option_id] = int(np.count_nonzero(column >> bit & 1))
+    return counts
+
+
+def attempt_answers(attempt):
+    """An attempt's answers as ``AttemptAnswer``s, packed or not"""
+    if attempt.is_packed:
+        return unpack(attempt.packed_answers, attempt.answer_key.layout)
+    answers = StudentAnswer.objects.for_attempt(attempt).prefetch_related('selected_options')
+    return [
+        AttemptAnswer(
+            question_id=answer.question_id,
+            selected_option_ids=[option.id for option in answer.selected_options.all()],
+            text_answer=answer.text_answer,
+            is_correct=answer.is_correct,
+        )
+        for answer in answers
+    ]
+
+
+def question_totals(quiz, attempts):
+    """
+    ``{question_id: (answered, correct)}`` over ``attempts`` (a QuizAttempt
+    queryset of ``quiz``). Row-form attempts are counted in the database and
+    packed ones are decoded in bulk per answer key.
+    """
+    totals = {}
+    rows = (
+        StudentAnswer.objects.for_quiz(quiz)
+        .filter(attempt__in=attempts.filter(packed_answers__isnull=True))
+        .values('question_id')
+        .annotate(answered=Count('id'), correct=Count('id', filter=Q(is_correct=True)))
+        .order_by()
+    )
+    for row in rows:
+        totals[row['question_id']] = (row['answered'], row['correct'])
+
+    packed = attempts.filter(packed_answers__isnull=False).order_by()
+    for key in AnswerKey.objects.filter(pk__in=packed.values('answer_key')):
+        blobs = packed.filter(answer_key=key).values_list('packed_answers', flat=True)
+        _, flags = decode_many(blobs.iterator(chunk_size=2000), key.layout)
+        answered = np.count_nonzero(flags & ANSWERED, axis=0)
+        correct = np.count_nonzero(flags & CORRECT, axis=0)
+        for index, question in enumerate(key.layout):
+            previous = totals.get(question['id'], (0, 0))
+            totals[question['id']] = (
+                previous[0] + int(answered[index]), previous[1] + int(correct[index])
+            )
+    return totals
+
+
+def compact_attempt(attempt, key=None):
+    """
+    Pack a graded attempt's answers and delete its answer rows. Returns False
+    if the attempt is not completed or already packed.
+    """
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.select_for_update().get(pk=attempt.pk)
+        if not attempt.is_completed or attempt.is_packed:
+            return False
+        key = key or current_answer_key(attempt.quiz)
+        attempt.packed_answers = pack(attempt_answers(attempt), key.layout)
+        attempt.answer_key = key
+        attempt.save(update_fields=['packed_answers', 'answer_key'])
+        StudentAnswer.objects.for_attempt(attempt).delete()
+    return True
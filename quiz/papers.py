@@ -0,0 +1,66 @@
+"""
+Question papers: which questions an attempt gets, and in what order.
+
+Questions whose ``pool`` names one of the quiz's QuestionPools form a bank,
+and each attempt draws that pool's ``draw_count`` questions from it at
+random. Every other question is on every paper. A quiz without pools gives
+every attempt all of its questions, as before.
+
+The draw is seeded with the attempt id, so it can be reproduced, and it is
+made once, when the attempt starts: ``QuizAttempt.create_paper`` stores the
+question ids in the order they are shown (shuffled if the quiz randomizes
+questions) on the attempt's AttemptPaper. Taking, saving, grading and
+reviewing the attempt read the paper instead of the quiz's whole question
+set, so a bank of thousands of questions costs each attempt only the
+questions it drew.
+"""
+import random
+from collections import namedtuple
+
+PaperQuestion = namedtuple('PaperQuestion', ['id', 'sort_order', 'pool', 'marks'])
+
+
+def _quiz_order(question):
+    return question.sort_order or 0, question.id
+
+
+def _split(questions, pools):
+    fixed, banks = [], {}
+    for question in sorted(questions, key=_quiz_order):
+        if question.pool in pools:
+            banks.setdefault(question.pool, []).append(question)
+        else:
+            fixed.append(question)
+    return fixed, banks
+
+
+def draw_paper(questions, pools, seed, shuffle=False):
+    """
+    Draw one paper from ``questions`` (PaperQuestions of a quiz) and
+    ``pools`` (``{name: draw_count}``). Returns PaperQuestions in quiz order,
+    or shuffled with the same seed if ``shuffle``.
+    """
+    rng = random.Random(seed)
+    paper, banks = _split(questions, pools)
+    for name in sorted(banks):
+        bank = banks[name]
+        paper += rng.sample(bank, min(pools[name], len(bank)))
+    paper.sort(key=_quiz_order)
+    if shuffle:
+        rng.shuffle(paper)
+    return paper
+
+
+def paper_size(questions, pools):
+    """
+    ``(question_count, total_marks)`` of a paper. A pool whose questions
+    carry different marks is counted at its highest-scoring draw.
+    """
+    paper, banks = _split(questions, pools)
+    count = len(paper)
+    marks = sum(question.marks for question in paper)
+    for name, bank in banks.items():
+        drawn = sorted((question.marks for question in bank), reverse=True)[:pools[name]]
+        count += len(drawn)
+        marks += sum(drawn)
+    return count, marks
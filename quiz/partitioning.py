@@ -0,0 +1,256 @@
+"""
+Monthly partitions for student answers on PostgreSQL.
+
+``quiz_studentanswer`` and its selected-options table
+(``quiz_studentanswer_selected_options``) get one row per answered question
+and per selected option, which makes them by far the largest tables. On
+PostgreSQL both are range partitioned by ``attempt_start_time``, the start of
+the attempt the answer belongs to, one partition per calendar month (UTC)
+plus a default partition for rows outside the created months:
+
+    quiz_studentanswer_p2025_09, quiz_studentanswer_p2025_10, ...
+    quiz_studentanswer_selected_options_p2025_09, ...
+
+Queries that include the partition key only touch the matching partitions;
+``StudentAnswer.objects.for_attempt()`` and ``for_quiz()`` add it. A finished
+term is removed by detaching its months (a catalogue change, no row deletes),
+after which the detached tables can be dumped and dropped.
+
+The ``answer_partitions`` management command creates upcoming months and
+detaches old ones; run it from a monthly cron job. Other databases (SQLite in
+development and tests) keep plain tables and every function here is a no-op.
+"""
+import datetime
+
+from django.db import transaction
+
+ANSWER_TABLE = 'quiz_studentanswer'
+SELECTION_TABLE = 'quiz_studentanswer_selected_options'
+PARTITION_KEY = 'attempt_start_time'
+
+# Months created ahead of the current one, so inserts never land in the
+# default partition while the monthly job runs on time
+DEFAULT_MONTHS_AHEAD = 3
+
+# Constraints of each table, partitioned and plain. A partitioned table's
+# unique constraints must include the partition key; attempt_start_time is a
+# copy of the attempt's start time, so including it does not change what the
+# constraints allow.
+TABLE_DEFINITIONS = {
+    ANSWER_TABLE: {
+        'partitioned': [
+            f'PRIMARY KEY (id, {PARTITION_KEY})',
+            f'UNIQUE (attempt_id, question_id, {PARTITION_KEY})',
+        ],
+        'plain': [
+            'PRIMARY KEY (id)',
+            'UNIQUE (attempt_id, question_id)',
+        ],
+        'foreign_keys': [
+            'FOREIGN KEY (attempt_id) REFERENCES quiz_quizattempt (id) DEFERRABLE INITIALLY DEFERRED',
+            'FOREIGN KEY (question_id) REFERENCES quiz_question (id) DEFERRABLE INITIALLY DEFERRED',
+        ],
+        # attempt_id is covered by the unique constraint
+        'indexes': ['question_id'],
+    },
+    SELECTION_TABLE: {
+        'partitioned': [
+            f'PRIMARY KEY (id, {PARTITION_KEY})',
+            f'UNIQUE (studentanswer_id, answeroption_id, {PARTITION_KEY})',
+            f'FOREIGN KEY (studentanswer_id, {PARTITION_KEY}) '
+            f'REFERENCES {ANSWER_TABLE} (id, {PARTITION_KEY}) DEFERRABLE INITIALLY DEFERRED',
+        ],
+        'plain': [
+            'PRIMARY KEY (id)',
+            'UNIQUE (studentanswer_id, answeroption_id)',
+            f'FOREIGN KEY (studentanswer_id) REFERENCES {ANSWER_TABLE} (id) DEFERRABLE INITIALLY DEFERRED',
+        ],
+        'foreign_keys': [
+            'FOREIGN KEY (answeroption_id) REFERENCES quiz_answeroption (id) DEFERRABLE INITIALLY DEFERRED',
+        ],
+        'indexes': ['answeroption_id'],
+    },
+}
+
+# Selections reference answers, so they are created after and detached before them
+TABLES = [ANSWER_TABLE, SELECTION_TABLE]
+
+
+def supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def month_start(value):
+    return datetime.datetime(value.year, value.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def next_month(month):
+    return month_start(month + datetime.timedelta(days=32))
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def partition_month(table, name):
+    """The month of a monthly partition of ``table``, or None for other tables"""
+    try:
+        parsed = datetime.datetime.strptime(name, f'{table}_p%Y_%m')
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+def _bounds(month):
+    return f"'{month:%Y-%m-%d} 00:00:00+00'", f"'{next_month(month):%Y-%m-%d} 00:00:00+00'"
+
+
+def _months(first, last):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def is_partitioned(connection, table=ANSWER_TABLE):
+    if not supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection, table=ANSWER_TABLE):
+    """Return ``(name, estimated_rows)`` for the attached partitions of ``table``"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, c.reltuples FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass ORDER BY c.relname',
+            [table],
+        )
+        return [(name, max(0, int(rows))) for name, rows in cursor.fetchall()]
+
+
+def _rebuild(cursor, partitioned):
+    """
+    Recreate both tables (partitioned or plain) from renamed copies and move
+    the rows across. Indexes and constraint names are left to PostgreSQL, so
+    they do not clash with the ones on the copies.
+    """
+    kind = 'partitioned' if partitioned else 'plain'
+    for table in TABLES:
+        definition = TABLE_DEFINITIONS[table]
+        constraints = ', '.join(definition[kind] + definition['foreign_keys'])
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_old')
+        cursor.execute(
+            f'CREATE TABLE {table} '
+            f'(LIKE {table}_old INCLUDING DEFAULTS INCLUDING IDENTITY, {constraints})'
+            + (f' PARTITION BY RANGE ({PARTITION_KEY})' if partitioned else '')
+        )
+        for column in definition['indexes']:
+            cursor.execute(f'CREATE INDEX ON {table} ({column})')
+        if partitioned:
+            cursor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+
+def _copy_rows(cursor):
+    for table in TABLES:
+        cursor.execute(f'INSERT INTO {table} SELECT * FROM {table}_old')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        )
+    for table in reversed(TABLES):
+        cursor.execute(f'DROP TABLE {table}_old')
+
+
+def partition_tables(connection, months_ahead=DEFAULT_MONTHS_AHEAD):
+    """
+    Rebuild the answer tables as partitioned tables, keeping their rows.
+
+    Creates a partition for every month that has answers, up to
+    ``months_ahead`` months from now. Both tables are locked for the length
+    of the copy.
+    """
+    if not supported(connection) or is_partitioned(connection):
+        return
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN({PARTITION_KEY}) FROM {ANSWER_TABLE}')
+        first = cursor.fetchone()[0]
+        _rebuild(cursor, partitioned=True)
+        ensure_partitions(connection, months_ahead, first=first)
+        _copy_rows(cursor)
+
+
+def unpartition_tables(connection):
+    """Turn the partitioned answer tables back into plain tables"""
+    if not supported(connection) or not is_partitioned(connection):
+        return
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _rebuild(cursor, partitioned=False)
+        _copy_rows(cursor)
+
+
+def ensure_partitions(connection, months_ahead=DEFAULT_MONTHS_AHEAD, first=None, now=None):
+    """
+    Create monthly partitions from ``first`` (default: this month) through
+    ``months_ahead`` months from now. Returns the names created.
+
+    Rows already sitting in the default partition for a new month are moved
+    into it, so a missed run of the monthly job is repaired by the next one.
+    """
+    if not supported(connection):
+        return []
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    last = month_start(now)
+    for _ in range(months_ahead):
+        last = next_month(last)
+    created = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for month in _months(first or now, last):
+            for table in TABLES:
+                name = partition_name(table, month)
+                cursor.execute('SELECT to_regclass(%s)', [name])
+                if cursor.fetchone()[0] is not None:
+                    continue
+                lower, upper = _bounds(month)
+                range_filter = f'{PARTITION_KEY} >= {lower} AND {PARTITION_KEY} < {upper}'
+                # A new partition cannot overlap rows in the default partition,
+                # so move them into a table that is then attached
+                cursor.execute(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)')
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {table}_default WHERE {range_filter} RETURNING *) '
+                    f'INSERT INTO {name} SELECT * FROM moved'
+                )
+                cursor.execute(
+                    f'ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})'
+                )
+                created.append(name)
+    return created
+
+
+def detach_partitions(connection, before, drop=False):
+    """
+    Detach the monthly partitions for months before the month of ``before``.
+    The detached tables stay in the database as plain tables for archiving
+    unless ``drop`` is set. Returns the names detached.
+    """
+    if not supported(connection):
+        return []
+    cutoff = month_start(before)
+    detached = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Selections reference answers, so they go first
+        for table in reversed(TABLES):
+            for name, _ in list_partitions(connection, table):
+                month = partition_month(table, name)
+                if month is None or month >= cutoff:
+                    continue
+                cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+                if drop:
+                    cursor.execute(f'DROP TABLE {name}')
+                detached.append(name)
+    return detached
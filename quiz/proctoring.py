@@ -0,0 +1,87 @@
+"""
+Proctoring events reported by the quiz page.
+
+The page (static/quiz/js/modules/proctoring.js) coalesces what it sees into
+``{"type", "at", "count"}`` entries and posts them in batches to
+``api_attempt_proctoring``. ``QuizAttempt.record_proctoring_events`` then,
+in one transaction:
+
+  1. appends the batch to the attempt's ProctoringEvent log with one bulk
+     INSERT (a small integer kind, a timestamp and a repeat count per row)
+  2. adds the batch's violations to ``QuizAttempt.violation_count`` with
+     one UPDATE
+  3. finalizes the attempt if the quiz auto-submits on violations and the
+     count has reached its limit
+
+So the server's count, not the page's, decides when an attempt is
+submitted, and a batch costs the same few queries however many events it
+carries.
+"""
+import datetime
+from collections import namedtuple
+
+from django.utils import timezone
+
+# (code, type sent by the page, label); codes are stored, so never reuse one
+EVENT_KINDS = [
+    (1, 'tab_switch', 'Switched tab or minimised the browser'),
+    (2, 'window_blur', 'Left the quiz window'),
+    (3, 'fullscreen_exit', 'Exited fullscreen'),
+    (4, 'navigate_away', 'Reloaded or left the page'),
+    (5, 'copy', 'Tried to copy'),
+    (6, 'paste', 'Tried to paste'),
+    (7, 'cut', 'Tried to cut'),
+    (8, 'context_menu', 'Opened the context menu'),
+    (9, 'blocked_key', 'Pressed a blocked shortcut'),
+]
+EVENT_CHOICES = [(code, label) for code, _, label in EVENT_KINDS]
+EVENT_CODES = {name: code for code, name, _ in EVENT_KINDS}
+
+# Kinds that count towards the quiz's violation limit (the page's warnings)
+VIOLATION_KINDS = {EVENT_CODES[name] for name in ('tab_switch', 'window_blur', 'fullscreen_exit', 'navigate_away')}
+
+MAX_BATCH = 500
+MAX_COUNT = 1000
+# Client clocks drift; events further out than this are stamped on arrival
+CLOCK_SKEW = datetime.timedelta(minutes=5)
+
+Event = namedtuple('Event', ['kind', 'occurred_at', 'count'])
+
+
+def _occurred_at(value, now):
+    try:
+        occurred_at = datetime.datetime.fromtimestamp(float(value) / 1000, tz=datetime.timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return now
+    return occurred_at if abs(now - occurred_at) <= CLOCK_SKEW else now
+
+
+def _count(value):
+    try:
+        return min(max(int(value), 1), MAX_COUNT)
+    except (TypeError, ValueError):
+        return 1
+
+
+def parse_events(payload, now=None):
+    """
+    The Events of a posted batch, skipping entries of unknown type. Raises
+    ValueError if ``payload`` is not ``{"events": [...]}`` or the batch is
+    larger than MAX_BATCH.
+    """
+    events = payload.get('events') if isinstance(payload, dict) else None
+    if not isinstance(events, list):
+        raise ValueError('Expected {"events": [...]}')
+    if len(events) > MAX_BATCH:
+        raise ValueError(f'At most {MAX_BATCH} events per batch')
+    now = now or timezone.now()
+    return [
+        Event(EVENT_CODES[entry['type']], _occurred_at(entry.get('at'), now), _count(entry.get('count', 1)))
+        for entry in events
+        if isinstance(entry, dict) and entry.get('type') in EVENT_CODES
+    ]
+
+
+def violations(events):
+    """How many of ``events`` count towards the violation limit"""
+    return sum(event.count for event in events if event.kind in VIOLATION_KINDS)
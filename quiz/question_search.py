@@ -0,0 +1,244 @@
+"""
+Full-text search over the question bank, for teachers building quizzes.
+
+Each question has a QuestionSearchEntry holding its search document: the
+question text (without markup) followed by the text of its answer options.
+The database indexes the documents:
+
+  * PostgreSQL: a generated ``tsvector`` column (``english`` configuration)
+    with a GIN index, matched with ``websearch_to_tsquery`` and ranked by
+    ``ts_rank``
+  * SQLite: an external-content FTS5 table that triggers keep in step with
+    the entries, matched on every word of the query and ranked by ``bm25``
+  * anything else, or SQLite built without FTS5: a case-insensitive match
+    of every word, oldest question first
+
+Saving or deleting a question or one of its options re-indexes that one
+question once the transaction commits (quiz/signals.py). The
+``rebuild_question_index`` command rebuilds every entry.
+
+Results come a page at a time in (score, question id) order. Each page
+carries a cursor, and the next page starts after that (score, id) rather
+than at an OFFSET, so a late page costs the same as the first and the
+matches are never counted.
+"""
+import functools
+import re
+import sqlite3
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.utils.html import strip_tags
+
+ENTRY_TABLE = 'quiz_questionsearchentry'
+FTS_TABLE = 'quiz_question_fts'
+GIN_INDEX = 'quiz_question_search_gin'
+TS_CONFIG = 'english'
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+CHUNK_SIZE = 2000
+
+SearchPage = namedtuple('SearchPage', ['questions', 'next_cursor'])
+
+
+@functools.cache
+def fts5_available():
+    """Whether this SQLite library was built with FTS5"""
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(document)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def search_backend(connection):
+    """'postgresql', 'fts5' or 'like'"""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and fts5_available():
+        return 'fts5'
+    return 'like'
+
+
+def create_index(connection):
+    """Create the full-text index over the entries' documents (see migration 0015)"""
+    backend = search_backend(connection)
+    with connection.cursor() as cursor:
+        if backend == 'postgresql':
+            cursor.execute(
+                f"ALTER TABLE {ENTRY_TABLE} ADD COLUMN search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', document)) STORED"
+            )
+            cursor.execute(f'CREATE INDEX {GIN_INDEX} ON {ENTRY_TABLE} USING GIN (search_vector)')
+        elif backend == 'fts5':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(document, content='{ENTRY_TABLE}', "
+                f"content_rowid='question_id', tokenize='porter unicode61')"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {ENTRY_TABLE} BEGIN '
+                f'INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.question_id, new.document); END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {ENTRY_TABLE} BEGIN '
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.question_id, old.document); END"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON {ENTRY_TABLE} BEGIN '
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.question_id, old.document); "
+                f'INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.question_id, new.document); END'
+            )
+
+
+def drop_index(connection):
+    backend = search_backend(connection)
+    with connection.cursor() as cursor:
+        if backend == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+            cursor.execute(f'ALTER TABLE {ENTRY_TABLE} DROP COLUMN IF EXISTS search_vector')
+        elif backend == 'fts5':
+            for trigger in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def question_document(question_text, option_texts):
+    """The search document of a question: its text without markup, then its options"""
+    return '\n'.join([strip_tags(question_text or ''), *option_texts]).strip()
+
+
+def build_entries(question_model, option_model, entry_model, question_ids):
+    """Unsaved entries for the questions in ``question_ids`` that still exist"""
+    options = {}
+    rows = (
+        option_model.objects.filter(question_id__in=question_ids)
+        .order_by('question_id', 'sort_order', 'id').values_list('question_id', 'option_text')
+    )
+    for question_id, option_text in rows:
+        options.setdefault(question_id, []).append(option_text)
+    questions = question_model.objects.filter(id__in=question_ids).values_list('id', 'quiz_id', 'question_text')
+    return [
+        entry_model(
+            question_id=question_id, quiz_id=quiz_id, document=question_document(text, options.get(question_id, [])),
+        )
+        for question_id, quiz_id, text in questions
+    ]
+
+
+def save_entries(entry_model, entries):
+    entry_model.objects.bulk_create(
+        entries, update_conflicts=True, unique_fields=['question'], update_fields=['quiz', 'document'],
+    )
+
+
+def index_questions(question_ids):
+    """Bring the entries of ``question_ids`` up to date"""
+    from .models import AnswerOption, Question, QuestionSearchEntry
+
+    question_ids = list(question_ids)
+    entries = build_entries(Question, AnswerOption, QuestionSearchEntry, question_ids)
+    save_entries(QuestionSearchEntry, entries)
+    # Entries of deleted questions go with them (on_delete=CASCADE)
+    return len(entries)
+
+
+def schedule_index(question_id):
+    """Re-index one question once the current transaction commits"""
+    transaction.on_commit(lambda: index_questions([question_id]))
+
+
+def rebuild_index(chunk_size=CHUNK_SIZE):
+    """Rebuild every entry, ``chunk_size`` questions at a time; returns how many were indexed"""
+    from .models import Question
+
+    # Entries are updated in place, so search keeps working while this runs
+    indexed = 0
+    last_id = 0
+    while True:
+        question_ids = list(
+            Question.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not question_ids:
+            return indexed
+        with transaction.atomic():
+            indexed += index_questions(question_ids)
+        last_id = question_ids[-1]
+
+
+def encode_cursor(score, question_id):
+    return f'{score!r}_{question_id}'
+
+
+def decode_cursor(cursor):
+    """``(score, question_id)`` of a cursor, or None if it is missing or malformed"""
+    try:
+        score, question_id = cursor.rsplit('_', 1)
+        return float(score), int(question_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _words(query):
+    return re.findall(r'\w+', query or '')
+
+
+def _matches(backend, query, quiz_ids):
+    """SQL and params of the ``(question_id, quiz_id, score)`` rows matching ``query``; a higher score is a better match"""
+    params = []
+    if backend == 'postgresql':
+        # ts_rank is a real; as float8 the score read back into a cursor
+        # compares equal to the one in the query, so no row is repeated or skipped
+        sql = (
+            f'SELECT question_id, quiz_id, ts_rank(search_vector, terms)::float8 AS score '
+            f"FROM {ENTRY_TABLE}, websearch_to_tsquery('{TS_CONFIG}', %s) terms "
+            f'WHERE search_vector @@ terms'
+        )
+        params.append(query)
+    elif backend == 'fts5':
+        sql = (
+            f'SELECT e.question_id, e.quiz_id, -bm25({FTS_TABLE}) AS score '
+            f'FROM {FTS_TABLE} JOIN {ENTRY_TABLE} e ON e.question_id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s'
+        )
+        # Every word, each quoted so FTS5 query syntax in the input is taken literally
+        params.append(' '.join('"%s"' % word for word in _words(query)))
+    else:
+        sql = f'SELECT question_id, quiz_id, 0.0 AS score FROM {ENTRY_TABLE} WHERE 1 = 1'
+        for word in _words(query):
+            sql += ' AND LOWER(document) LIKE %s'
+            params.append(f'%{word.lower()}%')
+    if quiz_ids is not None:
+        sql = f'SELECT * FROM ({sql}) matched WHERE quiz_id IN ({", ".join(["%s"] * len(quiz_ids))})'
+        params.extend(quiz_ids)
+    return sql, params
+
+
+def search_questions(query, quiz_ids=None, cursor=None, limit=PAGE_SIZE):
+    """
+    A SearchPage of the questions matching ``query``, best first, from the
+    quizzes in ``quiz_ids`` (all quizzes if None), starting after ``cursor``
+    """
+    from .models import Question
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if not _words(query) or quiz_ids is not None and not quiz_ids:
+        return SearchPage([], None)
+
+    sql, params = _matches(search_backend(connection), query, None if quiz_ids is None else list(quiz_ids))
+    sql = f'SELECT question_id, score FROM ({sql}) page'
+    after = decode_cursor(cursor)
+    if after is not None:
+        sql += ' WHERE score < %s OR (score = %s AND question_id > %s)'
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY score DESC, question_id LIMIT %s'
+    # One row more than the page shows whether there is a next page
+    params.append(limit + 1)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+
+    page = rows[:limit]
+    questions = Question.objects.select_related('quiz').prefetch_related('options').in_bulk([row[0] for row in page])
+    next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(rows) > limit else None
+    return SearchPage([questions[question_id] for question_id, _ in page if question_id in questions], next_cursor)
@@ -0,0 +1,264 @@
+"""
+Regrading completed attempts in bulk.
+
+When a teacher corrects the answer key after an exam (an option's
+``is_correct``, a question's marks, a short answer's accepted answers), the
+stored results are stale, and ``calculate_score`` would also stamp a new
+``end_time``. ``QuizRegrade`` re-scores every completed (unarchived) attempt
+of a quiz instead, in chunks of attempts:
+
+  1. the chunk's answers are loaded as a response matrix against the
+     quiz's current questions (quiz/item_analysis.py), packed and row-form
+     attempts alike
+  2. choice questions are graded on the option bitmaps in one array
+     operation per question type, short answers with ``grade_many``
+     (quiz/grading.py)
+  3. answers whose result changed are written with one UPDATE per question
+     and result, or by patching the flags of packed attempts; score,
+     percentage and pass state are recomputed from the flags and written
+     only for attempts whose outcome changed, out of the marks of each
+     attempt's own paper (quiz/papers.py)
+
+Start and end times are never touched. Each chunk commits on its own, and
+regrading is idempotent, so an interrupted run is finished by running it
+again. ``run()`` yields progress and leaves a RegradeReport of the changed
+outcomes in ``report``.
+
+Used by the ``regrade_quiz`` and ``regrade_short_answers`` management
+commands and the "Regrade attempts" admin view.
+"""
+import csv
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+
+from .grading import grader_for
+from .item_analysis import response_matrix
+from .leaderboard import reset_leaderboard
+from .models import AnswerKey, AttemptPaper, QuizAttempt, StudentAnswer
+from .packing import quiz_layout, unpack, with_correct
+
+CHUNK_SIZE = 2000
+
+REPORT_HEADERS = [
+    'attempt_id', 'student', 'start_time', 'end_time',
+    'old_score', 'new_score', 'old_percentage', 'new_percentage', 'old_passed', 'new_passed',
+]
+
+
+@dataclass
+class OutcomeChange:
+    attempt_id: int
+    student: str
+    start_time: object
+    end_time: object
+    old_score: Decimal
+    new_score: Decimal
+    old_percentage: Decimal
+    new_percentage: Decimal
+    old_passed: bool
+    new_passed: bool
+
+
+@dataclass
+class RegradeReport:
+    attempts: int = 0
+    answers_changed: int = 0
+    changes: list = field(default_factory=list)
+
+    @property
+    def newly_passed(self):
+        return sum(1 for change in self.changes if change.new_passed and not change.old_passed)
+
+    @property
+    def newly_failed(self):
+        return sum(1 for change in self.changes if change.old_passed and not change.new_passed)
+
+
+def write_report(report, file):
+    """Write the changed outcomes of a RegradeReport to ``file`` as CSV"""
+    writer = csv.writer(file)
+    writer.writerow(REPORT_HEADERS)
+    for change in report.changes:
+        writer.writerow([getattr(change, name) for name in REPORT_HEADERS])
+
+
+def _percentages(scores, total_marks):
+    """Each score as a percentage of the matching entry of ``total_marks``"""
+    return [
+        (Decimal(int(score)) * 100 / int(total)).quantize(Decimal('0.01')) if total else Decimal(0)
+        for score, total in zip(scores, total_marks)
+    ]
+
+
+class QuizRegrade:
+    """
+    Re-score the completed attempts of ``quiz`` against its current answer
+    key. ``question_types`` limits which questions are regraded; the others
+    keep their stored results but still count towards the new scores.
+    """
+
+    def __init__(self, quiz, question_types=None, dry_run=False, chunk_size=CHUNK_SIZE):
+        self.quiz = quiz
+        self.question_types = question_types
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.report = RegradeReport()
+
+    def run(self):
+        quiz = self.quiz
+        self.layout = quiz_layout(quiz)
+        questions = {q.id: q for q in quiz.questions.prefetch_related('accepted_answers')}
+        self.questions = [questions[question['id']] for question in self.layout]
+        self.marks = np.array([question.marks for question in self.questions], dtype=np.int64)
+        self.types = np.array([question.question_type for question in self.questions], dtype=object)
+        self.regraded = np.array([
+            self.question_types is None or question.question_type in self.question_types
+            for question in self.questions
+        ], dtype=bool)
+        self.correct_masks = np.array([
+            sum(1 << bit for bit, option_id in enumerate(question['options']) if option_id in question['correct'])
+            for question in self.layout
+        ], dtype=np.uint64)
+
+        ids = list(
+            QuizAttempt.objects.filter(quiz=quiz, is_completed=True).unarchived(quiz)
+            .order_by('id').values_list('id', flat=True)
+        )
+        total = len(ids)
+        if not total:
+            return
+        self.answers = StudentAnswer.objects.for_quiz(quiz)
+        for start in range(0, total, self.chunk_size):
+            self._regrade_chunk(ids[start:start + self.chunk_size])
+            yield 'regrading', min(start + self.chunk_size, total), total
+
+    def _grade(self, matrix):
+        """The new correct flags of a response matrix"""
+        selections = matrix.selections
+        one_picked = (selections != 0) & (selections & (selections - np.uint64(1)) == 0)
+        single = one_picked & (selections & self.correct_masks != 0)
+        multiple = selections == self.correct_masks
+
+        correct = matrix.correct.copy()
+        for types, graded in ((('single', 'true_false'), single), (('multiple',), multiple)):
+            columns = self.regraded & np.isin(self.types, types)
+            correct[:, columns] = graded[:, columns]
+
+        short = np.flatnonzero(self.regraded & (self.types == 'short_answer'))
+        if len(short):
+            for (row, column), result in self._grade_texts(matrix, short):
+                correct[row, column] = result
+        return correct & matrix.answered & matrix.presented
+
+    def _grade_texts(self, matrix, columns):
+        """Yield ``((row, column), is_correct)`` for the short answers in ``columns``"""
+        rows = {attempt_id: row for row, attempt_id in enumerate(matrix.attempt_ids.tolist())}
+        column_of = {self.layout[column]['id']: column for column in columns}
+        texts = {column: [] for column in columns}
+
+        attempts = QuizAttempt.objects.filter(id__in=rows)
+        answers = self.answers.filter(
+            attempt__in=attempts.filter(packed_answers__isnull=True), question_id__in=column_of,
+        ).values_list('attempt_id', 'question_id', 'text_answer')
+        for attempt_id, question_id, text in answers:
+            texts[column_of[question_id]].append((rows[attempt_id], text))
+
+        packed = attempts.filter(packed_answers__isnull=False).values_list('id', 'answer_key_id', 'packed_answers')
+        layouts = {}
+        for attempt_id, key_id, blob in packed:
+            if key_id not in layouts:
+                layouts[key_id] = AnswerKey.objects.get(id=key_id).layout
+            for answer in unpack(blob, layouts[key_id]):
+                if answer.question_id in column_of:
+                    texts[column_of[answer.question_id]].append((rows[attempt_id], answer.text_answer))
+
+        for column, entries in texts.items():
+            results = grader_for(self.questions[column]).grade_many([text for _, text in entries])
+            for (row, _), result in zip(entries, results):
+                yield (row, column), bool(result)
+
+    def _regrade_chunk(self, ids):
+        quiz = self.quiz
+        attempts = QuizAttempt.objects.filter(id__in=ids)
+        matrix = response_matrix(quiz, attempts, self.layout)
+        correct = self._grade(matrix)
+        changed = correct != matrix.correct
+        scores = correct.astype(np.int64) @ self.marks
+        total_marks = matrix.presented.astype(np.int64) @ self.marks
+        percentages = _percentages(scores, total_marks)
+
+        self.report.attempts += len(ids)
+        self.report.answers_changed += int(changed.sum())
+        current = {
+            row[0]: row
+            for row in attempts.values_list(
+                'id', 'student__username', 'start_time', 'end_time', 'score', 'percentage', 'is_passed'
+            )
+        }
+        updates = []
+        for row, attempt_id in enumerate(matrix.attempt_ids.tolist()):
+            _, student, start_time, end_time, score, percentage, passed = current[attempt_id]
+            new_score = Decimal(int(scores[row]))
+            new_passed = percentages[row] >= quiz.pass_percentage
+            if (score, percentage, passed) == (new_score, percentages[row], new_passed):
+                continue
+            self.report.changes.append(OutcomeChange(
+                attempt_id, student, start_time, end_time,
+                score, new_score, percentage, percentages[row], passed, new_passed,
+            ))
+            updates.append(QuizAttempt(
+                id=attempt_id, score=new_score, percentage=percentages[row], is_passed=new_passed,
+            ))
+        if self.dry_run or not (updates or changed.any()):
+            return
+
+        rows, columns = np.nonzero(changed)
+        changed_ids = matrix.attempt_ids[rows]
+        packed = dict(
+            attempts.filter(id__in=changed_ids.tolist(), packed_answers__isnull=False)
+            .values_list('id', 'answer_key_id')
+        )
+        with transaction.atomic():
+            # Row-form answers: one UPDATE per question and new result
+            for column in np.unique(columns):
+                for result in (True, False):
+                    selected = (columns == column) & (correct[rows, columns] == result)
+                    attempt_ids = [i for i in changed_ids[selected].tolist() if i not in packed]
+                    if attempt_ids:
+                        self.answers.filter(
+                            attempt_id__in=attempt_ids, question_id=self.layout[column]['id'],
+                        ).update(is_correct=result)
+
+            # Packed attempts: patch the flags in place
+            corrections = {}
+            for row, column, attempt_id in zip(rows, columns, changed_ids.tolist()):
+                if attempt_id in packed:
+                    corrections.setdefault(attempt_id, {})[self.layout[column]['id']] = bool(correct[row, column])
+            layouts = {key.id: key.layout for key in AnswerKey.objects.filter(id__in=set(packed.values()))}
+            for attempt in QuizAttempt.objects.select_for_update().filter(id__in=list(corrections)):
+                attempt.packed_answers = with_correct(
+                    attempt.packed_answers, layouts[attempt.answer_key_id], corrections[attempt.id]
+                )
+                attempt.save(update_fields=['packed_answers'])
+
+            QuizAttempt.objects.bulk_update(updates, ['score', 'percentage', 'is_passed'], batch_size=1000)
+
+            # Papers show their total marks; keep them in step with edited marks
+            totals = dict(zip(matrix.attempt_ids.tolist(), total_marks.tolist()))
+            papers = AttemptPaper.objects.filter(attempt_id__in=ids).values_list('attempt_id', 'total_marks')
+            AttemptPaper.objects.bulk_update([
+                AttemptPaper(attempt_id=attempt_id, total_marks=totals[attempt_id])
+                for attempt_id, old_total in papers if old_total != totals[attempt_id]
+            ], ['total_marks'], batch_size=1000)
+            reset_leaderboard(self.quiz)
+
+
+def regrade_short_answers(quiz, dry_run=False):
+    """Regrade only the short answers of ``quiz``; returns the RegradeReport"""
+    job = QuizRegrade(quiz, question_types=['short_answer'], dry_run=dry_run)
+    for _ in job.run():
+        pass
+    return job.report
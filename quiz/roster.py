@@ -0,0 +1,209 @@
+"""
+Bulk student provisioning from a CSV roster.
+
+Self-registration creates a student with one user insert, a group lookup, a
+group insert and a profile insert, plus an existence check on the email.
+Provisioning a whole term that way takes hours. ``RosterImport`` looks up
+existing accounts in bulk, hashes the passwords in a process pool, and writes
+users, group memberships and profiles with ``bulk_create`` inside a single
+transaction.
+
+Used by the ``import_students`` management command and the "Import students"
+admin view. The roster needs an ``email`` column; ``first_name``,
+``last_name`` and ``password`` are optional. Students without a password get
+an unusable one until a teacher or admin sets it.
+"""
+import csv
+import io
+import math
+import os
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from quizapp.workers import cgroup_cpu_limit
+
+from .backends import non_blank_email
+from .hashers import hash_passwords
+from .models import StudentProfile
+
+REQUIRED_HEADERS = ['email']
+BATCH_SIZE = 1000
+# Rows per existence query; stays well below SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+
+
+@dataclass
+class RosterRow:
+    line: int
+    email: str
+    first_name: str = ''
+    last_name: str = ''
+    password: str = None
+
+
+@dataclass
+class RosterResult:
+    created: int = 0
+    existing: list = field(default_factory=list)
+
+
+def default_workers():
+    """One hashing process per CPU the container is allowed to use"""
+    cpu = cgroup_cpu_limit() or os.cpu_count() or 1
+    return max(1, math.ceil(cpu))
+
+
+def read_roster(text):
+    """Parse roster CSV text into ``(rows, errors)``"""
+    reader = csv.DictReader(io.StringIO(text))
+    headers = [h.strip().lower() for h in reader.fieldnames or []]
+    missing = [h for h in REQUIRED_HEADERS if h not in headers]
+    if missing:
+        return [], [f"Roster must contain these headers: {', '.join(missing)}"]
+    reader.fieldnames = headers
+
+    rows, errors, seen = [], [], set()
+    for line, record in enumerate(reader, start=2):
+        email = (record.get('email') or '').strip()
+        if not email and not any((value or '').strip() for value in record.values()):
+            continue
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append(f'Row {line}: invalid email "{email}"')
+            continue
+        if len(email) > USERNAME_MAX_LENGTH:
+            # The email doubles as the username
+            errors.append(f'Row {line}: email "{email}" is too long')
+            continue
+        key = email.lower()
+        if key in seen:
+            errors.append(f'Row {line}: duplicate email "{email}"')
+            continue
+        seen.add(key)
+        rows.append(RosterRow(
+            line=line,
+            email=email,
+            first_name=(record.get('first_name') or '').strip()[:150],
+            last_name=(record.get('last_name') or '').strip()[:150],
+            password=(record.get('password') or '').strip() or None,
+        ))
+    return rows, errors
+
+
+def existing_emails(emails):
+    """Return the lowercased emails, from ``emails``, that already have a user"""
+    found = set()
+    lowered = [email.lower() for email in emails]
+    for start in range(0, len(lowered), LOOKUP_CHUNK):
+        found.update(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(non_blank_email(), email_lower__in=lowered[start:start + LOOKUP_CHUNK])
+            .values_list('email_lower', flat=True)
+        )
+    return found
+
+
+def existing_usernames(emails):
+    """
+    Return the lowercased emails, from ``emails``, that are already some
+    user's username (new students get their email as username)
+    """
+    found = set()
+    lowered = [email.lower() for email in emails]
+    for start in range(0, len(lowered), LOOKUP_CHUNK):
+        found.update(
+            User.objects.annotate(username_lower=Lower('username'))
+            .filter(username_lower__in=lowered[start:start + LOOKUP_CHUNK])
+            .values_list('username_lower', flat=True)
+        )
+    return found
+
+
+class RosterImport:
+    """
+    Create a student account for every roster row whose email is not taken,
+    as an email or as a username.
+
+    ``run()`` is a generator yielding ``(stage, done, total)`` as passwords are
+    hashed (``'hashing'``) and users are inserted (``'saving'``), so callers
+    can stream progress; the outcome is in ``result`` once it is exhausted.
+    Nothing is committed unless the generator runs to completion.
+    """
+
+    def __init__(self, rows, workers=None, batch_size=BATCH_SIZE):
+        self.rows = rows
+        self.workers = workers or default_workers()
+        self.batch_size = batch_size
+        self.result = RosterResult()
+
+    def run(self):
+        emails = [row.email for row in self.rows]
+        taken = existing_emails(emails) | existing_usernames(emails)
+        new_rows = []
+        for row in self.rows:
+            if row.email.lower() in taken:
+                self.result.existing.append(row.email)
+            else:
+                new_rows.append(row)
+
+        total = len(new_rows)
+        if not total:
+            return
+
+        passwords = []
+        step = max(1, total // 20)
+        hashes = hash_passwords([row.password for row in new_rows], self.workers)
+        for done, encoded in enumerate(hashes, start=1):
+            passwords.append(encoded)
+            if done % step == 0 or done == total:
+                yield 'hashing', done, total
+
+        users = [
+            User(
+                username=row.email,
+                email=row.email,
+                first_name=row.first_name,
+                last_name=row.last_name,
+                password=password,
+                is_staff=False,
+            )
+            for row, password in zip(new_rows, passwords)
+        ]
+
+        batch_size = self.batch_size
+        with transaction.atomic():
+            student_group, _ = Group.objects.get_or_create(name='Students')
+            for start in range(0, total, batch_size):
+                User.objects.bulk_create(users[start:start + batch_size])
+                yield 'saving', min(start + batch_size, total), total
+
+            # Not every backend returns primary keys from a bulk insert
+            if any(user.pk is None for user in users):
+                usernames = [user.username for user in users]
+                ids = {}
+                for start in range(0, total, LOOKUP_CHUNK):
+                    ids.update(
+                        User.objects.filter(username__in=usernames[start:start + LOOKUP_CHUNK])
+                        .values_list('username', 'id')
+                    )
+                for user in users:
+                    user.pk = ids[user.username]
+
+            Membership = User.groups.through
+            Membership.objects.bulk_create(
+                [Membership(user_id=user.pk, group_id=student_group.pk) for user in users],
+                batch_size=batch_size,
+            )
+            StudentProfile.objects.bulk_create(
+                [StudentProfile(user_id=user.pk) for user in users],
+                batch_size=batch_size,
+            )
+
+        self.result.created = total
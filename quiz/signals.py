@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from . import availability, ownership, question_search
+from .models import AnswerOption, Question, QuestionPool, Quiz
+
+# {% cache %} fragments of quiz_detail.html, keyed by quiz id and live revision
+QUIZ_DETAIL_FRAGMENTS = ('quiz_description', 'quiz_information')
+
+
+def purge_quiz_detail(quiz_id):
+    """Drop the cached fragments of the quiz's live revision"""
+    revision_id = Quiz.objects.filter(id=quiz_id).values_list('live_revision_id', flat=True).first()
+    cache.delete_many([make_template_fragment_key(name, [quiz_id, revision_id]) for name in QUIZ_DETAIL_FRAGMENTS])
+
+
+@receiver(page_unpublished, sender=Quiz)
+def end_attempts_on_unpublish(sender, instance, **kwargs):
+    """Unpublishing a quiz ends it: submit every attempt still in progress"""
+    instance.end_open_attempts(reason='ended')
+
+
+@receiver(page_published, sender=Quiz)
+def end_attempts_on_deactivate(sender, instance, **kwargs):
+    """Publishing a quiz with is_active switched off ends it the same way"""
+    if not instance.is_active:
+        instance.end_open_attempts(reason='ended')
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_ownership(sender, **kwargs):
+    """Ownership may have changed, so drop memoized owned-quiz sets"""
+    ownership.invalidate()
+
+
+@receiver(page_published, sender=Quiz)
+@receiver(page_unpublished, sender=Quiz)
+@receiver(post_page_move, sender=Quiz)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_available_quizzes(sender, **kwargs):
+    """The quiz list's cached schedule (or a quiz's URL) may no longer hold"""
+    availability.invalidate()
+
+
+@receiver(page_published, sender=Quiz)
+@receiver(page_unpublished, sender=Quiz)
+def purge_quiz_detail_on_publish(sender, instance, **kwargs):
+    purge_quiz_detail(instance.id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=QuestionPool)
+@receiver(post_delete, sender=QuestionPool)
+def purge_quiz_detail_on_question_change(sender, instance, **kwargs):
+    """Question count and total marks change with the questions, even without a new revision"""
+    purge_quiz_detail(instance.quiz_id)
+
+
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, **kwargs):
+    """Keep the question bank search entry in step (deleting a question deletes its entry)"""
+    question_search.schedule_index(instance.id)
+
+
+@receiver(post_save, sender=AnswerOption)
+@receiver(post_delete, sender=AnswerOption)
+def index_question_options(sender, instance, **kwargs):
+    question_search.schedule_index(instance.question_id)
@@ -11,14 +11,17 @@ export const CONFIG = {
         enableFullscreen: true, // forced to ALWAYS be true (per prior change)
         disableRightClick: quizApp ? quizApp.dataset.disableRightClick === 'true' : false,
         disableCopyPaste: quizApp ? quizApp.dataset.disableCopyPaste === 'true' : false,
-        preventBrowserBack: quizApp ? quizApp.dataset.preventBrowserBack === 'true' : false
+        preventBrowserBack: quizApp ? quizApp.dataset.preventBrowserBack === 'true' : false,
+        violationCount: quizApp ? (parseInt(quizApp.dataset.violationCount) || 0) : 0
     },
     endpoints: {
         questions: quizApp ? quizApp.dataset.questionsUrl : '',
         status: quizApp ? quizApp.dataset.statusUrl : '',
+        events: quizApp ? quizApp.dataset.eventsUrl : '',
         questionBase: quizApp ? quizApp.dataset.questionBaseUrl : '',
         answerBase: quizApp ? quizApp.dataset.answerBaseUrl : '',
         finalize: quizApp ? quizApp.dataset.finalizeUrl : '',
+        proctoring: quizApp ? quizApp.dataset.proctoringUrl : '',
         getQuestionUrl: function (qid) {
             return this.questionBase.replace('/0/', '/' + qid + '/');
         },
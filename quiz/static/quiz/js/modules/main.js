@@ -7,6 +7,7 @@ import { Questions } from './questions.js';
 import { Timer } from './timer.js';
 import { Security } from './security.js';
 import { Storage } from './storage.js';
+import { Proctoring } from './proctoring.js';
 
 const App = {
     setupQuestionNav: function () {
@@ -110,6 +111,11 @@ const App = {
         }
 
         Storage.loadWarnings();
+        // The server's count survives a cleared session storage
+        if (CONFIG.security.violationCount > State.focusWarningCount) {
+            State.focusWarningCount = CONFIG.security.violationCount;
+            UI.updateWarningDisplay();
+        }
 
         // Setup start button handler
         if (DOM.startQuizBtn) {
@@ -138,6 +144,7 @@ const App = {
         App.setupQuestionNav();
         App.setupButtons();
         Security.setupEventListeners();
+        Proctoring.setup();
 
         console.log("Quiz started!");
     }
@@ -0,0 +1,67 @@
+import { CONFIG } from './config.js';
+import { State } from './state.js';
+import { Storage } from './storage.js';
+import { Utils } from './utils.js';
+
+// Events are sent in batches: after FLUSH_DELAY_MS of quiet, or at once when
+// the queue reaches MAX_QUEUE entries. Repeats of the same event inside one
+// batch are coalesced into a single entry with a count.
+const FLUSH_DELAY_MS = 3000;
+const MAX_QUEUE = 50;
+
+export const Proctoring = {
+    queue: [],
+    flushTimer: null,
+
+    record: function (type) {
+        if (!CONFIG.endpoints.proctoring) return;
+
+        const last = Proctoring.queue[Proctoring.queue.length - 1];
+        if (last && last.type === type) {
+            last.count++;
+        } else {
+            Proctoring.queue.push({ type: type, at: Date.now(), count: 1 });
+        }
+
+        if (Proctoring.queue.length >= MAX_QUEUE) {
+            Proctoring.flush();
+        } else if (!Proctoring.flushTimer) {
+            Proctoring.flushTimer = setTimeout(Proctoring.flush, FLUSH_DELAY_MS);
+        }
+    },
+
+    flush: function (options) {
+        clearTimeout(Proctoring.flushTimer);
+        Proctoring.flushTimer = null;
+        if (!Proctoring.queue.length) return Promise.resolve();
+
+        const events = Proctoring.queue;
+        Proctoring.queue = [];
+
+        return Utils.fetchJSON(CONFIG.endpoints.proctoring, {
+            method: 'POST',
+            // keepalive lets the last batch go out while the page unloads
+            keepalive: !!(options && options.keepalive),
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': Utils.csrf() },
+            body: JSON.stringify({ events: events })
+        }).then(function (result) {
+            // The server counts violations too and submits the attempt at the limit
+            if (result.finalized && result.redirect_url) {
+                State.isSubmitting = true;
+                Storage.clearWarnings();
+                window.location = result.redirect_url;
+            }
+            return result;
+        }).catch(function (err) {
+            if (err instanceof Response && err.status === 400) return;
+            // Network failure: put the batch back to go out with the next one
+            Proctoring.queue = events.concat(Proctoring.queue);
+        });
+    },
+
+    setup: function () {
+        window.addEventListener('pagehide', function () {
+            Proctoring.flush({ keepalive: true });
+        });
+    }
+};
@@ -5,6 +5,7 @@ import { Storage } from './storage.js';
 import { DOM } from './dom.js';
 import { Questions } from './questions.js';
 import { Utils } from './utils.js';
+import { Proctoring } from './proctoring.js';
 
 const WARNING_DEBOUNCE_MS = 2000;
 
@@ -37,7 +38,9 @@ export const Security = {
                 State.modalInstance.show();
             }
 
-            return Questions.saveCurrent().then(function () {
+            return Questions.saveCurrent().then(Proctoring.flush).then(function (recorded) {
+                // The server reached the limit too and has already submitted the attempt
+                if (recorded && recorded.finalized) return;
                 return Utils.fetchJSON(CONFIG.endpoints.finalize, {
                     method: 'POST',
                     headers: { 'X-CSRFToken': Utils.csrf() }
@@ -62,7 +65,7 @@ export const Security = {
         }
     },
 
-    recordWarning: function (reason) {
+    recordWarning: function (reason, type) {
         if (State.isSubmitting) return Promise.resolve();
 
         if (!CONFIG.security.monitorTabSwitching && !CONFIG.security.enableFullscreen) {
@@ -77,6 +80,7 @@ export const Security = {
         }
 
         State.lastWarningAt = now;
+        Proctoring.record(type);
 
         State.focusWarningCount++;
         Storage.saveWarnings();
@@ -110,7 +114,7 @@ export const Security = {
 
             const enforceFullscreen = function () {
                 if (!document.fullscreenElement) {
-                    Security.recordWarning('You exited fullscreen mode.');
+                    Security.recordWarning('You exited fullscreen mode.', 'fullscreen_exit');
                     Security.enterFullscreen();
                 }
             };
@@ -146,7 +150,7 @@ export const Security = {
                     State.lastFocusTime = t;
                     setTimeout(function () {
                         if (document.hidden) {
-                            Security.recordWarning('You switched to another tab or minimized the browser.');
+                            Security.recordWarning('You switched to another tab or minimized the browser.', 'tab_switch');
                         }
                     }, 800);
                 } else {
@@ -160,7 +164,7 @@ export const Security = {
                 setTimeout(function () {
                     const hasFocus = document.hasFocus && document.hasFocus();
                     if (!hasFocus || document.hidden) {
-                        Security.recordWarning('You clicked outside the quiz window or switched applications.');
+                        Security.recordWarning('You clicked outside the quiz window or switched applications.', 'window_blur');
                     }
                 }, 800);
             });
@@ -174,6 +178,7 @@ export const Security = {
         if (CONFIG.security.disableRightClick) {
             document.addEventListener('contextmenu', function (e) {
                 e.preventDefault();
+                Proctoring.record('context_menu');
                 UI.showInfo('Right-click is disabled during the quiz.');
                 return false;
             });
@@ -182,21 +187,24 @@ export const Security = {
         if (CONFIG.security.disableCopyPaste) {
             document.addEventListener('copy', function (e) {
                 e.preventDefault();
+                Proctoring.record('copy');
                 UI.showInfo('Copying is disabled during the quiz.');
             });
             document.addEventListener('paste', function (e) {
                 e.preventDefault();
+                Proctoring.record('paste');
                 UI.showInfo('Pasting is disabled during the quiz.');
             });
             document.addEventListener('cut', function (e) {
                 e.preventDefault();
+                Proctoring.record('cut');
                 UI.showInfo('Cutting is disabled during the quiz.');
             });
         }
 
         window.addEventListener('beforeunload', function () {
             if (!State.isSubmitting) {
-                Security.recordWarning('You refreshed the page or navigated away.');
+                Security.recordWarning('You refreshed the page or navigated away.', 'navigate_away');
             }
         });
 
@@ -214,6 +222,7 @@ export const Security = {
                 (e.ctrlKey && e.shiftKey && (e.keyCode === 73 || e.keyCode === 74)) ||
                 (e.ctrlKey && e.keyCode === 85)) {
                 e.preventDefault();
+                Proctoring.record('blocked_key');
                 UI.showInfo('This action is not allowed during the quiz.');
             }
         });
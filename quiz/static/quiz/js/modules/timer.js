@@ -58,11 +58,66 @@ export const Timer = {
         }
     },
 
-    startSync: function () {
+    handleServerSubmit: function (data) {
+        State.isSubmitting = true;
+        if (State.modalInstance) {
+            DOM.warningMessage.textContent = data.reason === 'timeout'
+                ? 'Time has expired! Your quiz has been automatically submitted.'
+                : 'This quiz has been ended by your teacher. Your answers have been submitted.';
+            DOM.warningFooter.classList.add('d-none');
+            DOM.ackWarningBtn.classList.add('d-none');
+            State.modalInstance.show();
+        }
+    },
+
+    handleCompleted: function (data) {
+        State.isSubmitting = true;
+        Timer.updateFromServer({ remaining_seconds: 0, completed: true });
+        if (data && data.redirect_url) {
+            setTimeout(function () {
+                window.location = data.redirect_url;
+            }, 2000);
+        }
+    },
+
+    startPolling: function () {
         Utils.fetchJSON(CONFIG.endpoints.status).then(Timer.updateFromServer).catch(function () { });
         setInterval(function () {
             Utils.fetchJSON(CONFIG.endpoints.status).then(Timer.updateFromServer).catch(function () { });
         }, 10000);
+    },
+
+    // The server pushes the remaining time, forced submissions and the final
+    // result, so the page does not need to poll while the stream is open.
+    startStream: function () {
+        const source = new EventSource(CONFIG.endpoints.events);
+
+        source.addEventListener('time', function (e) {
+            const data = JSON.parse(e.data);
+            Timer.updateFromServer({ remaining_seconds: data.remaining_seconds, completed: false });
+        });
+        source.addEventListener('submitted', function (e) {
+            Timer.handleServerSubmit(JSON.parse(e.data));
+        });
+        source.addEventListener('completed', function (e) {
+            source.close();
+            Timer.handleCompleted(JSON.parse(e.data));
+        });
+        source.onerror = function () {
+            // CLOSED means the server declined the stream (e.g. not running
+            // under ASGI); transient errors are retried by EventSource itself
+            if (source.readyState === EventSource.CLOSED && !State.isSubmitting) {
+                Timer.startPolling();
+            }
+        };
+    },
+
+    startSync: function () {
+        if (window.EventSource && CONFIG.endpoints.events) {
+            Timer.startStream();
+        } else {
+            Timer.startPolling();
+        }
         setInterval(Timer.tick, 1000);
     }
 };
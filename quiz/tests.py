@@ -1,10 +1,73 @@
-from django.test import TestCase, Client
-from django.contrib.auth.models import User
+import csv
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import tracemalloc
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import Group, Permission, User
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.urls import reverse
 from django.utils import timezone
-from wagtail.models import Page
+from wagtail.coreutils import get_supported_content_language_variant
+from wagtail.models import Locale, Page
 from home.models import HomePage
-from .models import Quiz, Question, AnswerOption, QuizAttempt, StudentAnswer
+from quizapp.caching import LOCAL_TIMEOUT
+from quizapp.db_routers import PIN_COOKIE
+from . import partitioning
+from .archive import read_archive_file
+from .availability import attempt_counts, available_quizzes
+from .backends import users_with_email
+from .collusion import EXACT_LIMIT, detect_collusion
+from .events import LocalEventBackend
+from .forms import StudentRegistrationForm
+from .grading import Rule, compile_rules, edit_distance
+from .item_analysis import ResponseMatrix, compute_item_analysis, item_statistics, response_matrix
+from .leaderboard import (
+	decode_score, entry_score, get_leaderboard_backend, leaderboard_key, leaderboard_size, record_attempt, reset_leaderboard,
+	student_rank, top_entries,
+)
+from .models import (
+	AcceptedAnswer, AnswerKey, AttemptArchive, AttemptPaper, Quiz, Question, AnswerOption, QuestionPool, QuizAttempt, StudentAnswer,
+	StudentAnswerSelection, StudentProfile,
+)
+from .packing import attempt_answers, decode_many, option_counts, question_totals, quiz_layout, unpack
+from .proctoring import MAX_BATCH, MAX_COUNT, parse_events
+from .question_search import search_backend, search_questions
+from .regrade import QuizRegrade
+from .roster import RosterImport, read_roster
+
+
+def create_test_quiz(owner, slug='test-quiz', **fields):
+	"""Create and publish a quiz under the home page"""
+	home_page = HomePage.objects.first()
+	if not home_page:
+		root = Page.get_first_root_node()
+		home_page = HomePage(title='Home', slug='home')
+		root.add_child(instance=home_page)
+		home_page.save_revision().publish()
+	fields.setdefault('duration_minutes', 10)
+	quiz = Quiz(title=slug.replace('-', ' ').title(), slug=slug, created_by=owner, **fields)
+	home_page.add_child(instance=quiz)
+	quiz.save_revision().publish()
+	# Page ids are reused once a test rolls back; drop any board left under this one
+	get_leaderboard_backend().delete(leaderboard_key(quiz.id))
+	return quiz
 
 
 class MultipleChoiceSelectionTest(TestCase):
@@ -82,3 +145,1390 @@ class MultipleChoiceSelectionTest(TestCase):
 		selected_ids = set(answer.selected_options.values_list('id', flat=True))
 		self.assertEqual(selected_ids, {self.opt2.id, self.opt3.id, self.opt5.id})
 		self.assertTrue(answer.is_correct)
+
+
+class StudentAnswerPartitionKeyTest(TestCase):
+	def setUp(self):
+		self.client = Client()
+		self.user = User.objects.create_user(username='student', password='pass12345')
+		self.quiz = create_test_quiz(self.user)
+		self.question = Question.objects.create(
+			quiz=self.quiz, question_text='Pick one', question_type='single', marks=1,
+		)
+		self.option = AnswerOption.objects.create(question=self.question, option_text='A', is_correct=True)
+
+	def test_answers_and_selections_carry_attempt_start_time(self):
+		self.client.login(username='student', password='pass12345')
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		attempt = QuizAttempt.objects.get(student=self.user, quiz=self.quiz)
+		self.client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{self.question.id}': [str(self.option.id)],
+		})
+		answer = StudentAnswer.objects.for_attempt(attempt).get(question=self.question)
+		self.assertEqual(answer.attempt_start_time, attempt.start_time)
+		selection = StudentAnswerSelection.objects.get(studentanswer=answer)
+		self.assertEqual(selection.attempt_start_time, attempt.start_time)
+		self.assertTrue(answer.is_correct)
+
+	def test_quiz_filter_bounds_partition_key(self):
+		self.assertFalse(StudentAnswer.objects.for_quiz(self.quiz).exists())
+		attempt = QuizAttempt.objects.create(quiz=self.quiz, student=self.user)
+		StudentAnswer.objects.create(attempt=attempt, question=self.question)
+		other_quiz = create_test_quiz(self.user, slug='other')
+		other_question = Question.objects.create(quiz=other_quiz, question_text='Other', question_type='single')
+		other = QuizAttempt.objects.create(quiz=other_quiz, student=self.user)
+		StudentAnswer.objects.create(attempt=other, question=other_question)
+		# One query for the quiz's attempt span, one for the answers
+		with self.assertNumQueries(2):
+			answers = list(StudentAnswer.objects.for_quiz(self.quiz))
+		self.assertEqual([a.attempt_id for a in answers], [attempt.id])
+
+	def test_partition_names_and_bounds(self):
+		month = partitioning.month_start(timezone.now().replace(year=2025, month=12, day=31))
+		self.assertEqual(partitioning.next_month(month).strftime('%Y-%m'), '2026-01')
+		name = partitioning.partition_name(partitioning.SELECTION_TABLE, month)
+		self.assertEqual(name, 'quiz_studentanswer_selected_options_p2025_12')
+		self.assertEqual(partitioning.partition_month(partitioning.SELECTION_TABLE, name), month)
+		# Partitions of the selections table are not partitions of the answers table
+		self.assertIsNone(partitioning.partition_month(partitioning.ANSWER_TABLE, name))
+		self.assertIsNone(partitioning.partition_month(partitioning.ANSWER_TABLE, 'quiz_studentanswer_default'))
+
+	def test_partitioning_is_a_no_op_without_postgresql(self):
+		self.assertFalse(partitioning.is_partitioned(connections['default']))
+		self.assertEqual(partitioning.ensure_partitions(connections['default']), [])
+		out = io.StringIO()
+		call_command('answer_partitions', '--detach-before', '2025-01', stdout=out)
+		self.assertIn('not partitioned', out.getvalue())
+
+
+class PackedAnswersTest(TestCase):
+	def setUp(self):
+		self.client = Client()
+		self.student = User.objects.create_user(username='student', password='pass12345')
+		self.quiz = create_test_quiz(self.student)
+		self.single = Question.objects.create(quiz=self.quiz, question_text='One', question_type='single')
+		self.multiple = Question.objects.create(quiz=self.quiz, question_text='Many', question_type='multiple')
+		self.short = Question.objects.create(quiz=self.quiz, question_text='Why', question_type='short_answer')
+		self.a = AnswerOption.objects.create(question=self.single, option_text='A', is_correct=True)
+		self.b = AnswerOption.objects.create(question=self.single, option_text='B')
+		self.c = AnswerOption.objects.create(question=self.multiple, option_text='C', is_correct=True)
+		self.d = AnswerOption.objects.create(question=self.multiple, option_text='D', is_correct=True)
+		self.e = AnswerOption.objects.create(question=self.multiple, option_text='E')
+		self.client.login(username='student', password='pass12345')
+
+	def submit(self, single, multiple, text):
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		attempt = QuizAttempt.objects.filter(student=self.student).latest('start_time')
+		self.client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{self.single.id}': [str(o.id) for o in single],
+			f'question_{self.multiple.id}[]': [str(o.id) for o in multiple],
+			f'question_{self.short.id}': text,
+		})
+		attempt.refresh_from_db()
+		return attempt
+
+	def compact(self):
+		call_command('compact_attempts', '--older-than', '0', stdout=io.StringIO())
+
+	def test_compaction_replaces_rows_with_packed_answers(self):
+		attempt = self.submit([self.a], [self.c, self.e], 'Because')
+		before = sorted(attempt_answers(attempt))
+		self.compact()
+		attempt.refresh_from_db()
+		self.assertTrue(attempt.is_packed)
+		self.assertFalse(StudentAnswer.objects.filter(attempt=attempt).exists())
+		self.assertFalse(StudentAnswerSelection.objects.exists())
+		self.assertEqual(sorted(attempt_answers(attempt)), before)
+		self.assertEqual(
+			{a.question_id: a.is_correct for a in before},
+			{self.single.id: True, self.multiple.id: False, self.short.id: False},
+		)
+
+	def test_in_progress_attempts_keep_rows(self):
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		attempt = QuizAttempt.objects.get(student=self.student)
+		self.client.post(reverse('api_save_answer', args=[attempt.id, self.single.id]), {'option_ids[]': [self.a.id]})
+		self.compact()
+		attempt.refresh_from_db()
+		self.assertFalse(attempt.is_packed)
+		self.assertTrue(StudentAnswer.objects.filter(attempt=attempt).exists())
+
+	def test_result_page_reads_packed_answers(self):
+		attempt = self.submit([self.b], [self.c, self.d], 'Because')
+		before = self.client.get(reverse('quiz_result', args=[attempt.id])).context['answers']
+		self.compact()
+		after = self.client.get(reverse('quiz_result', args=[attempt.id])).context['answers']
+		self.assertEqual(
+			[(a['question'], list(a['selected_options']), a['is_correct'], a['text_answer']) for a in before],
+			[(a['question'], list(a['selected_options']), a['is_correct'], a['text_answer']) for a in after],
+		)
+
+	def test_question_totals_mix_packed_and_row_attempts(self):
+		self.submit([self.a], [self.c, self.d], '')
+		self.submit([self.b], [self.c], 'x')
+		self.compact()
+		# A new answer key version, and a graded attempt still in row form
+		self.b.is_correct = True
+		self.b.save()
+		self.submit([self.b], [self.c, self.d], '')
+		attempts = QuizAttempt.objects.filter(quiz=self.quiz, is_completed=True)
+		self.assertEqual(attempts.filter(packed_answers__isnull=True).count(), 1)
+		totals = question_totals(self.quiz, attempts)
+		self.assertEqual(totals[self.single.id], (3, 2))
+		self.assertEqual(totals[self.multiple.id], (3, 2))
+
+		self.compact()
+		self.assertEqual(AnswerKey.objects.filter(quiz=self.quiz).count(), 2)
+		self.assertEqual(question_totals(self.quiz, attempts), totals)
+
+	def test_decode_many_matches_unpack(self):
+		for picks in ([self.a], [self.b], []):
+			self.submit(picks, [self.d, self.e], '')
+		self.compact()
+		key = AnswerKey.objects.get(quiz=self.quiz)
+		blobs = list(QuizAttempt.objects.order_by('id').values_list('packed_answers', flat=True))
+		selections, flags = decode_many(blobs, key.layout)
+		self.assertEqual(selections.shape, (3, 3))
+		counts = option_counts(selections, key.layout)
+		self.assertEqual((counts[self.a.id], counts[self.b.id], counts[self.d.id]), (1, 1, 3))
+		self.assertEqual(list(flags[:, 0] & 1), [1, 1, 1])
+
+
+class ItemAnalysisTest(TestCase):
+	def setUp(self):
+		self.client = Client()
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.teacher, max_attempts=10)
+		self.single = Question.objects.create(quiz=self.quiz, question_text='One', question_type='single')
+		self.multiple = Question.objects.create(quiz=self.quiz, question_text='Many', question_type='multiple', marks=2)
+		self.a = AnswerOption.objects.create(question=self.single, option_text='A', is_correct=True)
+		self.b = AnswerOption.objects.create(question=self.single, option_text='B')
+		self.c = AnswerOption.objects.create(question=self.multiple, option_text='C', is_correct=True)
+		self.d = AnswerOption.objects.create(question=self.multiple, option_text='D')
+
+	def submit(self, single, multiple):
+		self.client.force_login(self.teacher)
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		attempt = QuizAttempt.objects.filter(quiz=self.quiz).latest('id')
+		self.client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{self.single.id}': [str(o.id) for o in single],
+			f'question_{self.multiple.id}[]': [str(o.id) for o in multiple],
+		})
+
+	def test_statistics(self):
+		correct = np.array([[1, 1, 0], [1, 0, 0], [1, 1, 1], [0, 0, 0]], dtype=bool)
+		layout = [{'id': i, 'options': [], 'correct': []} for i in range(3)]
+		matrix = ResponseMatrix(np.arange(4), correct, correct, np.zeros((4, 3), dtype=np.uint64))
+		analysis = item_statistics(matrix, layout, [1, 1, 1])
+
+		self.assertEqual([analysis.items[i]['difficulty'] for i in range(3)], [0.75, 0.5, 0.25])
+		# One attempt in each of the upper and lower groups
+		self.assertEqual([analysis.items[i]['discrimination'] for i in range(3)], [1, 1, 1])
+		totals = correct.sum(axis=1)
+		expected = np.corrcoef(correct[:, 0], totals - correct[:, 0])[0, 1]
+		self.assertAlmostEqual(analysis.items[0]['point_biserial'], expected, places=3)
+		p = correct.mean(axis=0)
+		kr20 = 3 / 2 * (1 - (p * (1 - p) * 4 / 3).sum() / totals.var(ddof=1))
+		self.assertAlmostEqual(analysis.reliability, kr20, places=3)
+
+	def test_packed_and_row_attempts_give_the_same_matrix(self):
+		self.submit([self.a], [self.c])
+		self.submit([self.b], [self.c, self.d])
+		self.submit([], [self.d])
+		attempts = QuizAttempt.objects.filter(quiz=self.quiz, is_completed=True)
+		layout = quiz_layout(self.quiz)
+		rows = response_matrix(self.quiz, attempts, layout)
+		call_command('compact_attempts', '--older-than', '0', stdout=io.StringIO())
+		packed = response_matrix(self.quiz, attempts, layout)
+
+		for matrix in (rows, packed):
+			order = np.argsort(matrix.attempt_ids)
+			self.assertEqual(matrix.correct[order].tolist(), [[True, True], [False, False], [False, False]])
+			# take_quiz saves an answer row for every question, picked or not
+			self.assertTrue(matrix.answered.all())
+			self.assertEqual(matrix.selections[order].tolist(), [[1, 1], [2, 3], [0, 2]])
+
+	def test_analytics_page_shows_cached_item_analysis(self):
+		self.submit([self.a], [self.c])
+		self.submit([self.b], [self.d])
+		url = reverse('quiz_analytics', args=[self.quiz.id])
+		with mock.patch('quiz.item_analysis.compute_item_analysis', wraps=compute_item_analysis) as compute:
+			response = self.client.get(url)
+			self.client.get(url)
+			self.assertEqual(compute.call_count, 1)
+			self.submit([self.a], [self.d])
+			self.client.get(url)
+			self.assertEqual(compute.call_count, 2)
+
+		single = response.context['question_analysis'][0]
+		self.assertEqual(single['difficulty_index'], 0.5)
+		self.assertEqual(single['discrimination'], 1)
+		self.assertEqual([(c['option'], c['count']) for c in single['option_counts']], [(self.a, 1), (self.b, 1)])
+		self.assertContains(response, 'Item Analysis')
+
+
+class ShortAnswerGradingTest(TestCase):
+	def setUp(self):
+		self.client = Client()
+		self.student = User.objects.create_user(username='student', password='pass12345')
+		self.quiz = create_test_quiz(self.student, pass_percentage=50)
+		self.capital = Question.objects.create(quiz=self.quiz, question_text='Capital?', question_type='short_answer')
+		self.number = Question.objects.create(quiz=self.quiz, question_text='Pi?', question_type='short_answer')
+		AcceptedAnswer.objects.create(question=self.capital, answer='New  Delhi')
+		AcceptedAnswer.objects.create(question=self.number, answer='3.14', match_type='numeric', tolerance=0.01)
+		self.client.login(username='student', password='pass12345')
+
+	def submit(self, capital, number):
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		attempt = QuizAttempt.objects.filter(student=self.student).latest('start_time')
+		self.client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{self.capital.id}': capital,
+			f'question_{self.number.id}': number,
+		})
+		attempt.refresh_from_db()
+		return attempt
+
+	def test_rules(self):
+		def grades(texts, **rule):
+			rule = Rule(**{'case_sensitive': False, 'ignore_spaces': False, 'tolerance': 0, 'max_edits': 1, **rule})
+			return list(compile_rules((rule,)).grade_many(texts))
+
+		self.assertEqual(grades([' new delhi ', 'NEW\tDELHI', 'Delhi'], match_type='exact', answer='New Delhi'), [True, True, False])
+		self.assertEqual(grades(['new delhi', 'New Delhi'], match_type='exact', answer='New Delhi', case_sensitive=True), [False, True])
+		self.assertEqual(grades(['newdelhi', 'new delhi'], match_type='exact', answer='New Delhi', ignore_spaces=True), [True, True])
+		self.assertEqual(grades(['1,000', '1001', '998.5', 'a lot'], match_type='numeric', answer='1000', tolerance=1), [True, True, False, False])
+		self.assertEqual(grades(['colour', 'Color', 'colr'], match_type='regex', answer='colou?r'), [True, True, False])
+		self.assertEqual(grades(['photosynthesis', 'Photosynthesys', 'fotosinthesis'], match_type='fuzzy', answer='Photosynthesis'), [True, True, False])
+		self.assertEqual(edit_distance('kitten', 'sitting', 5), 3)
+
+	def test_one_long_answer_does_not_pad_the_others(self):
+		grader = compile_rules((Rule('fuzzy', 'New Delhi', False, False, 0, 1),))
+		texts = ['new delhi', 'Mumbai', None] * 200 + ['x' * 100_000]
+		tracemalloc.start()
+		try:
+			accepted = grader.grade_many(texts)
+			peak = tracemalloc.get_traced_memory()[1]
+		finally:
+			tracemalloc.stop()
+		self.assertEqual(list(accepted[:3]) + [accepted[-1]], [True, False, False, False])
+		self.assertEqual(int(accepted.sum()), 200)
+		# A fixed-width string array would take 601 x 100,000 x 4 bytes
+		self.assertLess(peak, 10 * 1024 * 1024)
+
+	def test_invalid_rules_are_rejected(self):
+		with self.assertRaises(ValidationError):
+			AcceptedAnswer(question=self.number, answer='three', match_type='numeric').full_clean()
+		with self.assertRaises(ValidationError):
+			AcceptedAnswer(question=self.capital, answer='(unclosed', match_type='regex').full_clean()
+
+	def test_submission_grades_short_answers(self):
+		attempt = self.submit('new delhi', '3.141')
+		self.assertEqual((attempt.score, attempt.percentage, attempt.is_passed), (2, 100, True))
+		attempt = self.submit('Mumbai', '3.2')
+		self.assertEqual((attempt.score, attempt.percentage, attempt.is_passed), (0, 0, False))
+
+	def test_regrade_rows_and_packed_attempts(self):
+		first = self.submit('Delhi', '3.14')
+		call_command('compact_attempts', '--older-than', '0', stdout=io.StringIO())
+		second = self.submit('Delhi', '22/7')
+		end_times = [first.end_time, second.end_time]
+		self.assertEqual((first.score, second.score), (1, 0))
+
+		AcceptedAnswer.objects.create(question=self.capital, answer='delhi', match_type='fuzzy')
+		out = io.StringIO()
+		call_command('regrade_short_answers', '--quiz', str(self.quiz.id), '--dry-run', stdout=out)
+		self.assertIn('Would change 2', out.getvalue())
+		self.assertEqual(QuizAttempt.objects.get(id=first.id).score, 1)
+
+		call_command('regrade_short_answers', '--quiz', str(self.quiz.id), stdout=out)
+		first.refresh_from_db()
+		second.refresh_from_db()
+		self.assertTrue(first.is_packed)
+		self.assertEqual((first.score, first.percentage, first.is_passed), (2, 100, True))
+		self.assertEqual((second.score, second.percentage, second.is_passed), (1, 50, True))
+		self.assertEqual([first.end_time, second.end_time], end_times)
+		self.assertEqual(
+			{a.question_id: a.is_correct for a in attempt_answers(first)},
+			{self.capital.id: True, self.number.id: True},
+		)
+		self.assertTrue(StudentAnswer.objects.get(attempt=second, question=self.capital).is_correct)
+
+
+class QuizRegradeTest(TestCase):
+	def setUp(self):
+		self.client = Client()
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.teacher, max_attempts=10, pass_percentage=50)
+		self.single = Question.objects.create(quiz=self.quiz, question_text='One', question_type='single')
+		self.multiple = Question.objects.create(quiz=self.quiz, question_text='Many', question_type='multiple')
+		self.a = AnswerOption.objects.create(question=self.single, option_text='A', is_correct=True)
+		self.b = AnswerOption.objects.create(question=self.single, option_text='B')
+		self.c = AnswerOption.objects.create(question=self.multiple, option_text='C', is_correct=True)
+		self.d = AnswerOption.objects.create(question=self.multiple, option_text='D')
+		self.client.force_login(self.teacher)
+
+		self.picked_a = self.submit([self.a], [self.c])
+		self.picked_b = self.submit([self.b], [self.d])
+		call_command('compact_attempts', '--older-than', '0', stdout=io.StringIO())
+		self.picked_b_rows = self.submit([self.b], [self.c, self.d])
+		self.attempts = [self.picked_a, self.picked_b, self.picked_b_rows]
+		self.times = [(a.start_time, a.end_time) for a in self.attempts]
+
+		# The key was wrong: B is the right answer to the first question
+		self.a.is_correct = False
+		self.a.save()
+		self.b.is_correct = True
+		self.b.save()
+
+	def submit(self, single, multiple):
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		attempt = QuizAttempt.objects.filter(quiz=self.quiz).latest('id')
+		self.client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{self.single.id}': [str(o.id) for o in single],
+			f'question_{self.multiple.id}[]': [str(o.id) for o in multiple],
+		})
+		attempt.refresh_from_db()
+		return attempt
+
+	def results(self):
+		for attempt in self.attempts:
+			attempt.refresh_from_db()
+		return [(a.score, a.percentage, a.is_passed) for a in self.attempts]
+
+	def test_regrade_rescores_and_keeps_timestamps(self):
+		self.assertEqual(self.results(), [(2, 100, True), (0, 0, False), (0, 0, False)])
+		report_path = os.path.join(tempfile.mkdtemp(), 'report.csv')
+		self.addCleanup(shutil.rmtree, os.path.dirname(report_path))
+		out = io.StringIO()
+		call_command('regrade_quiz', str(self.quiz.id), '--chunk-size', '2', '--report', report_path, stdout=out)
+
+		self.assertEqual(self.results(), [(1, 50, True), (1, 50, True), (1, 50, True)])
+		self.assertEqual([(a.start_time, a.end_time) for a in self.attempts], self.times)
+		self.assertIn('2 now pass, 0 now fail', out.getvalue())
+		self.assertEqual(
+			[a.is_correct for a in attempt_answers(self.picked_b) if a.question_id == self.single.id], [True],
+		)
+		self.assertTrue(self.picked_b.is_packed)
+		self.assertEqual(
+			{a.question_id: a.is_correct for a in StudentAnswer.objects.filter(attempt=self.picked_b_rows)},
+			{self.single.id: True, self.multiple.id: False},
+		)
+		with open(report_path) as f:
+			rows = list(csv.DictReader(f))
+		self.assertEqual(
+			sorted((int(r['attempt_id']), r['old_percentage'], r['new_percentage']) for r in rows),
+			[(self.picked_a.id, '100.00', '50.00'), (self.picked_b.id, '0.00', '50.00'), (self.picked_b_rows.id, '0.00', '50.00')],
+		)
+
+		# Nothing left to change
+		call_command('regrade_quiz', str(self.quiz.id), stdout=out)
+		self.assertIn('the result of 0 attempt(s)', out.getvalue())
+
+	def test_dry_run_changes_nothing(self):
+		before = self.results()
+		out = io.StringIO()
+		call_command('regrade_quiz', str(self.quiz.id), '--dry-run', stdout=out)
+		self.assertIn('Would change the result of 3 attempt(s)', out.getvalue())
+		self.assertEqual(self.results(), before)
+
+	def test_admin_view_streams_progress_and_changes(self):
+		url = reverse('regrade_quiz', args=[self.quiz.id])
+		self.assertEqual(self.client.get(url).status_code, 200)
+		response = self.client.post(url)
+		page = b''.join(response.streaming_content).decode()
+		self.assertIn('Regrading: 3 / 3', page)
+		self.assertIn('3 result(s) changed: 2 now pass, 0 now fail', page)
+		self.assertEqual(self.results(), [(1, 50, True), (1, 50, True), (1, 50, True)])
+
+		# Students do not get into the admin at all
+		student = User.objects.create_user('student', 'student@example.com', 'pass12345')
+		self.client.force_login(student)
+		self.assertEqual(self.client.post(url).status_code, 302)
+
+
+class QuestionPoolTest(TestCase):
+	def setUp(self):
+		self.client = Client()
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.teacher, max_attempts=10)
+		self.fixed = Question.objects.create(quiz=self.quiz, question_text='Fixed', question_type='true_false', sort_order=0)
+		self.bank = [
+			Question.objects.create(
+				quiz=self.quiz, question_text=f'Bank {i}', question_type='true_false', marks=2, pool='bank', sort_order=i,
+			)
+			for i in range(1, 5)
+		]
+		self.right = {}
+		for question in [self.fixed] + self.bank:
+			self.right[question.id] = AnswerOption.objects.create(question=question, option_text='True', is_correct=True)
+			AnswerOption.objects.create(question=question, option_text='False')
+		QuestionPool.objects.create(quiz=self.quiz, name='bank', draw_count=2)
+		self.client.force_login(self.teacher)
+
+	def start(self):
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		return QuizAttempt.objects.filter(quiz=self.quiz).latest('id')
+
+	def test_draw_takes_pool_count_and_is_seeded(self):
+		paper = [question.id for question in self.quiz.draw_paper(seed=7)]
+		self.assertEqual(paper, [question.id for question in self.quiz.draw_paper(seed=7)])
+		self.assertEqual(paper[0], self.fixed.id)
+		self.assertEqual(len(paper), 3)
+		self.assertLessEqual(set(paper[1:]), {question.id for question in self.bank})
+		self.assertEqual(paper[1:], sorted(paper[1:]))
+		self.assertEqual((self.quiz.get_question_count(), self.quiz.get_total_marks()), (3, 5))
+
+	def test_attempt_is_served_its_paper(self):
+		attempt = self.start()
+		self.assertEqual(attempt.paper.question_ids, [q.id for q in self.quiz.draw_paper(seed=attempt.id)])
+		self.assertEqual(attempt.paper.total_marks, 5)
+
+		response = self.client.get(reverse('api_attempt_questions', args=[attempt.id]))
+		self.assertEqual([q['id'] for q in response.json()['questions']], attempt.paper.question_ids)
+		response = self.client.get(reverse('take_quiz', args=[attempt.id]))
+		self.assertEqual([q.id for q in response.context['questions']], attempt.paper.question_ids)
+
+	def test_question_off_the_paper_is_rejected(self):
+		attempt = self.start()
+		off = next(q for q in self.bank if q.id not in attempt.paper.question_ids)
+		option = self.right[off.id]
+		self.assertEqual(self.client.get(reverse('api_attempt_question', args=[attempt.id, off.id])).status_code, 404)
+		response = self.client.post(reverse('api_save_answer', args=[attempt.id, off.id]), {'option_ids': [option.id]})
+		self.assertEqual(response.status_code, 404)
+		response = self.client.post(
+			reverse('save_quiz_progress', args=[attempt.id]), {'question_id': off.id, 'option_ids': [option.id]},
+		)
+		self.assertEqual(response.status_code, 400)
+		self.assertFalse(StudentAnswer.objects.filter(attempt=attempt, question=off).exists())
+
+	def test_score_is_out_of_the_paper(self):
+		attempt = self.start()
+		self.client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{question_id}': [str(self.right[question_id].id)] for question_id in attempt.paper.question_ids
+		})
+		attempt.refresh_from_db()
+		self.assertEqual((attempt.score, attempt.percentage, attempt.get_total_marks()), (5, 100, 5))
+
+		analysis = compute_item_analysis(self.quiz)
+		for question in self.bank:
+			expected = 1.0 if question.id in attempt.paper.question_ids else None
+			self.assertEqual(analysis.items[question.id]['difficulty'], expected)
+		self.assertIsNone(analysis.reliability)
+
+	def test_regrade_uses_paper_marks(self):
+		attempt = self.start()
+		drawn = attempt.paper.question_ids
+		self.client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{drawn[0]}': [str(self.right[drawn[0]].id)],
+		})
+		Question.objects.filter(id=self.fixed.id).update(marks=3)
+		job = QuizRegrade(self.quiz)
+		for _ in job.run():
+			pass
+		attempt.refresh_from_db()
+		self.assertEqual((attempt.score, attempt.percentage), (3, Decimal('42.86')))
+		self.assertEqual(AttemptPaper.objects.get(attempt=attempt).total_marks, 7)
+
+
+class ProctoringEventTest(TestCase):
+	def setUp(self):
+		self.client = Client()
+		self.student = User.objects.create_user('student', 'student@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.student, max_tab_switches=3)
+		question = Question.objects.create(quiz=self.quiz, question_text='One', question_type='true_false')
+		AnswerOption.objects.create(question=question, option_text='True', is_correct=True)
+		self.client.force_login(self.student)
+		self.client.get(reverse('start_quiz', args=[self.quiz.id]))
+		self.attempt = QuizAttempt.objects.get(quiz=self.quiz)
+		self.url = reverse('api_attempt_proctoring', args=[self.attempt.id])
+
+	def post(self, events):
+		return self.client.post(self.url, json.dumps({'events': events}), content_type='application/json')
+
+	def test_batch_is_logged_with_one_insert(self):
+		now = int(timezone.now().timestamp() * 1000)
+		events = [{'type': 'copy', 'at': now, 'count': 1}, {'type': 'paste', 'at': now, 'count': 1}] * 50
+		events += [{'type': 'tab_switch', 'at': now, 'count': 2}, {'type': 'made_up', 'at': now}]
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.post(events)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json(), {'recorded': 101, 'violations': 2, 'max_violations': 3, 'finalized': False})
+		inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "quiz_proctoringevent"')]
+		self.assertEqual(len(inserts), 1)
+		self.assertEqual(self.attempt.proctoring_events.count(), 101)
+		self.attempt.refresh_from_db()
+		self.assertEqual(self.attempt.violation_count, 2)
+		self.assertFalse(self.attempt.is_completed)
+
+	def test_reaching_the_limit_submits_the_attempt(self):
+		self.post([{'type': 'window_blur'}, {'type': 'fullscreen_exit'}])
+		response = self.post([{'type': 'copy', 'count': 20}, {'type': 'tab_switch'}])
+		data = response.json()
+		self.assertTrue(data['finalized'])
+		self.assertEqual(data['violations'], 3)
+		self.assertEqual(data['redirect_url'], reverse('quiz_result', args=[self.attempt.id]))
+		self.attempt.refresh_from_db()
+		self.assertTrue(self.attempt.is_completed)
+		self.assertEqual(self.attempt.violation_count, 3)
+		self.assertEqual(self.post([{'type': 'tab_switch'}]).status_code, 400)
+
+	def test_finalizing_keeps_the_violation_count(self):
+		stale = QuizAttempt.objects.get(id=self.attempt.id)
+		self.post([{'type': 'tab_switch'}])
+		stale.calculate_score()
+		self.attempt.refresh_from_db()
+		self.assertEqual(self.attempt.violation_count, 1)
+
+	def test_bad_batches_are_rejected(self):
+		response = self.client.post(self.url, 'not json', content_type='application/json')
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(self.client.post(self.url, '[]', content_type='application/json').status_code, 400)
+		self.assertEqual(self.post([{'type': 'copy'}] * (MAX_BATCH + 1)).status_code, 400)
+		self.assertFalse(self.attempt.proctoring_events.exists())
+
+	def test_untrusted_timestamps_and_counts_are_clamped(self):
+		now = timezone.now()
+		events = parse_events({'events': [{'type': 'copy', 'at': 0, 'count': 10 ** 9}, {'type': 'cut', 'at': 'soon'}]}, now)
+		self.assertEqual([(event.occurred_at, event.count) for event in events], [(now, MAX_COUNT), (now, 1)])
+
+
+class CollusionDetectionTest(TestCase):
+	def setUp(self):
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.teacher, max_attempts=10)
+		self.options = []
+		for i in range(4):
+			question = Question.objects.create(quiz=self.quiz, question_text=f'Q{i}', question_type='single', sort_order=i)
+			self.options.append([
+				AnswerOption.objects.create(question=question, option_text=text, is_correct=text == 'A', sort_order=n)
+				for n, text in enumerate('ABC')
+			])
+
+	def submit(self, username, picks):
+		student, _ = User.objects.get_or_create(username=username, defaults={'email': f'{username}@example.com'})
+		client = Client()
+		client.force_login(student)
+		client.get(reverse('start_quiz', args=[self.quiz.id]))
+		attempt = QuizAttempt.objects.filter(student=student).latest('id')
+		client.post(reverse('take_quiz', args=[attempt.id]), {
+			f'question_{options[0].question_id}': [str(options['ABC'.index(pick)].id)]
+			for options, pick in zip(self.options, picks)
+		})
+		return attempt
+
+	def test_shared_wrong_answers_are_flagged(self):
+		copier = self.submit('copier', 'ABCB')
+		source = self.submit('source', 'ABCB')
+		self.submit('honest', 'ACBA')
+		self.submit('top-1', 'AAAA')
+		self.submit('top-2', 'AAAA')
+
+		for limit in (EXACT_LIMIT, 0):
+			report = detect_collusion(self.quiz, exact_limit=limit)
+			self.assertEqual(report.method, 'exact' if limit else 'minhash')
+			self.assertEqual(len(report.pairs), 1)
+			pair = report.pairs[0]
+			self.assertEqual(set(pair.attempt_ids), {copier.id, source.id})
+			self.assertEqual((pair.shared_wrong, pair.both_answered, pair.similarity), (3, 4, 1.0))
+			self.assertTrue(pair.together)
+
+	def test_retakes_by_one_student_are_not_paired(self):
+		self.submit('student', 'BBCC')
+		self.submit('student', 'BBCC')
+		self.assertEqual(detect_collusion(self.quiz).pairs, [])
+
+	def test_analytics_and_command_list_pairs(self):
+		self.submit('copier', 'BBCB')
+		self.submit('source', 'BBCC')
+		out = io.StringIO()
+		call_command('detect_collusion', str(self.quiz.id), stdout=out)
+		self.assertIn('Found 1 suspicious pair(s)', out.getvalue())
+
+		client = Client()
+		client.force_login(self.teacher)
+		response = client.get(reverse('quiz_analytics', args=[self.quiz.id]))
+		self.assertEqual(response.context['suspicious_pair_count'], 1)
+		self.assertEqual(
+			{student.username for student in response.context['suspicious_pairs'][0]['students']}, {'copier', 'source'},
+		)
+		self.assertContains(response, 'Side by side')
+
+	def test_large_cohort_shows_last_report_until_refreshed(self):
+		cache.clear()
+		self.submit('copier', 'BBCB')
+		self.submit('source', 'BBCC')
+		client = Client()
+		client.force_login(self.teacher)
+		url = reverse('quiz_analytics', args=[self.quiz.id])
+		with mock.patch('quiz.collusion.INLINE_LIMIT', 1):
+			self.assertIsNone(client.get(url).context['collusion_report'])
+			call_command('detect_collusion', '--all', stdout=io.StringIO())
+			self.submit('late', 'BBCB')
+			with mock.patch('quiz.collusion.detect_collusion') as detect:
+				response = client.get(url)
+			detect.assert_not_called()
+			self.assertTrue(response.context['collusion_stale'])
+			self.assertEqual(response.context['collusion_report'].attempts, 2)
+			self.assertContains(response, 'newer submissions are checked by the next scheduled run')
+
+			out = io.StringIO()
+			call_command('detect_collusion', '--all', stdout=out)
+			self.assertIn('Refreshed 1 quiz report(s)', out.getvalue())
+			response = client.get(url)
+			self.assertFalse(response.context['collusion_stale'])
+			self.assertEqual(response.context['collusion_report'].attempts, 3)
+
+
+class LeaderboardTest(TestCase):
+	def setUp(self):
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.teacher, max_attempts=10, show_results_immediately=True)
+		self.now = timezone.now().replace(microsecond=0)
+
+	def finish(self, username, percentage, minutes_ago=0):
+		student, _ = User.objects.get_or_create(username=username)
+		end_time = self.now - timezone.timedelta(minutes=minutes_ago)
+		return QuizAttempt.objects.create(
+			quiz=self.quiz, student=student, is_completed=True, percentage=Decimal(percentage),
+			start_time=end_time - timezone.timedelta(minutes=5), end_time=end_time,
+		)
+
+	def test_entry_score_orders_by_percentage_then_end_time(self):
+		earlier = self.now - timezone.timedelta(seconds=1)
+		self.assertGreater(entry_score(Decimal('80.5'), self.now), entry_score(Decimal('80.49'), earlier))
+		self.assertGreater(entry_score(Decimal('80'), earlier), entry_score(Decimal('80'), self.now))
+		self.assertEqual(decode_score(entry_score(Decimal('66.67'), self.now)), (Decimal('66.67'), self.now))
+
+	def test_best_attempt_per_student_ties_to_earlier_submission(self):
+		self.finish('alice', 60, minutes_ago=30)
+		best = self.finish('alice', 80)
+		bob = self.finish('bob', 80, minutes_ago=10)
+		carol = self.finish('carol', 50)
+
+		entries = top_entries(self.quiz, 10)
+		self.assertEqual([e.attempt_id for e in entries], [bob.id, best.id, carol.id])
+		self.assertEqual([e.rank for e in entries], [1, 2, 3])
+		self.assertEqual([e.attempt_id for e in top_entries(self.quiz, 1)], [bob.id])
+		self.assertEqual(student_rank(self.quiz, carol.student_id).rank, 3)
+		self.assertIsNone(student_rank(self.quiz, self.teacher.id))
+		self.assertEqual(leaderboard_size(self.quiz), 3)
+
+	def test_graded_attempts_update_the_board_only_when_better(self):
+		first = self.finish('alice', 70)
+		self.finish('bob', 60)
+		self.assertEqual(student_rank(self.quiz, first.student_id).rank, 1)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			record_attempt(self.finish('alice', 40))
+			better = self.finish('bob', 90)
+			record_attempt(better)
+			record_attempt(self.finish('carol', 65))
+		self.assertEqual(
+			[(e.student_id, e.attempt_id) for e in top_entries(self.quiz, 10)][:2],
+			[(better.student_id, better.id), (first.student_id, first.id)],
+		)
+		self.assertEqual(leaderboard_size(self.quiz), 3)
+
+	def test_reset_rebuilds_from_the_attempts(self):
+		attempt = self.finish('alice', 70)
+		self.finish('bob', 60)
+		top_entries(self.quiz, 10)
+		QuizAttempt.objects.filter(id=attempt.id).update(percentage=Decimal('10'))
+		self.assertEqual(student_rank(self.quiz, attempt.student_id).rank, 1)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			reset_leaderboard(self.quiz)
+		self.assertEqual(student_rank(self.quiz, attempt.student_id).rank, 2)
+
+	def test_backend_errors_do_not_fail_grading_or_reset(self):
+		attempt = self.finish('alice', 70)
+		backend = mock.Mock()
+		backend.update.side_effect = backend.delete.side_effect = ConnectionError('leaderboard down')
+		with mock.patch('quiz.leaderboard.get_leaderboard_backend', return_value=backend):
+			with self.assertLogs('django', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+				record_attempt(attempt)
+				reset_leaderboard(self.quiz)
+		backend.update.assert_called_once()
+		backend.delete.assert_called_once()
+
+	def test_analytics_topper_and_result_rank(self):
+		for i in range(12):
+			self.finish(f'student-{i}', 40 + i)
+		best = self.finish('student-3', 99, minutes_ago=1)
+
+		client = Client()
+		client.force_login(self.teacher)
+		response = client.get(reverse('quiz_analytics', args=[self.quiz.id]))
+		self.assertEqual(response.context['topper'], best)
+		self.assertEqual([a.student.username for a in response.context['top_10_percent']], ['student-3'])
+
+		client.force_login(best.student)
+		response = client.get(reverse('quiz_result', args=[best.id]))
+		self.assertEqual((response.context['leaderboard_rank'].rank, response.context['leaderboard_size']), (1, 12))
+		self.assertContains(response, 'Your Rank')
+
+
+class AvailableQuizzesTest(TestCase):
+	def setUp(self):
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.student = User.objects.create_user('student', 'student@example.com', 'pass12345')
+		self.now = timezone.now()
+		self.open = create_test_quiz(self.teacher, 'open-quiz', max_attempts=1, end_date=self.now + timezone.timedelta(hours=2))
+		self.upcoming = create_test_quiz(self.teacher, 'upcoming-quiz', start_date=self.now + timezone.timedelta(hours=1))
+		create_test_quiz(self.teacher, 'closed-quiz', end_date=self.now - timezone.timedelta(hours=1))
+		create_test_quiz(self.teacher, 'inactive-quiz', is_active=False)
+
+	def titles(self, now):
+		return [snapshot.title for snapshot in available_quizzes(now)]
+
+	def test_quizzes_open_and_close_at_their_boundaries(self):
+		self.assertEqual(self.titles(self.now), ['Open Quiz'])
+		with self.assertNumQueries(0):
+			self.assertEqual(self.titles(self.now + timezone.timedelta(minutes=59)), ['Open Quiz'])
+		self.assertEqual(self.titles(self.upcoming.start_date), ['Open Quiz', 'Upcoming Quiz'])
+		self.assertEqual(self.titles(self.open.end_date), ['Open Quiz', 'Upcoming Quiz'])
+		self.assertEqual(self.titles(self.open.end_date + timezone.timedelta(microseconds=1)), ['Upcoming Quiz'])
+
+	def test_publish_and_unpublish_invalidate(self):
+		self.assertEqual(self.titles(self.now), ['Open Quiz'])
+		self.upcoming.start_date = None
+		self.upcoming.save_revision().publish()
+		self.assertEqual(self.titles(self.now), ['Open Quiz', 'Upcoming Quiz'])
+		self.open.unpublish()
+		self.assertEqual(self.titles(self.now), ['Upcoming Quiz'])
+
+	def test_timeout_is_capped_when_cache_is_process_local(self):
+		# The next boundary is the upcoming quiz's start, an hour away
+		with mock.patch.object(cache, 'set') as cache_set:
+			available_quizzes(self.now)
+		self.assertEqual(cache_set.call_args.args[2], LOCAL_TIMEOUT)
+
+		location = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, location)
+		shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+		with override_settings(CACHES=shared), mock.patch.object(cache, 'set') as cache_set:
+			available_quizzes(self.now)
+		self.assertEqual(cache_set.call_args.args[2], 60 * 60)
+
+	def test_quiz_list_counts_attempts_in_one_query(self):
+		QuizAttempt.objects.create(quiz=self.open, student=self.student)
+		available_quizzes()
+		with self.assertNumQueries(1):
+			self.assertEqual(attempt_counts(self.student, available_quizzes()), {self.open.id: 1})
+
+		client = Client()
+		client.force_login(self.student)
+		response = client.get(reverse('quiz_list'))
+		self.assertEqual([item['quiz'].id for item in response.context['quiz_data']], [self.open.id])
+		self.assertFalse(response.context['quiz_data'][0]['can_attempt'])
+		self.assertContains(response, 'Maximum attempts (1) reached')
+
+
+class QuizDetailCacheTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.teacher, description='<p>First description</p>')
+		Question.objects.create(quiz=self.quiz, question_text='Q1', question_type='single', marks=2)
+		self.client = Client()
+		self.client.force_login(User.objects.create_user('student', password='pass12345'))
+		self.url = reverse('quiz_detail', args=[self.quiz.id])
+
+	def render(self):
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(self.url)
+		self.assertEqual(response.status_code, 200)
+		reads_questions = any('quiz_questionpool' in query['sql'] for query in queries.captured_queries)
+		return response, reads_questions
+
+	def test_static_part_is_cached_per_revision(self):
+		response, reads_questions = self.render()
+		self.assertTrue(reads_questions)
+		self.assertContains(response, 'First description')
+		response, reads_questions = self.render()
+		self.assertFalse(reads_questions)
+		self.assertContains(response, 'First description')
+
+		self.quiz.description = '<p>Second description</p>'
+		self.quiz.save_revision().publish()
+		response, reads_questions = self.render()
+		self.assertTrue(reads_questions)
+		self.assertContains(response, 'Second description')
+
+	def test_question_changes_purge(self):
+		self.render()
+		Question.objects.create(quiz=self.quiz, question_text='Q2', question_type='single', marks=3)
+		response, reads_questions = self.render()
+		self.assertTrue(reads_questions)
+		self.assertContains(response, '<td>5</td>', html=True)
+
+	def test_fragments_kept_briefly_with_a_process_local_cache(self):
+		response, _ = self.render()
+		self.assertEqual(response.context['fragment_timeout'], LOCAL_TIMEOUT)
+		location = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, location)
+		shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+		with override_settings(CACHES=shared):
+			response, _ = self.render()
+		self.assertEqual(response.context['fragment_timeout'], 24 * 60 * 60)
+
+
+class QuizPageServeTest(TestCase):
+	def setUp(self):
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.student = User.objects.create_user('student', password='pass12345')
+		self.quiz = create_test_quiz(self.teacher)
+
+	def test_page_url_renders_detail_in_one_hop(self):
+		self.client.force_login(self.student)
+		response = self.client.get(self.quiz.url, follow=True)
+		self.assertEqual(response.redirect_chain, [])
+		self.assertTemplateUsed(response, 'quiz/quiz_detail.html')
+		self.assertEqual(response.context['quiz'], self.quiz)
+		self.assertContains(response, f'<link rel="canonical" href="{self.quiz.full_url}">', html=True)
+
+	def test_anonymous_visitors_go_straight_to_login(self):
+		response = self.client.get(self.quiz.url)
+		self.assertRedirects(response, f"{settings.LOGIN_URL}?next={self.quiz.url}", fetch_redirect_response=False)
+
+	def test_quiz_list_links_to_page_url(self):
+		self.client.force_login(self.student)
+		self.assertContains(self.client.get(reverse('quiz_list')), f'href="{self.quiz.url}"')
+		self.quiz.unpublish()
+		self.assertEqual(self.quiz.get_detail_url(), reverse('quiz_detail', args=[self.quiz.id]))
+
+
+class QuestionSearchTest(TestCase):
+	def setUp(self):
+		self.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass12345', is_staff=True)
+		self.teacher.user_permissions.add(Permission.objects.get(content_type__app_label='wagtailadmin', codename='access_admin'))
+		self.quiz = create_test_quiz(self.teacher)
+
+	def add_question(self, text, options=(), quiz=None):
+		with self.captureOnCommitCallbacks(execute=True):
+			question = Question.objects.create(quiz=quiz or self.quiz, question_text=f'<p>{text}</p>', question_type='single')
+			for n, option in enumerate(options):
+				AnswerOption.objects.create(question=question, option_text=option, is_correct=n == 0, sort_order=n)
+		return question
+
+	def found(self, query, **kwargs):
+		return [question.id for question in search_questions(query, **kwargs).questions]
+
+	def test_questions_and_options_are_indexed_on_save(self):
+		self.assertIn(search_backend(connection), ('postgresql', 'fts5'))
+		question = self.add_question('Which organelle performs photosynthesis?', ['Chloroplast', 'Ribosome'])
+		self.add_question('What is the capital of France?', ['Paris'])
+		self.assertEqual(self.found('photosynthesis'), [question.id])
+		self.assertEqual(self.found('ribosome'), [question.id])
+		self.assertEqual(self.found('"organelle" OR NOT'), [])
+
+		option = question.options.get(option_text='Ribosome')
+		with self.captureOnCommitCallbacks(execute=True):
+			option.option_text = 'Mitochondrion'
+			option.save()
+		self.assertEqual(self.found('ribosome'), [])
+		self.assertEqual(self.found('mitochondrion'), [question.id])
+
+		question.delete()
+		self.assertEqual(self.found('photosynthesis'), [])
+
+	def test_keyset_pages_cover_every_match_once(self):
+		ids = {self.add_question(f'Cell biology question {i}' + ' cell' * (i % 3)).id for i in range(7)}
+		self.add_question('Unrelated')
+		# SQLite: FTS5 ranking, then the plain match used where there is no
+		# full-text index. PostgreSQL: ts_rank scores carried through the cursor
+		modes = (True, False) if connection.vendor == 'sqlite' else (None,)
+		for fts5 in modes:
+			with mock.patch('quiz.question_search.fts5_available', return_value=fts5):
+				seen, cursor, pages = [], None, 0
+				while True:
+					page = search_questions('cell', cursor=cursor, limit=3)
+					seen += [question.id for question in page.questions]
+					pages += 1
+					cursor = page.next_cursor
+					if cursor is None:
+						break
+				self.assertEqual((len(seen), set(seen), pages), (7, ids, 3))
+				self.assertEqual(self.found('cell', cursor='not-a-cursor', limit=3), seen[:3])
+
+	def test_question_bank_shows_only_own_quizzes(self):
+		own = self.add_question('Plate tectonics and earthquakes', ['Subduction'])
+		other_teacher = User.objects.create_user('other', 'other@example.com', 'pass12345', is_staff=True)
+		self.add_question('Earthquakes and tsunamis', quiz=create_test_quiz(other_teacher, 'other-quiz'))
+		self.assertEqual(len(self.found('earthquakes')), 2)
+
+		client = Client()
+		client.force_login(self.teacher)
+		response = client.get(reverse('question_bank'), {'q': 'earthquakes'})
+		self.assertEqual([question.id for question in response.context['results'].questions], [own.id])
+		self.assertContains(response, 'Subduction')
+
+		student = User.objects.create_user('student', password='pass12345')
+		client.force_login(student)
+		self.assertNotEqual(client.get(reverse('question_bank'), {'q': 'earthquakes'}).status_code, 200)
+
+	def test_rebuild_command(self):
+		question = Question.objects.create(quiz=self.quiz, question_text='Indexed later', question_type='single')
+		self.assertEqual(self.found('indexed'), [])
+		out = io.StringIO()
+		call_command('rebuild_question_index', stdout=out)
+		self.assertIn('Indexed 1 question(s)', out.getvalue())
+		self.assertEqual(self.found('indexed'), [question.id])
+
+
+class ArchiveAttemptsTest(TestCase):
+	def setUp(self):
+		self.media = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media)
+		media = override_settings(MEDIA_ROOT=self.media)
+		media.enable()
+		self.addCleanup(media.disable)
+
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.ann = User.objects.create_user('ann', 'ann@example.com', 'pass12345')
+		self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass12345')
+		self.quiz = create_test_quiz(self.teacher, max_attempts=3)
+		self.question = Question.objects.create(quiz=self.quiz, question_text='Q', question_type='single')
+		self.right = AnswerOption.objects.create(question=self.question, option_text='Right', is_correct=True)
+		self.wrong = AnswerOption.objects.create(question=self.question, option_text='Wrong')
+
+		self.make_attempt(self.ann, 40, days_ago=400)
+		self.make_attempt(self.ann, 90, days_ago=390)
+		self.make_attempt(self.bob, 70, days_ago=380)
+		self.make_attempt(self.bob, 10, days_ago=3)
+		self.make_attempt(self.ann, 90, days_ago=2)
+
+	def make_attempt(self, student, percentage, days_ago):
+		attempt = QuizAttempt.objects.create(
+			quiz=self.quiz, student=student, is_completed=True,
+			score=percentage / 100, percentage=percentage, is_passed=percentage >= 50,
+		)
+		start = timezone.now() - timezone.timedelta(days=days_ago)
+		QuizAttempt.objects.filter(pk=attempt.pk).update(
+			start_time=start, end_time=start + timezone.timedelta(minutes=days_ago % 7 + 1),
+		)
+		attempt.refresh_from_db()
+		correct = percentage >= 50
+		answer = StudentAnswer.objects.create(attempt=attempt, question=self.question, is_correct=correct)
+		answer.select_options(self.right if correct else self.wrong)
+		return attempt
+
+	def analytics(self):
+		self.client.force_login(self.teacher)
+		context = self.client.get(reverse('quiz_analytics', args=[self.quiz.id])).context
+		return {
+			'total_attempts': context['total_attempts'],
+			'unique_students': context['unique_students'],
+			'avg_score': context['avg_score'],
+			'pass_rate': context['pass_rate'],
+			'avg_duration': context['avg_duration_minutes'],
+			'questions': [(q['total_answers'], q['correct_answers']) for q in context['question_analysis']],
+			'distribution': [r['count'] for r in context['score_distribution']],
+			'students': [
+				(p['student'].username, p['total_attempts'], float(p['best_score']), float(p['latest_score']),
+				 round(float(p['avg_score']), 2), p['passed'], float(p['improvement']))
+				for p in context['student_performance']
+			],
+		}
+
+	def archive(self):
+		out = io.StringIO()
+		call_command('archive_attempts', '--older-than-days', '365', '--batch-size', '1', stdout=out)
+		return out.getvalue()
+
+	def test_analytics_unchanged_by_archiving(self):
+		before = self.analytics()
+		self.assertIn('archived 3 attempt(s)', self.archive())
+		self.assertEqual(QuizAttempt.objects.filter(quiz=self.quiz).count(), 2)
+		self.assertEqual(self.analytics(), before)
+
+	def test_analytics_unchanged_while_deletes_are_pending(self):
+		before = self.analytics()
+		with mock.patch('quiz.archive.delete_archived_attempts'):
+			self.archive()
+		self.assertEqual(QuizAttempt.objects.filter(quiz=self.quiz).count(), 5)
+		self.assertEqual(self.analytics(), before)
+		# The next run finishes the deletes
+		self.assertIn('left over', self.archive())
+		self.assertEqual(QuizAttempt.objects.filter(quiz=self.quiz).count(), 2)
+		self.assertEqual(self.analytics(), before)
+
+	def test_archive_file_and_export(self):
+		self.archive()
+		archive = AttemptArchive.objects.get(quiz=self.quiz)
+		columns = read_archive_file(archive)
+		self.assertEqual(sorted(columns['percentage']), [40, 70, 90])
+		key_layouts = json.loads(str(columns['answer_keys']))
+		offsets = columns['packed_offsets']
+		for i, key_id in enumerate(columns['answer_key_id']):
+			blob = columns['packed_answers'][offsets[i]:offsets[i + 1]].tobytes()
+			(answer,) = unpack(blob, key_layouts[str(key_id)])
+			self.assertEqual(answer.is_correct, columns['is_passed'][i])
+
+		self.client.force_login(self.teacher)
+		response = self.client.get(reverse('export_quiz_analytics', args=[self.quiz.id]))
+		rows = list(csv.reader(io.StringIO(response.content.decode())))[1:]
+		self.assertEqual([row[4] for row in rows], ['90.00%', '10.00%', '70.0%', '90.0%', '40.0%'])
+		self.assertEqual([row[3] for row in rows], ['1'] * 5)
+
+	def test_export_uses_archived_paper_totals(self):
+		pooled = QuizAttempt.objects.filter(quiz=self.quiz, student=self.bob).earliest('start_time')
+		AttemptPaper.objects.create(attempt=pooled, question_ids=[self.question.id], total_marks=7)
+		self.archive()
+		self.client.force_login(self.teacher)
+		response = self.client.get(reverse('export_quiz_analytics', args=[self.quiz.id]))
+		rows = list(csv.reader(io.StringIO(response.content.decode())))[1:]
+		self.assertEqual([row[3] for row in rows], ['1', '1', '7', '1', '1'])
+
+	def test_archived_attempts_count_towards_max_attempts(self):
+		self.archive()
+		self.assertEqual(self.quiz.get_student_attempts_count(self.ann), 3)
+		self.assertFalse(self.quiz.can_attempt(self.ann)[0])
+		self.assertEqual(self.quiz.get_student_attempts_count(self.bob), 2)
+
+
+class AttemptStatusAsyncTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='student', password='pass12345')
+		self.quiz = create_test_quiz(self.user, duration_minutes=5)
+		self.attempt = QuizAttempt.objects.create(quiz=self.quiz, student=self.user)
+
+	async def test_status_served_by_async_view(self):
+		await self.async_client.aforce_login(self.user)
+		resp = await self.async_client.get(reverse('api_attempt_status', args=[self.attempt.id]))
+		self.assertEqual(resp.status_code, 200)
+		data = resp.json()
+		self.assertFalse(data['completed'])
+		self.assertTrue(295 <= data['remaining_seconds'] <= 300)
+
+	def test_other_students_attempt_is_not_found(self):
+		other = User.objects.create_user(username='other', password='pass12345')
+		self.client.force_login(other)
+		resp = self.client.get(reverse('check_quiz_time', args=[self.attempt.id]))
+		self.assertEqual(resp.status_code, 404)
+
+	def test_expired_attempt_is_submitted_on_time_check(self):
+		QuizAttempt.objects.filter(id=self.attempt.id).update(
+			start_time=timezone.now() - timezone.timedelta(minutes=6)
+		)
+		self.client.login(username='student', password='pass12345')
+		resp = self.client.get(reverse('check_quiz_time', args=[self.attempt.id]))
+		self.assertEqual(resp.json(), {'time_remaining': 0, 'expired': True, 'completed': True})
+		self.attempt.refresh_from_db()
+		self.assertTrue(self.attempt.is_completed)
+
+	def test_asgi_application_loads(self):
+		from quizapp.asgi import application
+		self.assertTrue(callable(application))
+
+
+class AttemptEventStreamTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='student', password='pass12345')
+		self.quiz = create_test_quiz(self.user, duration_minutes=5)
+		self.attempt = QuizAttempt.objects.create(quiz=self.quiz, student=self.user)
+
+	async def read_stream(self):
+		await self.async_client.aforce_login(self.user)
+		resp = await self.async_client.get(reverse('api_attempt_events', args=[self.attempt.id]))
+		self.assertEqual(resp['Content-Type'], 'text/event-stream')
+		return b''.join([chunk async for chunk in resp.streaming_content]).decode()
+
+	async def test_completed_attempt_sends_result_and_closes(self):
+		await QuizAttempt.objects.filter(id=self.attempt.id).aupdate(
+			is_completed=True, score=1, percentage=100, is_passed=True
+		)
+		body = await self.read_stream()
+		self.assertTrue(body.startswith('event: completed\n'))
+		self.assertIn('"percentage": 100.0', body)
+
+	async def test_expired_attempt_is_force_submitted(self):
+		await QuizAttempt.objects.filter(id=self.attempt.id).aupdate(
+			start_time=timezone.now() - timezone.timedelta(minutes=6)
+		)
+		with mock.patch('quiz.views.SSE_SUBMIT_GRACE_SECONDS', 0):
+			body = await self.read_stream()
+		self.assertIn('event: submitted\ndata: {"reason": "timeout"}', body)
+		self.assertIn('event: completed', body)
+		attempt = await QuizAttempt.objects.aget(id=self.attempt.id)
+		self.assertTrue(attempt.is_completed)
+
+	def test_wsgi_request_falls_back_to_polling(self):
+		self.client.force_login(self.user)
+		resp = self.client.get(reverse('api_attempt_events', args=[self.attempt.id]))
+		self.assertEqual(resp.status_code, 204)
+
+	def test_unpublishing_quiz_ends_open_attempts(self):
+		self.quiz.unpublish()
+		self.attempt.refresh_from_db()
+		self.assertTrue(self.attempt.is_completed)
+
+	def test_failed_publish_does_not_fail_grading(self):
+		backend = mock.Mock()
+		backend.publish.side_effect = ConnectionError('event bus down')
+		with mock.patch('quiz.events.get_event_backend', return_value=backend):
+			with self.assertLogs('django', 'ERROR'):
+				with self.captureOnCommitCallbacks(execute=True):
+					self.attempt.calculate_score()
+		self.attempt.refresh_from_db()
+		self.assertTrue(self.attempt.is_completed)
+		backend.publish.assert_called_once()
+
+
+class LocalEventBackendTest(TestCase):
+	async def test_publish_from_thread_reaches_subscriber(self):
+		backend = LocalEventBackend()
+		async with backend.subscribe('channel') as subscription:
+			await sync_to_async(backend.publish, thread_sensitive=False)('channel', {'event': 'ping'})
+			self.assertEqual(await subscription.get(timeout=1), {'event': 'ping'})
+			self.assertIsNone(await subscription.get(timeout=0.01))
+		self.assertEqual(dict(backend._subscribers), {})
+
+
+class OwnershipResolverTest(TestCase):
+	def setUp(self):
+		self.teacher = User.objects.create_user(username='teacher', password='pass12345', is_staff=True)
+		self.other = User.objects.create_user(username='other', password='pass12345', is_staff=True)
+		self.owned = [create_test_quiz(self.teacher, slug=f'owned-{i}') for i in range(3)]
+		self.foreign = [create_test_quiz(self.other, slug=f'foreign-{i}') for i in range(3)]
+
+	def test_ownership_resolved_with_single_query(self):
+		quizzes = Quiz.objects.filter(id__in=[q.id for q in self.owned + self.foreign])
+		quizzes = list(quizzes)
+		with self.assertNumQueries(1):
+			owned = {q.id for q in quizzes if q.is_owner(self.teacher)}
+			can_edit = [q.can_edit_quiz(self.teacher)[0] for q in quizzes]
+			can_delete = [q.can_delete_quiz(self.teacher)[0] for q in quizzes]
+		self.assertEqual(owned, {q.id for q in self.owned})
+		self.assertEqual(can_edit, can_delete)
+		self.assertEqual(sum(can_edit), 3)
+
+	def test_listing_hook_uses_resolved_ids(self):
+		from wagtail.admin.widgets.button import Button
+		from .wagtail_hooks import remove_edit_button_for_non_owners
+
+		pages = self.owned + self.foreign
+		results = []
+		with self.assertNumQueries(1):
+			for page in pages:
+				buttons = [Button('Edit', '/edit/'), Button('View', '/view/')]
+				remove_edit_button_for_non_owners(buttons, page, self.teacher)
+				results.append([b.label for b in buttons])
+		self.assertEqual(results[:3], [['Edit', 'View']] * 3)
+		self.assertEqual(results[3:], [['View']] * 3)
+
+	def test_new_quiz_invalidates_resolved_ids(self):
+		self.assertFalse(self.foreign[0].is_owner(self.teacher))
+		quiz = create_test_quiz(self.teacher, slug='created-later')
+		self.assertTrue(quiz.is_owner(self.teacher))
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class EmailLoginTest(TestCase):
+	def setUp(self):
+		self.student = User.objects.create_user(
+			username='student@example.com',
+			email='Student@Example.com',
+			password='pass12345',
+		)
+
+	def test_authenticate_is_case_insensitive_single_query(self):
+		with self.assertNumQueries(1):
+			user = authenticate(email='  STUDENT@example.com', password='pass12345')
+		self.assertEqual(user, self.student)
+		self.assertIsNone(authenticate(email='student@example.com', password='wrong'))
+		self.assertIsNone(authenticate(email='nobody@example.com', password='pass12345'))
+
+	def test_login_view(self):
+		response = self.client.post(reverse('student_login'), {
+			'email': 'student@EXAMPLE.com',
+			'password': 'pass12345',
+		})
+		self.assertRedirects(response, reverse('quiz_list'), fetch_redirect_response=False)
+
+	def test_password_rehashed_when_policy_changes(self):
+		self.assertIn('$1000$', self.student.password)
+		with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+			self.assertIsNotNone(authenticate(email='student@example.com', password='pass12345'))
+		self.student.refresh_from_db()
+		self.assertIn('$2000$', self.student.password)
+		self.assertIsNotNone(authenticate(email='student@example.com', password='pass12345'))
+
+	def test_email_unique_ignoring_case(self):
+		with self.assertRaises(IntegrityError), transaction.atomic():
+			User.objects.create_user(username='other', email='student@example.COM')
+		# Blank emails are not covered by the index
+		User.objects.create_user(username='admin1')
+		User.objects.create_user(username='admin2')
+
+	def test_lookup_uses_email_index(self):
+		User.objects.create_user(username='admin1')
+		self.assertFalse(users_with_email('').exists())
+		self.assertFalse(users_with_email('  ').exists())
+		if connection.vendor != 'sqlite':
+			self.skipTest('query plan checked on SQLite only')
+		sql, params = users_with_email('student@example.com').query.sql_with_params()
+		with connection.cursor() as cursor:
+			cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+			plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+		self.assertIn('quiz_auth_user_email_lower_uniq', plan)
+
+	def test_registration_rejects_email_in_other_case(self):
+		form = StudentRegistrationForm(data={
+			'email': 'STUDENT@example.com',
+			'first_name': 'A',
+			'last_name': 'B',
+			'password1': 'Unusual-pass-981',
+			'password2': 'Unusual-pass-981',
+		})
+		self.assertFalse(form.is_valid())
+		self.assertIn('email', form.errors)
+
+
+ROSTER_CSV = (
+	'Email,First_Name,Last_Name,Password\n'
+	'asha@example.com,Asha,Rao,Roster-pass-1\n'
+	'ben@example.com,Ben,Lee,\n'
+	'ASHA@example.com,Asha,Again,x\n'
+	'not-an-email,Bad,Row,x\n'
+	'existing@example.com,Already,There,x\n'
+)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class StudentRosterImportTest(TestCase):
+	def setUp(self):
+		User.objects.create_user(username='existing@example.com', email='Existing@example.com')
+		self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+
+	def assert_students_created(self):
+		group = Group.objects.get(name='Students')
+		asha = User.objects.get(email='asha@example.com')
+		ben = User.objects.get(email='ben@example.com')
+		self.assertEqual(asha.username, 'asha@example.com')
+		self.assertEqual(asha.get_full_name(), 'Asha Rao')
+		self.assertEqual(authenticate(email='asha@example.com', password='Roster-pass-1'), asha)
+		self.assertFalse(ben.has_usable_password())
+		self.assertEqual(set(group.user_set.values_list('email', flat=True)), {asha.email, ben.email})
+		self.assertEqual(StudentProfile.objects.filter(user__in=[asha, ben]).count(), 2)
+		self.assertEqual(User.objects.filter(email__iexact='asha@example.com').count(), 1)
+
+	def test_command(self):
+		with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+			f.write(ROSTER_CSV)
+		self.addCleanup(os.remove, f.name)
+
+		out = io.StringIO()
+		call_command('import_students', f.name, workers=1, stdout=out)
+		output = out.getvalue()
+		self.assertIn('Row 4: duplicate email', output)
+		self.assertIn('Row 5: invalid email', output)
+		self.assertIn('saving: 2/2', output)
+		self.assertIn('Skipped 1 student(s)', output)
+		self.assertIn('Created 2 student account(s)', output)
+		self.assert_students_created()
+
+	def test_admin_view_streams_progress(self):
+		self.client.force_login(self.admin)
+		upload = SimpleUploadedFile('roster.csv', ROSTER_CSV.encode('utf-8'), content_type='text/csv')
+		with mock.patch('quiz.roster.default_workers', return_value=1):
+			response = self.client.post(reverse('import_students'), {'csv_file': upload})
+			self.assertTrue(response.streaming)
+			content = b''.join(response.streaming_content).decode('utf-8')
+		self.assertIn('Hashing: 2 / 2', content)
+		self.assertIn('Created 2 student account(s).', content)
+		self.assertIn('duplicate email', content)
+		self.assert_students_created()
+
+	def test_email_taken_as_username_is_skipped(self):
+		User.objects.create_user(username='Ben@Example.com')
+		rows, _ = read_roster(ROSTER_CSV)
+		roster = RosterImport(rows, workers=1)
+		list(roster.run())
+		self.assertEqual(roster.result.created, 1)
+		self.assertEqual(roster.result.existing, ['ben@example.com', 'existing@example.com'])
+		self.assertTrue(User.objects.filter(username='asha@example.com').exists())
+
+	def test_admin_view_requires_permission(self):
+		staff = User.objects.create_user('staff', 'staff@example.com', 'pass12345', is_staff=True)
+		self.client.force_login(staff)
+		response = self.client.get(reverse('import_students'))
+		self.assertNotEqual(response.status_code, 200)
+		self.client.force_login(self.admin)
+		self.assertEqual(self.client.get(reverse('import_students')).status_code, 200)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class ReplicaRoutingTest(TransactionTestCase):
+	"""Reads routed to a second SQLite database that lags the primary"""
+
+	@classmethod
+	def setUpClass(cls):
+		cls.replica_dir = tempfile.mkdtemp()
+		cls.replica_path = os.path.join(cls.replica_dir, 'replica.sqlite3')
+		connections.settings['replica'] = connections.configure_settings({
+			'default': connections.settings['default'],
+			'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': cls.replica_path},
+		})['replica']
+		# Declared here rather than on the class so the test runner does not
+		# look for the alias before it exists
+		cls.databases = {'default', 'replica'}
+		super().setUpClass()
+
+	@classmethod
+	def tearDownClass(cls):
+		super().tearDownClass()
+		connections['replica'].close()
+		del connections.settings['replica']
+		shutil.rmtree(cls.replica_dir)
+
+	def setUp(self):
+		if not Page.get_first_root_node():
+			# The flush after the previous test removed the page tree created by migrations
+			Locale.objects.get_or_create(
+				language_code=get_supported_content_language_variant(settings.LANGUAGE_CODE)
+			)
+			Page.add_root(instance=Page(title='Root', slug='root'))
+		self.teacher = User.objects.create_superuser('teacher', 'teacher@example.com', 'pass12345')
+		self.student = User.objects.create_user('student@example.com', 'student@example.com', 'pass12345')
+		self.profile = StudentProfile.objects.create(user=self.student)
+		self.quiz = create_test_quiz(self.teacher, slug='replica-quiz')
+		self.complete_attempt()
+		self.replicate()
+		# Written after the last replication, so only the primary has it
+		self.complete_attempt()
+
+	def complete_attempt(self):
+		QuizAttempt.objects.create(
+			quiz=self.quiz, student=self.student, is_completed=True,
+			end_time=timezone.now(), percentage=80, is_passed=True,
+		)
+
+	def replicate(self):
+		connections['replica'].close()
+		target = sqlite3.connect(self.replica_path)
+		connections['default'].ensure_connection()
+		connections['default'].connection.backup(target)
+		target.close()
+
+	def test_statistics_read_from_replica(self):
+		self.assertEqual(QuizAttempt.objects.filter(student=self.student).count(), 2)
+		self.assertEqual(self.profile.get_quiz_statistics()['total_attempts'], 1)
+
+	def test_dashboard_reads_replica(self):
+		client = Client()
+		client.force_login(self.student)
+		response = client.get(reverse('student_dashboard'))
+		self.assertEqual(response.context['total_attempts'], 1)
+		self.assertNotIn(PIN_COOKIE, response.cookies)
+
+	def test_dashboard_reads_primary_after_user_writes(self):
+		client = Client()
+		# Logging in writes last_login, which pins this browser to the primary
+		response = client.post(reverse('student_login'), {
+			'email': 'student@example.com',
+			'password': 'pass12345',
+		})
+		self.assertIn(PIN_COOKIE, response.cookies)
+		response = client.get(reverse('student_dashboard'))
+		self.assertEqual(response.context['total_attempts'], 2)
@@ -17,9 +17,11 @@ urlpatterns = [
     # New AJAX API endpoints for fully backend-driven attempt flow
     path('attempt/<int:attempt_id>/api/questions/', views.api_attempt_questions, name='api_attempt_questions'),
     path('attempt/<int:attempt_id>/api/status/', views.api_attempt_status, name='api_attempt_status'),
+    path('attempt/<int:attempt_id>/api/events/', views.api_attempt_events, name='api_attempt_events'),
     path('attempt/<int:attempt_id>/api/question/<int:question_id>/', views.api_attempt_question, name='api_attempt_question'),
     path('attempt/<int:attempt_id>/api/question/<int:question_id>/answer/', views.api_save_answer, name='api_save_answer'),
     path('attempt/<int:attempt_id>/api/finalize/', views.api_finalize_attempt, name='api_finalize_attempt'),
+    path('attempt/<int:attempt_id>/api/proctoring/', views.api_attempt_proctoring, name='api_attempt_proctoring'),
     path('<int:quiz_id>/analytics/', views.quiz_analytics, name='quiz_analytics'),
     path('<int:quiz_id>/analytics/export/', views.export_quiz_analytics, name='export_quiz_analytics'),
 ]
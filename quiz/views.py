@@ -3,17 +3,31 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.utils import timezone
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, Sum
+from quizapp.caching import invalidated_timeout
+from quizapp.db_routers import read_from_replica
 from .models import Quiz, QuizAttempt, StudentAnswer, Question, AnswerOption
 from .forms import StudentRegistrationForm, TeacherRegistrationForm, LoginForm
+from .archive import StudentRollup, archived_attempts, archived_rollup
+from .availability import attempt_counts, available_quizzes
+from .collusion import collusion_report
+from .item_analysis import item_analysis
+from .leaderboard import leaderboard_size, student_rank, top_entries
+from .events import attempt_channel, completion_data, get_event_backend
+from .ownership import is_quiz_owner
+from .packing import attempt_answers, question_totals
+from .proctoring import parse_events
 import random
 import csv
+import json
 from django.views.decorators.http import require_POST, require_GET
 from django.forms.models import model_to_dict
 from django.db import transaction
 from wagtail.rich_text import expand_db_html
+from asgiref.sync import sync_to_async
 
 
 def student_register(request):
@@ -67,12 +81,8 @@ def student_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
         
-        # Try to get user by email
-        try:
-            user_obj = User.objects.get(email=email)
-            user = authenticate(request, username=user_obj.username, password=password)
-        except User.DoesNotExist:
-            user = None
+        # EmailBackend looks the user up by lower(email) and verifies the password
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
             login(request, user)
@@ -99,27 +109,22 @@ def student_logout(request):
 @login_required
 def quiz_list(request):
     """Display all available quizzes for students"""
-    quizzes = Quiz.objects.live().filter(is_active=True)
+    # Cached until the next quiz opens or closes (see quiz/availability.py)
+    quizzes = available_quizzes()
+    attempts_counts = attempt_counts(request.user, quizzes)
     
     quiz_data = []
     for quiz in quizzes:
-        can_attempt, message = quiz.can_attempt(request.user)
-        attempts = QuizAttempt.objects.filter(
-            quiz=quiz,
-            student=request.user
-        ).order_by('-start_time')
-        
-        best_attempt = attempts.filter(is_completed=True).order_by('-percentage').first()
+        can_attempt, message = quiz.can_attempt(attempts_counts[quiz.id])
         
         # Check if user can view analytics for this quiz
-        can_view_analytics = request.user.is_staff and (request.user.is_superuser or quiz.is_owner(request.user))
+        can_view_analytics = request.user.is_staff and (request.user.is_superuser or is_quiz_owner(request.user, quiz.id))
         
         quiz_data.append({
             'quiz': quiz,
             'can_attempt': can_attempt,
             'message': message,
-            'attempts_count': attempts.count(),
-            'last_attempt': attempts.first(),
+            'attempts_count': attempts_counts[quiz.id],
             'can_view_analytics': can_view_analytics
         })
     
@@ -133,7 +138,15 @@ def quiz_list(request):
 def quiz_detail(request, quiz_id):
     """Display quiz details before starting"""
     quiz = get_object_or_404(Quiz, id=quiz_id)
-    
+    return render_quiz_detail(request, quiz)
+
+
+# quiz_detail.html fragments; purged when the quiz or its questions change (quiz/signals.py)
+DETAIL_FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+
+def render_quiz_detail(request, quiz):
+    """The quiz detail page, for ``quiz_detail`` and the quiz's own Wagtail URL (Quiz.serve)"""
     can_attempt, message = quiz.can_attempt(request.user)
     
     attempts = QuizAttempt.objects.filter(
@@ -146,12 +159,14 @@ def quiz_detail(request, quiz_id):
     
     context = {
         'quiz': quiz,
+        'page': quiz,
         'can_attempt': can_attempt,
         'message': message,
         'attempts': attempts,
-        'total_marks': quiz.get_total_marks(),
-        'can_view_analytics': can_view_analytics
+        'can_view_analytics': can_view_analytics,
+        'fragment_timeout': invalidated_timeout(DETAIL_FRAGMENT_TIMEOUT),
     }
+    # The description and quiz information are cached per published revision
     return render(request, 'quiz/quiz_detail.html', context)
 
 
@@ -166,11 +181,13 @@ def start_quiz(request, quiz_id):
         messages.error(request, message)
         return redirect('quiz_detail', quiz_id=quiz_id)
     
-    # Create new attempt
-    attempt = QuizAttempt.objects.create(
-        quiz=quiz,
-        student=request.user
-    )
+    # Create new attempt and draw its questions
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz,
+            student=request.user
+        )
+        attempt.create_paper()
     
     return redirect('take_quiz', attempt_id=attempt.id)
 
@@ -198,11 +215,8 @@ def take_quiz(request, attempt_id):
         attempt.calculate_score()
         return redirect('quiz_result', attempt_id=attempt_id)
     
-    questions = list(quiz.questions.all())
-    
-    # Randomize questions if enabled
-    if quiz.randomize_questions:
-        random.shuffle(questions)
+    # The attempt's paper, already shuffled if the quiz randomizes questions
+    questions = attempt.get_questions()
     
     if request.method == 'POST':
         # Check time again before processing submission
@@ -220,6 +234,7 @@ def take_quiz(request, attempt_id):
                 text_answer = request.POST.get(f'question_{question.id}', '')
                 answer, created = StudentAnswer.objects.get_or_create(
                     attempt=attempt,
+                    attempt_start_time=attempt.start_time,
                     question=question
                 )
                 answer.text_answer = text_answer
@@ -231,6 +246,7 @@ def take_quiz(request, attempt_id):
                 
                 answer, created = StudentAnswer.objects.get_or_create(
                     attempt=attempt,
+                    attempt_start_time=attempt.start_time,
                     question=question
                 )
                 answer.selected_options.clear()
@@ -239,7 +255,7 @@ def take_quiz(request, attempt_id):
                 for option_id in selected_option_ids:
                     try:
                         option = AnswerOption.objects.get(id=option_id, question=question)
-                        answer.selected_options.add(option)
+                        answer.select_options(option)
                         valid_options.append(option.option_text)
                     except AnswerOption.DoesNotExist:
                         print(f"DEBUG: Form submission - Invalid option ID {option_id} for question {question.id}")
@@ -260,15 +276,8 @@ def take_quiz(request, attempt_id):
         'quiz': quiz,
         'questions': questions,
         'time_remaining_seconds': int(time_remaining),
-        # Security settings
-        # Security settings - Always enforced
-        'monitor_tab_switching': True,
-        'max_tab_switches': quiz.max_tab_switches if quiz.max_tab_switches > 0 else 3,
-        'auto_submit_on_violations': True,
-        'enable_fullscreen': True,
-        'disable_right_click': True,
-        'disable_copy_paste': True,
-        'prevent_browser_back': True,
+        # Security settings - Always enforced, also by api_attempt_proctoring
+        **quiz.get_security_settings(),
     }
     return render(request, 'quiz/take_quiz.html', context)
 
@@ -298,44 +307,39 @@ def _serialize_question(question, include_options=True, shuffle_seed=None):
         data['options'] = [_serialize_option(o) for o in opts]
     return data
 
-def _ensure_question_order(session, attempt, questions, shuffle=False):
-    key = f"attempt_{attempt.id}_order"
-    if key not in session:
-        q_ids = [q.id for q in questions]
-        if shuffle:
-            random.shuffle(q_ids)
-        session[key] = q_ids
-        session.modified = True
-    return session[key]
-
 @login_required
 @require_GET
 def api_attempt_questions(request, attempt_id):
     attempt = get_object_or_404(QuizAttempt, id=attempt_id, student=request.user)
-    quiz = attempt.quiz
-    base_qs = list(quiz.questions.all())
-    if quiz.randomize_questions:
-        # deterministic per session: shuffle copy only on first retrieval
-        _ensure_question_order(request.session, attempt, base_qs, shuffle=True)
-        ordered_ids = request.session.get(f"attempt_{attempt.id}_order")
-        id_to_q = {q.id: q for q in base_qs}
-        questions = [id_to_q[i] for i in ordered_ids if i in id_to_q]
-    else:
-        questions = base_qs
+    # The paper's order is fixed when the attempt starts
+    questions = attempt.get_questions()
     data = [_serialize_question(q, include_options=False) for q in questions]
     return JsonResponse({'questions': data})
 
+def _get_paper_question(attempt, question_id):
+    """The question ``question_id`` if it is on the attempt's paper, else 404"""
+    if question_id not in attempt.get_question_ids():
+        raise Http404('Question is not on this attempt\'s paper')
+    return get_object_or_404(Question, id=question_id, quiz=attempt.quiz)
+
+async def _aget_attempt(request, attempt_id):
+    """Async counterpart of get_object_or_404 for the current student's attempt"""
+    user = await request.auser()
+    try:
+        return await QuizAttempt.objects.select_related('quiz').aget(id=attempt_id, student=user)
+    except QuizAttempt.DoesNotExist:
+        raise Http404('No QuizAttempt matches the given query.')
+
 @login_required
 @require_GET
-def api_attempt_status(request, attempt_id):
-    attempt = get_object_or_404(QuizAttempt, id=attempt_id, student=request.user)
+async def api_attempt_status(request, attempt_id):
+    # Async so that, under ASGI, the many concurrent exam tabs polling this
+    # endpoint wait on the database without each holding a worker thread
+    attempt = await _aget_attempt(request, attempt_id)
     quiz = attempt.quiz
-    time_elapsed = (timezone.now() - attempt.start_time).total_seconds()
-    limit = quiz.duration_minutes * 60
-    remaining = max(0, int(limit - time_elapsed))
     data = {
         'completed': attempt.is_completed,
-        'remaining_seconds': remaining,
+        'remaining_seconds': int(attempt.get_time_remaining()),
     }
     
     if quiz.show_results_immediately:
@@ -351,14 +355,71 @@ def api_attempt_status(request, attempt_id):
         
     return JsonResponse(data)
 
+# Seconds between timer events on an idle stream
+SSE_HEARTBEAT_SECONDS = 30
+# How long after expiry the server waits for the page to submit itself
+# (saving the current answer first) before it force-submits the attempt
+SSE_SUBMIT_GRACE_SECONDS = 5
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _attempt_event_stream(attempt_id):
+    async with get_event_backend().subscribe(attempt_channel(attempt_id)) as subscription:
+        # Read the attempt after subscribing so no event can slip in between
+        attempt = await QuizAttempt.objects.select_related('quiz').aget(id=attempt_id)
+        while not attempt.is_completed:
+            remaining = attempt.get_time_remaining()
+            if remaining > 0:
+                yield _sse('time', {'remaining_seconds': int(remaining)})
+                timeout = min(SSE_HEARTBEAT_SECONDS, remaining)
+            else:
+                timeout = SSE_SUBMIT_GRACE_SECONDS
+            
+            message = await subscription.get(timeout=timeout)
+            if message is not None:
+                yield _sse(message['event'], message['data'])
+                if message['event'] == 'completed':
+                    return
+                continue
+            
+            if remaining <= 0:
+                attempt = await QuizAttempt.objects.select_related('quiz').aget(id=attempt_id)
+                if not attempt.is_completed:
+                    yield _sse('submitted', {'reason': 'timeout'})
+                    await sync_to_async(attempt.calculate_score)()
+        
+        yield _sse('completed', completion_data(attempt))
+
+@login_required
+@require_GET
+async def api_attempt_events(request, attempt_id):
+    """
+    Server-sent events for an attempt: 'time' (authoritative remaining time),
+    'submitted' (forced submission on timeout or when the teacher ends the
+    quiz) and 'completed' (final result), after which the stream closes.
+    """
+    attempt = await _aget_attempt(request, attempt_id)
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI Django buffers an async stream until it ends, so tell the
+        # page to keep polling instead (EventSource does not retry a 204)
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(
+        _attempt_event_stream(attempt.id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 @require_GET
 def api_attempt_question(request, attempt_id, question_id):
     attempt = get_object_or_404(QuizAttempt, id=attempt_id, student=request.user)
     if attempt.is_completed:
         return JsonResponse({'error': 'Attempt completed'}, status=400)
-    question = get_object_or_404(Question, id=question_id, quiz=attempt.quiz)
-    answer = StudentAnswer.objects.filter(attempt=attempt, question=question).first()
+    question = _get_paper_question(attempt, question_id)
+    answer = StudentAnswer.objects.for_attempt(attempt).filter(question=question).first()
     selected = []
     text_answer = ''
     if answer:
@@ -382,8 +443,10 @@ def api_save_answer(request, attempt_id, question_id):
     if elapsed >= quiz.duration_minutes * 60:
         attempt.calculate_score()
         return JsonResponse({'error': 'Time expired', 'expired': True}, status=400)
-    question = get_object_or_404(Question, id=question_id, quiz=quiz)
-    answer, _ = StudentAnswer.objects.get_or_create(attempt=attempt, question=question)
+    question = _get_paper_question(attempt, question_id)
+    answer, _ = StudentAnswer.objects.get_or_create(
+        attempt=attempt, attempt_start_time=attempt.start_time, question=question
+    )
     if question.question_type == 'short_answer':
         answer.text_answer = request.POST.get('text_answer', '')
         answer.save()
@@ -402,7 +465,7 @@ def api_save_answer(request, attempt_id, question_id):
     for oid in filtered:
         try:
             opt = AnswerOption.objects.get(id=oid, question=question)
-            answer.selected_options.add(opt)
+            answer.select_options(opt)
             valid_ids.append(opt.id)
         except AnswerOption.DoesNotExist:
             continue
@@ -446,9 +509,32 @@ def api_finalize_attempt(request, attempt_id):
 
 
 @login_required
-def check_quiz_time(request, attempt_id):
+@require_POST
+def api_attempt_proctoring(request, attempt_id):
+    """Record a batch of proctoring events; the attempt is auto-submitted once its violations reach the limit"""
+    attempt = get_object_or_404(QuizAttempt.objects.select_related('quiz'), id=attempt_id, student=request.user)
+    if attempt.is_completed:
+        return JsonResponse({'error': 'Attempt completed'}, status=400)
+    try:
+        events = parse_events(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    finalized = attempt.record_proctoring_events(events)
+    response_data = {
+        'recorded': len(events),
+        'violations': attempt.violation_count,
+        'max_violations': attempt.quiz.get_security_settings()['max_tab_switches'],
+        'finalized': finalized,
+    }
+    if finalized:
+        response_data['redirect_url'] = redirect('quiz_result', attempt_id=attempt.id).url
+    return JsonResponse(response_data)
+
+
+@login_required
+async def check_quiz_time(request, attempt_id):
     """API endpoint to check remaining time for a quiz attempt"""
-    attempt = get_object_or_404(QuizAttempt, id=attempt_id, student=request.user)
+    attempt = await _aget_attempt(request, attempt_id)
     
     if attempt.is_completed:
         return JsonResponse({
@@ -457,14 +543,11 @@ def check_quiz_time(request, attempt_id):
             'completed': True
         })
     
-    quiz = attempt.quiz
-    time_elapsed = (timezone.now() - attempt.start_time).total_seconds()
-    time_limit = quiz.duration_minutes * 60
-    time_remaining = max(0, time_limit - time_elapsed)
+    time_remaining = attempt.get_time_remaining()
     
     # Auto-submit if time expired
     if time_remaining <= 0:
-        attempt.calculate_score()
+        await sync_to_async(attempt.calculate_score)()
     
     return JsonResponse({
         'time_remaining': int(time_remaining),
@@ -498,8 +581,8 @@ def save_quiz_progress(request, attempt_id):
         return JsonResponse({'error': 'Question ID required'}, status=400)
     
     try:
-        question = Question.objects.get(id=question_id, quiz=quiz)
-    except Question.DoesNotExist:
+        question = Question.objects.get(id=question_id, quiz=quiz, id__in=attempt.get_question_ids())
+    except (Question.DoesNotExist, ValueError):
         return JsonResponse({'error': 'Invalid question'}, status=400)
     
     # Save answer
@@ -507,6 +590,7 @@ def save_quiz_progress(request, attempt_id):
         text_answer = request.POST.get('text_answer', '')
         answer, created = StudentAnswer.objects.get_or_create(
             attempt=attempt,
+            attempt_start_time=attempt.start_time,
             question=question
         )
         answer.text_answer = text_answer
@@ -517,6 +601,7 @@ def save_quiz_progress(request, attempt_id):
         
         answer, created = StudentAnswer.objects.get_or_create(
             attempt=attempt,
+            attempt_start_time=attempt.start_time,
             question=question
         )
         answer.selected_options.clear()
@@ -525,7 +610,7 @@ def save_quiz_progress(request, attempt_id):
         for option_id in selected_option_ids:
             try:
                 option = AnswerOption.objects.get(id=option_id, question=question)
-                answer.selected_options.add(option)
+                answer.select_options(option)
                 valid_options.append(option.option_text)
             except AnswerOption.DoesNotExist:
                 print(f"DEBUG: Invalid option ID {option_id} for question {question_id}")
@@ -548,16 +633,21 @@ def quiz_result(request, attempt_id):
     
     # Get all answers with details only if results are shown immediately
     answers = []
+    leaderboard_rank = None
     if attempt.quiz.show_results_immediately:
-        for answer in attempt.answers.all():
-            question = answer.question
-            correct_options = question.options.filter(is_correct=True)
-            selected_options = answer.selected_options.all()
-            
+        # The student's standing by their best attempt so far
+        leaderboard_rank = student_rank(attempt.quiz, request.user.id)
+        questions = {q.id: q for q in attempt.get_questions(Question.objects.prefetch_related('options'))}
+        order = {question_id: index for index, question_id in enumerate(questions)}
+        for answer in sorted(attempt_answers(attempt), key=lambda a: order.get(a.question_id, 0)):
+            question = questions.get(answer.question_id)
+            if question is None:
+                continue
+            options = question.options.all()
             answers.append({
                 'question': question,
-                'selected_options': selected_options,
-                'correct_options': correct_options,
+                'selected_options': [o for o in options if o.id in answer.selected_option_ids],
+                'correct_options': [o for o in options if o.is_correct],
                 'is_correct': answer.is_correct,
                 'text_answer': answer.text_answer
             })
@@ -566,12 +656,15 @@ def quiz_result(request, attempt_id):
         'attempt': attempt,
         'quiz': attempt.quiz,
         'answers': answers,
-        'show_answers': attempt.quiz.show_results_immediately
+        'show_answers': attempt.quiz.show_results_immediately,
+        'leaderboard_rank': leaderboard_rank,
+        'leaderboard_size': leaderboard_size(attempt.quiz) if leaderboard_rank else 0,
     }
     return render(request, 'quiz/quiz_result.html', context)
 
 
 @login_required
+@read_from_replica()
 def student_dashboard(request):
     """Student dashboard with statistics and recent attempts"""
     user = request.user
@@ -590,7 +683,7 @@ def student_dashboard(request):
     avg_percentage = visible_attempts.aggregate(Avg('percentage'))['percentage__avg'] or 0
     
     # Recent attempts
-    recent_attempts = attempts.order_by('-start_time')[:10]
+    recent_attempts = attempts.select_related('quiz', 'paper').order_by('-start_time')[:10]
     
     # Quiz-wise performance
     quiz_performance = []
@@ -627,6 +720,10 @@ def student_dashboard(request):
 
 
 # Analytics views for teachers (accessible from admin)
+
+# Suspicious pairs listed on the analytics page
+ANALYTICS_SUSPICIOUS_PAIRS = 20
+
 def format_duration_with_seconds(duration_minutes):
     """Helper function to format duration in minutes to h:m:s format"""
     total_seconds = duration_minutes * 60
@@ -642,6 +739,7 @@ def format_duration_with_seconds(duration_minutes):
         return f"{seconds}s"
 
 @login_required
+@read_from_replica()
 def quiz_analytics(request, quiz_id):
     """Analytics for a specific quiz - Enhanced with comprehensive statistics"""
     if not request.user.is_staff:
@@ -656,36 +754,31 @@ def quiz_analytics(request, quiz_id):
         messages.error(request, 'You can only view analytics for quizzes you created.')
         return redirect('quiz_list')
     
-    # Get all completed attempts
-    attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).select_related('student')
+    # Get all completed attempts; archived ones are merged in from their rollups
+    attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).unarchived(quiz).select_related('student', 'paper')
+    archived = archived_rollup(quiz)
     
     # Basic Statistics
-    total_attempts = attempts.count()
-    unique_students = attempts.values('student').distinct().count()
-    avg_score = attempts.aggregate(Avg('percentage'))['percentage__avg'] or 0
-    pass_rate = (attempts.filter(is_passed=True).count() / total_attempts * 100) if total_attempts > 0 else 0
-    
-    # Get best attempt per student (for unique student analysis)
-    from django.db.models import Max
-    best_attempts_per_student = []
     # Use set to ensure unique student IDs, avoiding duplicates from default ordering
     student_ids = set(attempts.values_list('student_id', flat=True))
+    total_attempts = attempts.count() + archived.attempt_count
+    unique_students = len(student_ids | set(archived.students))
+    percentage_sum = float(attempts.aggregate(Sum('percentage'))['percentage__sum'] or 0) + archived.percentage_sum
+    avg_score = percentage_sum / total_attempts if total_attempts > 0 else 0
+    passed_count = attempts.filter(is_passed=True).count() + archived.passed_count
+    pass_rate = (passed_count / total_attempts * 100) if total_attempts > 0 else 0
+    
+    # Best attempt per student, ranked by the quiz's leaderboard
+    # (higher percentage first, then earlier submission time)
+    top_10_percent_count = max(1, int(leaderboard_size(quiz) * 0.1))
+    leaders = top_entries(quiz, top_10_percent_count)
+    leader_attempts = QuizAttempt.objects.select_related('student', 'paper').in_bulk([e.attempt_id for e in leaders])
     
-    for student_id in student_ids:
-        student_attempts = attempts.filter(student_id=student_id)
-        best_attempt = student_attempts.order_by('-percentage', 'end_time').first()
-        if best_attempt:
-            best_attempts_per_student.append(best_attempt)
-    
-    # Sort by percentage for ranking (Higher percentage first, then earlier submission time)
-    best_attempts_per_student.sort(key=lambda x: (-x.percentage, x.end_time))
+    # Top 10% Students
+    top_10_percent = [leader_attempts[e.attempt_id] for e in leaders if e.attempt_id in leader_attempts]
     
     # Top Performer (Highest Score)
-    topper = best_attempts_per_student[0] if best_attempts_per_student else None
-    
-    # Top 10% Students
-    top_10_percent_count = max(1, int(len(best_attempts_per_student) * 0.1))
-    top_10_percent = best_attempts_per_student[:top_10_percent_count]
+    topper = top_10_percent[0] if top_10_percent else None
     
     # Time Analysis - Calculate duration for each attempt
     time_analysis = []
@@ -718,37 +811,37 @@ def quiz_analytics(request, quiz_id):
     slowest_attempts = time_analysis[-5:][::-1] if time_analysis else []
     
     # Average completion time
-    avg_duration = sum([t['duration_minutes'] for t in time_analysis]) / len(time_analysis) if time_analysis else 0
+    duration_count = len(time_analysis) + archived.attempt_count
+    duration_sum = sum([t['duration_minutes'] for t in time_analysis]) + archived.duration_seconds_sum / 60
+    avg_duration = duration_sum / duration_count if duration_count else 0
     
     # Question-wise analysis
     question_analysis = []
-    for question in quiz.questions.all():
-        answers = StudentAnswer.objects.filter(
-            attempt__in=attempts,
-            question=question
-        )
-        
-        total_answers = answers.count()
-        correct_answers = 0
-        
-        for answer in answers:
-            if question.question_type in ['single', 'true_false']:
-                if answer.selected_options.filter(is_correct=True).exists():
-                    correct_answers += 1
-            elif question.question_type == 'multiple':
-                selected = set(answer.selected_options.all())
-                correct = set(question.options.filter(is_correct=True))
-                if selected == correct:
-                    correct_answers += 1
-        
+    totals = question_totals(quiz, attempts)
+    for question_id, (answered, correct) in archived.question_totals.items():
+        previous = totals.get(question_id, (0, 0))
+        totals[question_id] = (previous[0] + answered, previous[1] + correct)
+    # Item statistics over the attempts still held in full (cached per answer key)
+    items = item_analysis(quiz)
+    for question in quiz.questions.prefetch_related('options'):
+        total_answers, correct_answers = totals.get(question.id, (0, 0))
         accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
+        item = items.items.get(question.id, {})
+        options = {option.id: option for option in question.options.all()}
         
         question_analysis.append({
             'question': question,
             'total_answers': total_answers,
             'correct_answers': correct_answers,
             'accuracy': round(accuracy, 2),
-            'difficulty': 'Easy' if accuracy >= 70 else 'Medium' if accuracy >= 40 else 'Hard'
+            'difficulty': 'Easy' if accuracy >= 70 else 'Medium' if accuracy >= 40 else 'Hard',
+            'difficulty_index': item.get('difficulty'),
+            'discrimination': item.get('discrimination'),
+            'point_biserial': item.get('point_biserial'),
+            'option_counts': [
+                dict(choice, option=options[choice['option_id']])
+                for choice in item.get('options', []) if choice['option_id'] in options
+            ],
         })
     
     # Score distribution
@@ -759,34 +852,48 @@ def quiz_analytics(request, quiz_id):
         {'range': '60-80%', 'count': attempts.filter(percentage__gte=60, percentage__lt=80).count(), 'label': 'Good'},
         {'range': '80-100%', 'count': attempts.filter(percentage__gte=80).count(), 'label': 'Excellent'},
     ]
+    for score_range, archived_count in zip(score_ranges, archived.score_distribution):
+        score_range['count'] += archived_count
+    
+    # Student Performance Summary (all attempts per student, archived ones included)
+    rollups = {}
+    for attempt in attempts:
+        rollup = rollups.setdefault(attempt.student_id, StudentRollup(attempt.student_id))
+        rollup.add(attempt.percentage or 0, attempt.is_passed, attempt.start_time, attempt.end_time)
+    for student_id, archived_student in archived.students.items():
+        rollups.setdefault(student_id, StudentRollup(student_id)).merge(archived_student)
+    students = User.objects.in_bulk(list(rollups))
     
-    # Student Performance Summary (all attempts per student)
     student_performance = []
-    for student_id in student_ids:
-        student_attempts = attempts.filter(student_id=student_id)
-        student = student_attempts.first().student
-        # Get best attempt based on percentage (desc) and then end_time (asc)
-        # Note: We can't easily sort by two fields in different directions in one ORM call if we want strict control
-        # So we fetch all and sort in python or use multiple order_by
-        # For finding the "best" attempt for a student, usually it's just max score. 
-        # If scores are tied, the one with earlier completion is "better".
-        best_attempt = student_attempts.order_by('-percentage', 'end_time').first()
-        latest_attempt = student_attempts.order_by('-start_time').first()
-        
+    for student_id, rollup in rollups.items():
         student_performance.append({
-            'student': student,
-            'total_attempts': student_attempts.count(),
-            'best_score': best_attempt.percentage,
-            'best_attempt_end_time': best_attempt.end_time,
-            'latest_score': latest_attempt.percentage,
-            'avg_score': student_attempts.aggregate(Avg('percentage'))['percentage__avg'],
-            'passed': best_attempt.is_passed,
-            'improvement': latest_attempt.percentage - student_attempts.order_by('start_time').first().percentage if student_attempts.count() > 1 else 0
+            'student': students[student_id],
+            'total_attempts': rollup.attempts,
+            'best_score': rollup.best_percentage,
+            'best_attempt_end_time': rollup.best_end_time,
+            'latest_score': rollup.latest_percentage,
+            'avg_score': rollup.avg_percentage,
+            'passed': rollup.best_passed,
+            'improvement': rollup.improvement
         })
     
     # Sort by best score (desc) and then best attempt end time (asc)
     student_performance.sort(key=lambda x: (-x['best_score'], x['best_attempt_end_time']))
     
+    # Pairs of attempts with suspiciously similar answers, from the last report
+    collusion, collusion_stale = collusion_report(quiz)
+    shown_pairs = collusion.pairs[:ANALYTICS_SUSPICIOUS_PAIRS] if collusion else []
+    pair_students = User.objects.in_bulk({student_id for pair in shown_pairs for student_id in pair.student_ids})
+    suspicious_pairs = [
+        {
+            'pair': pair,
+            'students': [pair_students.get(student_id) for student_id in pair.student_ids],
+            'start_gap': format_duration_with_seconds(pair.start_gap.total_seconds() / 60),
+            'end_gap': format_duration_with_seconds(pair.end_gap.total_seconds() / 60),
+        }
+        for pair in shown_pairs
+    ]
+    
     # Recent attempts
     recent_attempts = attempts.order_by('-start_time')[:20]
     
@@ -810,6 +917,12 @@ def quiz_analytics(request, quiz_id):
         
         # Question Analysis
         'question_analysis': question_analysis,
+        'item_attempts': items.attempts,
+        'reliability': items.reliability,
+        'suspicious_pairs': suspicious_pairs,
+        'suspicious_pair_count': len(collusion.pairs) if collusion else 0,
+        'collusion_report': collusion,
+        'collusion_stale': collusion_stale,
         'score_distribution': score_ranges,
         
         # Student Performance
@@ -820,6 +933,7 @@ def quiz_analytics(request, quiz_id):
 
 
 @login_required
+@read_from_replica()
 def export_quiz_analytics(request, quiz_id):
     """Export quiz analytics to CSV/Excel"""
     if not request.user.is_staff:
@@ -842,20 +956,38 @@ def export_quiz_analytics(request, quiz_id):
     writer.writerow(['Student Email', 'Student Name', 'Score', 'Total Marks', 'Percentage', 'Status', 'Date Time'])
     
     # Get completed attempts
-    attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).select_related('student').order_by('-start_time')
+    attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).unarchived(quiz).select_related('student', 'paper').order_by('-start_time')
     
-    total_marks = quiz.get_total_marks()
+    quiz_total_marks = quiz.get_total_marks()
     
-    for attempt in attempts:
+    def write_attempt(student, score, total_marks, percentage, is_passed, end_time):
         writer.writerow([
-            attempt.student.email,
-            attempt.student.get_full_name() or attempt.student.username,
-            attempt.score,
+            student.email,
+            student.get_full_name() or student.username,
+            score,
             total_marks,
-            f"{attempt.percentage}%",
-            "Passed" if attempt.is_passed else "Failed",
-            attempt.end_time.strftime("%Y-%m-%d %H:%M:%S") if attempt.end_time else "N/A"
+            f"{percentage}%",
+            "Passed" if is_passed else "Failed",
+            end_time.strftime("%Y-%m-%d %H:%M:%S") if end_time else "N/A"
         ])
+    
+    for attempt in attempts:
+        write_attempt(
+            attempt.student, attempt.score, attempt.get_total_marks(),
+            attempt.percentage, attempt.is_passed, attempt.end_time,
+        )
+    
+    # Archived attempts are older than every remaining one; read them back from the archive files
+    for archive in quiz.attempt_archives.order_by('-cutoff'):
+        rows = list(archived_attempts(archive))
+        students = User.objects.in_bulk({row['student_id'] for row in rows})
+        for row in rows:
+            if row['student_id'] in students:
+                write_attempt(
+                    students[row['student_id']], row['score'],
+                    quiz_total_marks if row['total_marks'] is None else row['total_marks'], row['percentage'],
+                    row['is_passed'], row['end_time'],
+                )
         
     return response
 
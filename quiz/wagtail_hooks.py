@@ -1,12 +1,19 @@
 from django.contrib import messages
-from django.http import HttpResponseRedirect
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import path, reverse
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from wagtail import hooks
 from wagtail.models import Page
 from wagtail.admin import messages as wagtail_messages
+from wagtail.admin.menu import MenuItem
 from .models import Quiz, Question, AnswerOption
+from .ownership import is_quiz_owner, owned_quiz_ids
+from .question_search import search_questions
+from .regrade import QuizRegrade
+from .roster import RosterImport, read_roster
 import csv
 import io
 
@@ -63,11 +70,10 @@ def remove_edit_delete_for_non_owners(menu_items, request, context):
     page = context.get('page')
     
     if isinstance(page, Quiz):
-        quiz = page
         user = request.user
         
         # Check if user is owner or superuser
-        if not user.is_superuser and not quiz.is_owner(user):
+        if not user.is_superuser and not is_quiz_owner(user, page.id):
             # Remove edit and delete actions
             menu_items[:] = [
                 item for item in menu_items 
@@ -81,10 +87,8 @@ def remove_edit_button_for_non_owners(buttons, page, user, context=None):
     Remove edit button from page listings for non-owner teachers
     """
     if isinstance(page, Quiz):
-        quiz = page
-        
         # If user is not owner and not superuser, remove edit/delete buttons
-        if not user.is_superuser and not quiz.is_owner(user):
+        if not user.is_superuser and not is_quiz_owner(user, page.id):
             buttons[:] = [
                 button for button in buttons 
                 if button.label not in ['Edit', 'Delete']
@@ -258,6 +262,160 @@ def import_questions_csv(request, quiz_id):
     return render(request, 'quiz/admin/import_questions.html', {'quiz': quiz})
 
 
+# Placeholder in the rendered import page where progress lines are streamed
+PROGRESS_MARKER = '<!-- import-progress -->'
+
+
+def _stream_student_import(request, job, errors):
+    """Yield the progress page: header, one line per progress step, summary"""
+    page = render_to_string(
+        'quiz/admin/import_students.html',
+        {'importing': True, 'progress_marker': PROGRESS_MARKER, 'errors': errors[:10],
+         'more_errors': max(0, len(errors) - 10), 'total': len(job.rows)},
+        request=request,
+    )
+    head, tail = page.split(PROGRESS_MARKER, 1)
+    # Pad the first chunk so browsers start rendering before the import ends
+    yield head + ' ' * 1024
+
+    try:
+        for stage, done, total in job.run():
+            yield format_html('<div>{}: {} / {}</div>\n', stage.capitalize(), done, total)
+    except Exception as e:
+        yield format_html('<p class="error">Import failed, no students were created: {}</p>', e)
+    else:
+        result = job.result
+        if result.existing:
+            yield format_html(
+                '<p class="warning">Skipped {} student(s) that are already registered.</p>',
+                len(result.existing),
+            )
+        yield format_html('<p class="success">Created {} student account(s).</p>', result.created)
+    yield tail
+
+
+def import_students(request):
+    """
+    Provision student accounts from an uploaded CSV roster, streaming progress
+    """
+    if not request.user.has_perm('auth.add_user'):
+        raise PermissionDenied
+
+    if request.method == 'POST':
+        csv_file = request.FILES.get('csv_file')
+        if not csv_file or not csv_file.name.endswith('.csv'):
+            wagtail_messages.error(request, "Please upload a valid CSV file.")
+            return render(request, 'quiz/admin/import_students.html')
+
+        try:
+            rows, errors = read_roster(csv_file.read().decode('utf-8-sig'))
+        except (UnicodeDecodeError, csv.Error) as e:
+            wagtail_messages.error(request, f"Error reading CSV file: {str(e)}")
+            return render(request, 'quiz/admin/import_students.html')
+
+        if not rows:
+            wagtail_messages.error(request, errors[0] if errors else "The roster has no students.")
+            return render(request, 'quiz/admin/import_students.html')
+
+        response = StreamingHttpResponse(
+            _stream_student_import(request, RosterImport(rows), errors),
+            content_type='text/html; charset=utf-8',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    return render(request, 'quiz/admin/import_students.html')
+
+
+# Changed outcomes listed at the end of a regrade; the command's --report has them all
+REGRADE_REPORT_ROWS = 100
+REGRADE_ROW = (
+    '<tr><td>{}</td><td>{}</td><td>{}</td><td>{} → {}</td><td>{}% → {}%</td><td>{} → {}</td></tr>'
+)
+
+
+def _stream_regrade(request, quiz, job):
+    """Yield the regrade page: header, one line per chunk, then the changed outcomes"""
+    page = render_to_string(
+        'quiz/admin/regrade_quiz.html',
+        {'quiz': quiz, 'regrading': True, 'dry_run': job.dry_run, 'progress_marker': PROGRESS_MARKER},
+        request=request,
+    )
+    head, tail = page.split(PROGRESS_MARKER, 1)
+    yield head + ' ' * 1024
+
+    try:
+        for stage, done, total in job.run():
+            yield format_html('<div>{}: {} / {}</div>\n', stage.capitalize(), done, total)
+    except Exception as e:
+        yield format_html('<p class="error">Regrade failed after {} attempt(s): {}</p>', job.report.attempts, e)
+    else:
+        report = job.report
+        yield format_html(
+            '<p class="success">{} attempt(s) checked, {} answer(s) regraded. '
+            '{} result(s) {}changed: {} now pass, {} now fail.</p>',
+            report.attempts, report.answers_changed, len(report.changes),
+            'would be ' if job.dry_run else '', report.newly_passed, report.newly_failed,
+        )
+        if report.changes:
+            rows = format_html_join('', REGRADE_ROW, (
+                (change.attempt_id, change.student, change.end_time,
+                 change.old_score, change.new_score, change.old_percentage, change.new_percentage,
+                 'Passed' if change.old_passed else 'Failed', 'Passed' if change.new_passed else 'Failed')
+                for change in report.changes[:REGRADE_REPORT_ROWS]
+            ))
+            yield format_html(
+                '<table class="listing"><thead><tr><th>Attempt</th><th>Student</th><th>Submitted</th>'
+                '<th>Score</th><th>Percentage</th><th>Result</th></tr></thead><tbody>{}</tbody></table>',
+                rows,
+            )
+            if len(report.changes) > REGRADE_REPORT_ROWS:
+                yield format_html(
+                    '<p>... and {} more (run <code>manage.py regrade_quiz {} --report FILE</code> for all)</p>',
+                    len(report.changes) - REGRADE_REPORT_ROWS, quiz.id,
+                )
+    yield tail
+
+
+def regrade_quiz(request, quiz_id):
+    """
+    Re-score every completed attempt of a quiz after its answer key changed,
+    streaming progress and then the changed outcomes
+    """
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    if not request.user.is_staff or not (request.user.is_superuser or quiz.is_owner(request.user)):
+        raise PermissionDenied
+
+    if request.method == 'POST':
+        job = QuizRegrade(quiz, dry_run=bool(request.POST.get('dry_run')))
+        response = StreamingHttpResponse(
+            _stream_regrade(request, quiz, job),
+            content_type='text/html; charset=utf-8',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    return render(request, 'quiz/admin/regrade_quiz.html', {'quiz': quiz})
+
+
+def question_bank(request):
+    """
+    Full-text search over the questions and options of the teacher's quizzes
+    (every quiz for superusers), a page at a time
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    query = request.GET.get('q', '').strip()
+    results = None
+    if query:
+        quiz_ids = None if request.user.is_superuser else owned_quiz_ids(request.user)
+        results = search_questions(query, quiz_ids, cursor=request.GET.get('after'))
+    return render(request, 'quiz/admin/question_bank.html', {'query': query, 'results': results})
+
+
 @hooks.register('register_admin_urls')
 def register_import_questions_url():
     """
@@ -265,9 +423,34 @@ def register_import_questions_url():
     """
     return [
         path('quiz/<int:quiz_id>/import-questions/', import_questions_csv, name='import_questions_csv'),
+        path('students/import/', import_students, name='import_students'),
+        path('quiz/<int:quiz_id>/regrade/', regrade_quiz, name='regrade_quiz'),
+        path('questions/search/', question_bank, name='question_bank'),
     ]
 
 
+class ImportStudentsMenuItem(MenuItem):
+    def is_shown(self, request):
+        return request.user.has_perm('auth.add_user')
+
+
+@hooks.register('register_settings_menu_item')
+def register_import_students_menu_item():
+    return ImportStudentsMenuItem(
+        'Import students', reverse('import_students'), icon_name='group', order=610,
+    )
+
+
+class QuestionBankMenuItem(MenuItem):
+    def is_shown(self, request):
+        return request.user.is_staff
+
+
+@hooks.register('register_admin_menu_item')
+def register_question_bank_menu_item():
+    return QuestionBankMenuItem('Question bank', reverse('question_bank'), icon_name='search', order=250)
+
+
 @hooks.register('register_page_listing_more_buttons')
 def add_import_button(page, user, next_url=None):
     """
@@ -276,14 +459,20 @@ def add_import_button(page, user, next_url=None):
     from wagtail.admin.widgets.button import Button
     
     if isinstance(page, Quiz):
-        if user.is_staff and (user.is_superuser or page.is_owner(user)):
+        if user.is_staff and (user.is_superuser or is_quiz_owner(user, page.id)):
             return [
                 Button(
                     'Import Questions',
                     reverse('import_questions_csv', args=[page.id]),
                     attrs={'title': 'Import questions from CSV'},
                     priority=10
-                )
+                ),
+                Button(
+                    'Regrade Attempts',
+                    reverse('regrade_quiz', args=[page.id]),
+                    attrs={'title': 'Re-score completed attempts against the current answer key'},
+                    priority=20
+                ),
             ]
     
     return []
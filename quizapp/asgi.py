@@ -0,0 +1,21 @@
+"""
+ASGI config for quizapp project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+The attempt status and time endpoints polled by every open exam tab are async
+views, so under an ASGI server they wait on the database without holding a
+worker thread. The WSGI entry point in ``quizapp/wsgi.py`` serves the same
+URLs and remains the default for everything else.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "quizapp.settings.dev")
+
+application = get_asgi_application()
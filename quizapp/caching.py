@@ -0,0 +1,32 @@
+"""
+Timeouts for cached data that is dropped when it changes.
+
+The available-quiz list (quiz/availability.py), the anonymous page cache
+(quizapp/page_cache.py) and the quiz detail fragments are invalidated by
+deleting keys when quizzes or pages change. That only reaches every worker
+when the cache is shared between them: production configures Redis from
+``REDIS_URL``. With a process-local cache, Django's default LocMemCache,
+a delete only clears the copy of the process that made the change, so
+those caches keep entries for at most LOCAL_TIMEOUT seconds instead.
+"""
+from django.conf import settings
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Seconds other processes may serve stale data when the cache is process-local
+LOCAL_TIMEOUT = 5
+
+
+def cache_is_shared(alias='default'):
+    """Whether every worker sees the same ``alias`` cache"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def invalidated_timeout(timeout, alias='default'):
+    """``timeout`` for an entry that is invalidated on change, capped when the cache is process-local"""
+    if cache_is_shared(alias):
+        return timeout
+    return LOCAL_TIMEOUT if timeout is None else min(timeout, LOCAL_TIMEOUT)
@@ -0,0 +1,109 @@
+"""
+Read-replica routing for the heavy read-only pages.
+
+Analytics, the CSV export and the student dashboard aggregate over every
+attempt and answer, and used to run on the primary that is taking exam-time
+writes. Code wrapped in ``read_from_replica`` (a decorator or a ``with``
+block) sends its reads to the ``replica`` database alias instead; everything
+else, and every write, stays on ``default``.
+
+A replica lags the primary, so after a request writes, that browser's reads
+stay on the primary for ``REPLICA_PIN_SECONDS`` (read-your-writes).
+ReplicaPinMiddleware tracks this with a cookie, so the pin holds across pods.
+
+Routing only happens when a ``replica`` alias is configured in DATABASES.
+Locally, point ``DB_REPLICA_NAME`` at a second SQLite file (see settings/dev.py).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_primary_until'
+DEFAULT_PIN_SECONDS = 10
+
+# Apps whose writes do not count as user writes (session saves, for example,
+# happen on most requests and do not change anything a replica read returns)
+IGNORED_WRITE_APPS = {'sessions'}
+
+_use_replica = ContextVar('use_replica', default=False)
+# Per-request state set by ReplicaPinMiddleware: {'pinned': bool, 'wrote': bool}
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.settings
+
+
+@contextmanager
+def read_from_replica():
+    """Route reads inside the block (or decorated view) to the replica"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Sends reads inside ``read_from_replica`` to the replica alias"""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or not replica_configured():
+            return None
+        state = _request_state.get()
+        if state is not None and (state['pinned'] or state['wrote']):
+            return None
+        # Reads inside a transaction must see the transaction's own writes
+        if connections['default'].in_atomic_block:
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label not in IGNORED_WRITE_APPS:
+            state['wrote'] = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication
+        return db != REPLICA_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """
+    Keeps a browser's reads on the primary for a short while after it writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        state = {'pinned': pinned_until > time.time(), 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state['wrote'] and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE,
+                str(int(time.time() + self.pin_seconds)),
+                max_age=self.pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
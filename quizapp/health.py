@@ -0,0 +1,133 @@
+"""
+Liveness and readiness endpoints for Kubernetes probes and the Docker HEALTHCHECK.
+
+HealthCheckMiddleware answers /healthz and /readyz before the session, CSRF,
+auth and messages middleware run, so a probe never touches the session store,
+the database-backed user lookup or a template. It must be listed first in
+MIDDLEWARE.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+
+HEALTH_PATH = '/healthz'
+READY_PATH = '/readyz'
+
+# How long a readiness result is reused before the checks run again
+READINESS_CACHE_SECONDS = getattr(settings, 'READINESS_CACHE_SECONDS', 5)
+
+
+class ReadinessChecker:
+    """
+    Runs the readiness checks at most once per ``ttl`` seconds per worker.
+
+    Concurrent probes never queue behind a refresh: while one thread refreshes,
+    the others return the previous result.
+    """
+
+    CACHE_KEY = 'quizapp:readyz'
+
+    def __init__(self, ttl=READINESS_CACHE_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = 0.0
+        self._migrations_applied = False
+
+    def check_database(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        return True
+
+    def check_cache(self):
+        token = str(time.monotonic())
+        cache.set(self.CACHE_KEY, token, 30)
+        return cache.get(self.CACHE_KEY) == token
+
+    def check_migrations(self):
+        # Applied migrations are never unapplied at runtime, so once the plan is
+        # empty the check is skipped for the lifetime of the worker.
+        if not self._migrations_applied:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            self._migrations_applied = not plan
+        return self._migrations_applied
+
+    def run_checks(self):
+        checks = {}
+        for name, check in (
+            ('database', self.check_database),
+            ('cache', self.check_cache),
+            ('migrations', self.check_migrations),
+        ):
+            try:
+                checks[name] = bool(check())
+            except Exception:
+                checks[name] = False
+            if name == 'database' and not checks[name]:
+                # Nothing else can be checked without a database
+                checks['migrations'] = False
+                break
+        return {'ready': all(checks.values()), 'checks': checks}
+
+    def status(self):
+        now = time.monotonic()
+        if self._result is not None and now - self._checked_at < self.ttl:
+            return self._result
+
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._result
+        try:
+            if self._result is None or time.monotonic() - self._checked_at >= self.ttl:
+                self._result = self.run_checks()
+                self._checked_at = time.monotonic()
+            return self._result
+        finally:
+            self._lock.release()
+
+    def reset(self):
+        self._result = None
+        self._checked_at = 0.0
+        self._migrations_applied = False
+
+
+readiness = ReadinessChecker()
+
+
+def _no_store(response):
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def healthz(request):
+    """Liveness: the worker is up and able to answer requests"""
+    return _no_store(JsonResponse({'status': 'ok'}))
+
+
+def readyz(request):
+    """Readiness: database, cache and migrations are all usable"""
+    result = readiness.status()
+    return _no_store(JsonResponse(result, status=200 if result['ready'] else 503))
+
+
+class HealthCheckMiddleware:
+    """Short-circuits probe requests ahead of the rest of the middleware stack"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.routes = {
+            HEALTH_PATH: healthz,
+            READY_PATH: readyz,
+        }
+
+    def __call__(self, request):
+        view = self.routes.get(request.path.rstrip('/'))
+        if view is not None and request.method in ('GET', 'HEAD'):
+            return view(request)
+        return self.get_response(request)
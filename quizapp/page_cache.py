@@ -0,0 +1,120 @@
+"""
+Full-page cache for Wagtail pages served to anonymous visitors.
+
+Pages that mix in CachedPageMixin mark the request when Wagtail serves them,
+and PageCacheMiddleware stores the rendered response. Later anonymous GET
+and HEAD requests for the same URL are answered from the cache before URL
+routing, the site and page lookups or the template run.
+
+Vary is honoured like Django's cache middleware does it: the response's
+Vary headers are stored per URL and the request's values for them become
+part of the key. Cookie is the exception. Pages check for a logged-in user,
+which reads the session and adds ``Vary: Cookie``, and keying on the whole
+Cookie header would give every visitor with a CSRF cookie a copy of their
+own. Instead only anonymous requests use the cache, and responses that set
+a cookie are never stored. The cached response keeps its Vary header for
+caches further out.
+
+Every key carries a generation. Publishing, unpublishing, moving or
+deleting any page starts a new one (home/signals.py), so changes show at
+once without having to find the cached URLs. The new generation only
+reaches every worker through a shared cache; with a process-local one,
+pages are kept for a few seconds at most (quizapp/caching.py). The middleware must come after
+AuthenticationMiddleware; it is listed last so the other middleware treat
+cached and fresh responses alike.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import invalidated_timeout
+
+KEY_PREFIX = 'page-cache'
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+
+
+def page_cache_timeout():
+    return invalidated_timeout(getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+
+
+class CachedPageMixin:
+    """Lets PageCacheMiddleware cache the page for anonymous visitors"""
+
+    # Seconds; None uses the PAGE_CACHE_TIMEOUT setting
+    page_cache_timeout = None
+
+    def serve(self, request, *args, **kwargs):
+        if self.page_cache_timeout:
+            request.page_cache_timeout = invalidated_timeout(self.page_cache_timeout)
+        else:
+            request.page_cache_timeout = page_cache_timeout()
+        return super().serve(request, *args, **kwargs)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Never set or evicted: start a new one, so no older entry can match
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+def purge():
+    """Drop every cached page, now and again once the current transaction commits"""
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+    # A request in between may have cached the page from before the change
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, time.time_ns(), None))
+
+
+def _url_key(request):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'{KEY_PREFIX}:{_generation()}:{url}'
+
+
+def _response_key(url_key, request, headers):
+    values = hashlib.md5('\n'.join(request.headers.get(header, '') for header in headers).encode()).hexdigest()
+    return f'{url_key}:{values}'
+
+
+def _vary_headers(response):
+    """The response's Vary headers, lower-cased, or None if it varies on everything"""
+    headers = {header.strip().lower() for header in response.get('Vary', '').split(',') if header.strip()}
+    return None if '*' in headers else sorted(headers - {'cookie'})
+
+
+def _cacheable(response):
+    cache_control = response.get('Cache-Control', '')
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not any(directive in cache_control for directive in ('private', 'no-store', 'no-cache'))
+    )
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return self.get_response(request)
+
+        url_key = _url_key(request)
+        headers = cache.get(url_key)
+        if headers is not None:
+            response = cache.get(_response_key(url_key, request, headers))
+            if response is not None:
+                return response
+
+        response = self.get_response(request)
+        timeout = getattr(request, 'page_cache_timeout', None)
+        headers = _vary_headers(response)
+        if timeout and headers is not None and _cacheable(response):
+            cache.set(url_key, headers, timeout)
+            cache.set(_response_key(url_key, request, headers), response, timeout)
+        return response
@@ -0,0 +1,122 @@
+"""
+PostgreSQL connection handling sized from the gunicorn worker model.
+
+With ``CONN_MAX_AGE`` every gthread thread keeps its own connection open, so a
+pod holds ``workers x threads`` mostly idle connections, and each worker
+recycle closes and reopens its share. ``DB_POOL_MODE`` selects one of:
+
+  persistent  - the previous behaviour: one connection per thread, reused for
+                ``CONN_MAX_AGE`` seconds (default)
+  psycopg     - a psycopg_pool pool per worker process (Django's
+                ``OPTIONS["pool"]``, needs psycopg[pool]). Threads borrow a
+                connection per request, so a worker holds ``min_size``
+                connections while idle and at most ``max_size`` under load
+  pgbouncer   - connect to the pgbouncer sidecar from
+                k8s/pgbouncer-sidecar.yaml, which multiplexes every worker in
+                the pod onto a small server-side pool that survives recycles
+
+All modes health-check connections before reuse (``CONN_HEALTH_CHECKS``; for
+psycopg this is ``ConnectionPool.check_connection`` on checkout).
+
+``DB_MAX_CONNECTIONS_PER_POD`` caps the server connections one pod may open,
+which keeps ``replicas x budget`` under PostgreSQL's ``max_connections``.
+Print the sizing with ``python -m quizapp.workers``.
+
+No Django imports, so the settings modules can use it.
+"""
+import os
+
+MODES = ('persistent', 'psycopg', 'pgbouncer')
+
+DEFAULT_MODE = 'persistent'
+DEFAULT_CONN_MAX_AGE = 600
+DEFAULT_MAX_CONNECTIONS_PER_POD = 20
+DEFAULT_PGBOUNCER_HOST = '127.0.0.1'
+DEFAULT_PGBOUNCER_PORT = '6432'
+
+# Seconds a thread waits for a pooled connection before the request fails
+DEFAULT_POOL_TIMEOUT = 10
+# Idle pooled connections above min_size are closed after this many seconds
+DEFAULT_POOL_MAX_IDLE = 300
+# Pooled connections are replaced after this many seconds
+DEFAULT_POOL_MAX_LIFETIME = 1800
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return default if value in (None, '') else int(value)
+
+
+def pool_size(worker_model):
+    """
+    Return ``(min_size, max_size)`` of the per-process psycopg pool.
+
+    A thread holds at most one connection, so a process never needs more than
+    ``threads``; the pod budget is shared evenly between the workers.
+    """
+    budget = _env_int('DB_MAX_CONNECTIONS_PER_POD', DEFAULT_MAX_CONNECTIONS_PER_POD)
+    max_size = max(1, min(worker_model.threads, budget // max(1, worker_model.workers)))
+    max_size = max(1, _env_int('DB_POOL_MAX_SIZE', max_size))
+    # psycopg_pool refuses a min_size above max_size
+    min_size = min(_env_int('DB_POOL_MIN_SIZE', 1), max_size)
+    return min_size, max_size
+
+
+def pgbouncer_pool_size(worker_model):
+    """Server connections the pod's pgbouncer should keep for the app"""
+    budget = _env_int('DB_MAX_CONNECTIONS_PER_POD', DEFAULT_MAX_CONNECTIONS_PER_POD)
+    return max(1, min(worker_model.workers * worker_model.threads, budget))
+
+
+def check_connection(connection):
+    """
+    The psycopg pool's ``check`` callback: ``ConnectionPool.check_connection``,
+    imported on first use so settings load without psycopg_pool installed
+    """
+    from psycopg_pool import ConnectionPool
+
+    ConnectionPool.check_connection(connection)
+
+
+def database_settings(worker_model, mode=None):
+    """
+    Return the keys to merge into a PostgreSQL ``DATABASES`` entry for
+    ``mode`` (default: ``DB_POOL_MODE``).
+    """
+    mode = mode or os.getenv('DB_POOL_MODE') or DEFAULT_MODE
+    if mode not in MODES:
+        raise ValueError(f'DB_POOL_MODE must be one of {", ".join(MODES)}, not {mode!r}')
+
+    if mode == 'psycopg':
+        min_size, max_size = pool_size(worker_model)
+        return {
+            # Pooled connections are returned to the pool at the end of each
+            # request; Django refuses persistent connections with a pool
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': min_size,
+                    'max_size': max_size,
+                    'timeout': _env_int('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+                    'max_idle': DEFAULT_POOL_MAX_IDLE,
+                    'max_lifetime': DEFAULT_POOL_MAX_LIFETIME,
+                    # CONN_HEALTH_CHECKS does not apply to pooled connections;
+                    # the pool checks them on checkout instead
+                    'check': check_connection,
+                },
+            },
+        }
+
+    settings = {
+        'CONN_MAX_AGE': _env_int('CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if mode == 'pgbouncer':
+        settings.update({
+            'HOST': os.getenv('PGBOUNCER_HOST', DEFAULT_PGBOUNCER_HOST),
+            'PORT': os.getenv('PGBOUNCER_PORT', DEFAULT_PGBOUNCER_PORT),
+            # Named cursors do not survive pgbouncer's transaction pooling
+            'DISABLE_SERVER_SIDE_CURSORS': True,
+        })
+    return settings
@@ -0,0 +1,196 @@
+"""
+Secrets for the settings modules, resolved without import-time side effects.
+
+A secret has a short name such as ``db-password`` and is looked up through a
+chain of providers, first match wins:
+
+  file           - ``$SECRETS_DIR/<name>``, e.g. a Kubernetes Secret or the
+                   Secret Manager CSI driver mounted at /var/run/secrets/quizapp
+  env            - the environment variable ``<NAME>`` (``DB_PASSWORD``)
+  secretmanager  - Google Secret Manager secret ``$SECRET_MANAGER_PREFIX<name>``
+                   (``quizapp-prod-db-password``), fetched once and cached
+
+The chain is set with ``SECRETS_PROVIDERS`` (comma separated). It defaults to
+``file,env``, or ``file,secretmanager,env`` when ``USE_SECRET_MANAGER`` is set.
+
+Only the secretmanager provider touches the network, and the Google client is
+imported the first time a secret is actually fetched from it. Fetched values
+are kept in memory and, if ``SECRETS_CACHE_DIR`` is set, in owner-only files
+for ``SECRETS_CACHE_SECONDS``. With gunicorn's ``preload_app`` the master
+resolves secrets once and workers inherit them; the file cache lets
+``manage.py`` and other processes in the same pod reuse the fetch.
+
+Like ``quizapp.workers`` this module has no Django imports, since it runs while
+settings are being loaded. Tests swap the chain with ``use_providers``.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SECRETS_DIR = '/var/run/secrets/quizapp'
+DEFAULT_SECRET_MANAGER_PREFIX = 'quizapp-prod-'
+DEFAULT_CACHE_SECONDS = 3600
+
+
+class FileSecretProvider:
+    """Secrets mounted as one file per secret"""
+
+    def __init__(self, directory=DEFAULT_SECRETS_DIR):
+        self.directory = directory
+
+    def get(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+
+class EnvSecretProvider:
+    """Secrets in environment variables, ``db-password`` -> ``DB_PASSWORD``"""
+
+    def get(self, name):
+        return os.environ.get(name.upper().replace('-', '_')) or None
+
+
+class SecretManagerProvider:
+    """Google Secret Manager (requires ``google-cloud-secret-manager``)"""
+
+    def __init__(self, prefix=DEFAULT_SECRET_MANAGER_PREFIX, project=None,
+                 cache_dir=None, cache_seconds=DEFAULT_CACHE_SECONDS):
+        self.prefix = prefix
+        self.project = project
+        self.cache_dir = cache_dir
+        self.cache_seconds = cache_seconds
+        self._client = None
+
+    def _cache_path(self, secret_id):
+        return os.path.join(self.cache_dir, secret_id) if self.cache_dir else None
+
+    def _read_cache(self, secret_id):
+        path = self._cache_path(secret_id)
+        try:
+            if path and time.time() - os.path.getmtime(path) < self.cache_seconds:
+                with open(path) as f:
+                    return f.read()
+        except OSError:
+            pass
+        return None
+
+    def _write_cache(self, secret_id, value):
+        path = self._cache_path(secret_id)
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            tmp = f'{path}.{os.getpid()}'
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning('Could not cache secret %s in %s', secret_id, self.cache_dir)
+
+    def fetch(self, secret_id):
+        if self._client is None:
+            import google.auth
+            from google.cloud import secretmanager
+
+            self._client = secretmanager.SecretManagerServiceClient()
+            if self.project is None:
+                _, self.project = google.auth.default()
+        name = f'projects/{self.project}/secrets/{secret_id}/versions/latest'
+        response = self._client.access_secret_version(request={'name': name})
+        return response.payload.data.decode('UTF-8')
+
+    def get(self, name):
+        secret_id = f'{self.prefix}{name}'
+        value = self._read_cache(secret_id)
+        if value is not None:
+            return value
+        try:
+            value = self.fetch(secret_id)
+        except Exception as e:
+            logger.warning('Failed to fetch secret %s from Secret Manager: %s', secret_id, e)
+            return None
+        self._write_cache(secret_id, value)
+        return value
+
+
+class FakeSecretProvider:
+    """Fixed secrets for tests and local runs"""
+
+    def __init__(self, secrets=None):
+        self.secrets = dict(secrets or {})
+        self.requested = []
+
+    def get(self, name):
+        self.requested.append(name)
+        return self.secrets.get(name)
+
+
+PROVIDERS = {
+    'file': lambda: FileSecretProvider(os.getenv('SECRETS_DIR', DEFAULT_SECRETS_DIR)),
+    'env': EnvSecretProvider,
+    'secretmanager': lambda: SecretManagerProvider(
+        prefix=os.getenv('SECRET_MANAGER_PREFIX', DEFAULT_SECRET_MANAGER_PREFIX),
+        project=os.getenv('GOOGLE_CLOUD_PROJECT') or None,
+        cache_dir=os.getenv('SECRETS_CACHE_DIR') or None,
+        cache_seconds=int(os.getenv('SECRETS_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)),
+    ),
+}
+
+
+def providers_from_env():
+    default = 'file,secretmanager,env' if os.getenv('USE_SECRET_MANAGER') else 'file,env'
+    names = [n.strip() for n in os.getenv('SECRETS_PROVIDERS', default).split(',') if n.strip()]
+    return [PROVIDERS[name]() for name in names]
+
+
+class SecretResolver:
+    """Looks each secret up through the provider chain once per process"""
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._resolved = {}
+
+    def get(self, name, default=None):
+        if name not in self._resolved:
+            value = None
+            for provider in self.providers:
+                value = provider.get(name)
+                if value is not None:
+                    break
+            self._resolved[name] = value
+        value = self._resolved[name]
+        return default if value is None else value
+
+
+_resolver = None
+
+
+def get_resolver():
+    global _resolver
+    if _resolver is None:
+        _resolver = SecretResolver(providers_from_env())
+    return _resolver
+
+
+def get_secret(name, default=None):
+    """Return secret ``name`` from the configured providers, or ``default``"""
+    return get_resolver().get(name, default)
+
+
+@contextmanager
+def use_providers(*providers):
+    """Resolve secrets through ``providers`` inside the block"""
+    global _resolver
+    previous = _resolver
+    _resolver = SecretResolver(list(providers))
+    try:
+        yield _resolver
+    finally:
+        _resolver = previous
@@ -51,8 +51,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Answers /healthz and /readyz before sessions, CSRF and auth; keep it first
+    "quizapp.health.HealthCheckMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    # Pins a browser's reads to the primary for a moment after it writes
+    "quizapp.db_routers.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -60,6 +64,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "wagtail.contrib.redirects.middleware.RedirectMiddleware",
+    # Serves cached Wagtail pages to anonymous visitors; keep it last
+    "quizapp.page_cache.PageCacheMiddleware",
 ]
 
 ROOT_URLCONF = "quizapp.urls"
@@ -95,6 +101,11 @@ DATABASES = {
     }
 }
 
+# Analytics, exports and the student dashboard read from a "replica" alias
+# when one is configured; see quizapp/db_routers.py.
+DATABASE_ROUTERS = ["quizapp.db_routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -115,6 +126,36 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Authentication and password hashing
+# Students and teachers log in with their email (quiz.backends.EmailBackend);
+# ModelBackend stays for username logins to the Wagtail admin.
+
+AUTHENTICATION_BACKENDS = [
+    "quiz.backends.EmailBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+# PASSWORD_HASHER_POLICY picks the hasher for new hashes (pbkdf2, argon2 or
+# scrypt); the others stay listed so existing hashes still verify and are
+# upgraded on the user's next login. argon2 needs the argon2-cffi package.
+# See quiz/hashers.py.
+PASSWORD_HASHER_POLICY = os.getenv("PASSWORD_HASHER_POLICY", "pbkdf2")
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "0")) or None
+
+_PASSWORD_HASHERS_BY_POLICY = {
+    "pbkdf2": "quiz.hashers.TunablePBKDF2PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS_BY_POLICY[PASSWORD_HASHER_POLICY]] + [
+    path for policy, path in _PASSWORD_HASHERS_BY_POLICY.items() if policy != PASSWORD_HASHER_POLICY
+] + ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]
+
+# Concurrent password verifications per worker process. Hashing is CPU bound,
+# so more than the process's share of a core only adds latency.
+LOGIN_HASH_CONCURRENCY = int(os.getenv("LOGIN_HASH_CONCURRENCY", "2"))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -183,6 +224,25 @@ WAGTAILADMIN_BASE_URL = "http://127.0.0.1:8000"
 # see https://docs.wagtail.org/en/stable/advanced_topics/deploying.html#user-uploaded-files
 WAGTAILDOCS_EXTENSIONS = ['csv', 'docx', 'key', 'odt', 'pdf', 'pptx', 'rtf', 'txt', 'xlsx', 'zip']
 
+# Attempt event bus for the exam page's server-sent events stream.
+# LocalEventBackend only reaches subscribers in the same process.
+# The stream needs the ASGI entry point (GUNICORN_ASGI=1, see gunicorn.conf.py).
+# Under WSGI, the default, the events endpoint answers 204 and the page keeps
+# polling api/status for the remaining time.
+QUIZ_EVENT_BACKEND = {
+    "BACKEND": "quiz.events.LocalEventBackend",
+}
+
+# How long Wagtail pages are cached for anonymous visitors (seconds);
+# publishing any page clears them (quizapp/page_cache.py)
+PAGE_CACHE_TIMEOUT = 600
+
+# Per-quiz leaderboards (quiz/leaderboard.py).
+# LocalLeaderboardBackend keeps a copy per process, rebuilt every minute.
+QUIZ_LEADERBOARD_BACKEND = {
+    "BACKEND": "quiz.leaderboard.LocalLeaderboardBackend",
+}
+
 # Login URL
 LOGIN_URL = '/quiz/login/'
 LOGIN_REDIRECT_URL = '/quiz/'
@@ -2,6 +2,7 @@
 Django settings for local development with Cloud SQL.
 """
 import os
+from quizapp.secret_providers import get_secret
 from .base import *
 
 DEBUG = True
@@ -18,14 +19,13 @@ if os.getenv("USE_CLOUD_SQL"):
             "PORT": os.getenv("DB_PORT", "5432"),
             "NAME": os.getenv("DB_NAME", "dev"),
             "USER": os.getenv("DB_USER", "dev_user"),
-            "PASSWORD": os.getenv("DB_PASSWORD"),
+            "PASSWORD": get_secret("db-password"),
             "CONN_MAX_AGE": 600,
             "OPTIONS": {
                 "connect_timeout": 10,
             },
         }
     }
-    print("✓ Using Cloud SQL for development")
 else:
     # Fallback to SQLite for offline development
     DATABASES = {
@@ -34,7 +34,13 @@ else:
             "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
         }
     }
-    print("✓ Using SQLite for offline development")
+    # A second SQLite file to try the read-replica routing locally; copy
+    # db.sqlite3 over it to "replicate"
+    if os.getenv("DB_REPLICA_NAME"):
+        DATABASES["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(BASE_DIR, os.environ["DB_REPLICA_NAME"]),
+        }
 
 # Google Cloud Storage for Media (Dev)
 if os.getenv("GS_BUCKET_NAME"):
@@ -48,7 +54,6 @@ if os.getenv("GS_BUCKET_NAME"):
     GS_FILE_OVERWRITE = False
     GS_QUERYSTRING_AUTH = False
     MEDIA_URL = f"https://storage.googleapis.com/{GS_BUCKET_NAME}/"
-    print(f"✓ Using GCS Bucket '{GS_BUCKET_NAME}' for media")
 
 # Development-specific settings
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -74,27 +79,3 @@ LOGGING = {
         },
     },
 }
-
-# Secret Manager Integration (Dev)
-try:
-    from google.cloud import secretmanager
-    import google.auth
-
-    if os.getenv("USE_SECRET_MANAGER"):
-        def get_secret(secret_id):
-            client = secretmanager.SecretManagerServiceClient()
-            _, project_id = google.auth.default()
-            name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-            response = client.access_secret_version(request={"name": name})
-            return response.payload.data.decode("UTF-8")
-
-        print("✓ Fetching secrets from Secret Manager...")
-        db_password = get_secret("quizapp-prod-db-password")
-        
-        if "default" in DATABASES:
-            DATABASES["default"]["PASSWORD"] = db_password
-            
-except ImportError:
-    pass
-except Exception as e:
-    print(f"Warning: Failed to fetch secrets from Secret Manager: {e}")
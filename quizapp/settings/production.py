@@ -1,5 +1,7 @@
 import os
 import dj_database_url
+from quizapp import pooling, workers
+from quizapp.secret_providers import get_secret
 from .base import *
 
 DEBUG = False
@@ -22,11 +24,14 @@ if "GS_BUCKET_NAME" in os.environ:
     GS_FILE_OVERWRITE = False
     GS_QUERYSTRING_AUTH = False
     MEDIA_URL = f"https://storage.googleapis.com/{GS_BUCKET_NAME}/"
-    print(f"✓ Using GCS Bucket '{GS_BUCKET_NAME}' for media")
 
 
+# Secrets come from mounted files, env vars or Secret Manager, see
+# quizapp/secret_providers.py. Nothing is fetched unless a secret is missing
+# from the mounted files (and, without USE_SECRET_MANAGER, the environment).
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "django-insecure-production-key-change-me")
+SECRET_KEY = get_secret("django-secret-key", "django-insecure-production-key-change-me")
 
 # SECURITY WARNING: define the correct hosts in production!
 ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "*").split(",")
@@ -41,38 +46,55 @@ elif "DB_HOST" in os.environ:
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv("DB_NAME", "prod"),
         "USER": os.getenv("DB_USER", "prod_user"),
-        "PASSWORD": os.getenv("DB_PASSWORD"),
+        "PASSWORD": get_secret("db-password"),
         "HOST": os.getenv("DB_HOST", "127.0.0.1"),
         "PORT": os.getenv("DB_PORT", "5432"),
         "CONN_MAX_AGE": 600,
     }
 
-try:
-    from .local import *
-except ImportError:
-    pass
+# Connection reuse / pooling (DB_POOL_MODE), sized from the same worker model
+# gunicorn.conf.py uses. See quizapp/pooling.py.
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    _pooling = pooling.database_settings(workers.compute())
+    _pooling["OPTIONS"] = {**DATABASES["default"].get("OPTIONS", {}), **_pooling.get("OPTIONS", {})}
+    DATABASES["default"].update(_pooling)
 
-# Secret Manager Integration
-try:
-    from google.cloud import secretmanager
-    import google.auth
+# Read replica for analytics and dashboards (quizapp/db_routers.py). It uses
+# the primary's connection and pooling settings with its own host.
+if "DATABASE_REPLICA_URL" in os.environ:
+    _replica = dj_database_url.parse(os.environ["DATABASE_REPLICA_URL"])
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        **{key: _replica[key] for key in ("NAME", "USER", "PASSWORD", "HOST", "PORT")},
+    }
+elif "DB_REPLICA_HOST" in os.environ:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DB_REPLICA_HOST"],
+        "PORT": os.getenv("DB_REPLICA_PORT", "5432"),
+    }
 
-    if os.getenv("USE_SECRET_MANAGER"):
-        def get_secret(secret_id):
-            client = secretmanager.SecretManagerServiceClient()
-            _, project_id = google.auth.default()
-            name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-            response = client.access_secret_version(request={"name": name})
-            return response.payload.data.decode("UTF-8")
+# Cross-pod cache, attempt events (exam timer / auto-submit stream) and
+# leaderboards. Without a shared cache, invalidated entries (quiz list, page
+# cache, quiz detail fragments) are only kept for a few seconds per process
+# (quizapp/caching.py).
+if "REDIS_URL" in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+    QUIZ_EVENT_BACKEND = {
+        "BACKEND": "quiz.events.RedisEventBackend",
+        "OPTIONS": {"url": os.environ["REDIS_URL"]},
+    }
+    QUIZ_LEADERBOARD_BACKEND = {
+        "BACKEND": "quiz.leaderboard.RedisLeaderboardBackend",
+        "OPTIONS": {"url": os.environ["REDIS_URL"]},
+    }
 
-        print("✓ Fetching secrets from Secret Manager...")
-        SECRET_KEY = get_secret("quizapp-prod-django-secret-key")
-        db_password = get_secret("quizapp-prod-db-password")
-        
-        if "default" in DATABASES:
-            DATABASES["default"]["PASSWORD"] = db_password
-            
+try:
+    from .local import *
 except ImportError:
-    print("Warning: google-cloud-secret-manager not installed.")
-except Exception as e:
-    print(f"Warning: Failed to fetch secrets from Secret Manager: {e}")
+    pass
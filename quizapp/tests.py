@@ -0,0 +1,273 @@
+import dataclasses
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from home.models import HomePage
+from quizapp import caching, page_cache, pooling, secret_providers, workers
+from quizapp.health import readiness
+
+
+class HealthEndpointTests(TestCase):
+    """
+    Tests for the probe endpoints served by HealthCheckMiddleware.
+    """
+
+    def setUp(self):
+        readiness.reset()
+
+    def test_healthz_skips_database_and_session(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertNotIn('Vary', response)
+
+    def test_readyz_reports_checks(self):
+        response = self.client.get('/readyz/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {'ready': True, 'checks': {'database': True, 'cache': True, 'migrations': True}},
+        )
+
+    def test_readyz_result_is_cached(self):
+        self.client.get('/readyz')
+        with self.assertNumQueries(0):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+
+    def test_readyz_unavailable_when_database_fails(self):
+        readiness.check_database = lambda: 1 / 0
+        try:
+            response = self.client.get('/readyz')
+        finally:
+            del readiness.check_database
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['checks']['database'])
+
+
+class PageCacheTests(TestCase):
+    """
+    Tests for the anonymous full-page cache of Wagtail pages.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.home = HomePage.objects.get(url_path='/home/')
+
+    def served_from_cache(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/', **headers)
+        return not queries.captured_queries
+
+    def test_anonymous_repeat_is_served_from_cache(self):
+        first = self.client.get('/')
+        self.assertContains(first, 'Student Login')
+        self.assertIn('Cookie', first['Vary'])
+        with self.assertNumQueries(0):
+            second = self.client.get('/')
+        self.assertEqual(second.content, first.content)
+
+    def test_logged_in_users_bypass_cache(self):
+        self.client.get('/')
+        self.client.force_login(User.objects.create_user('student', password='pass12345'))
+        self.assertContains(self.client.get('/'), 'Browse Quizzes')
+
+    def test_vary_headers_split_entries(self):
+        with mock.patch.object(page_cache, '_vary_headers', return_value=['accept-language']):
+            self.assertFalse(self.served_from_cache(HTTP_ACCEPT_LANGUAGE='en'))
+            self.assertTrue(self.served_from_cache(HTTP_ACCEPT_LANGUAGE='en'))
+            self.assertFalse(self.served_from_cache(HTTP_ACCEPT_LANGUAGE='fr'))
+
+    def test_publishing_a_page_purges(self):
+        self.assertFalse(self.served_from_cache())
+        self.assertTrue(self.served_from_cache())
+        self.home.save_revision().publish()
+        self.assertFalse(self.served_from_cache())
+        self.assertTrue(self.served_from_cache())
+
+    def test_process_local_cache_keeps_pages_briefly(self):
+        with mock.patch.object(page_cache.cache, 'set', wraps=page_cache.cache.set) as cache_set:
+            self.client.get('/')
+        self.assertEqual({call.args[2] for call in cache_set.call_args_list}, {caching.LOCAL_TIMEOUT})
+
+    def test_purge_reaches_every_worker_with_a_shared_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(page_cache.page_cache_timeout(), settings.PAGE_CACHE_TIMEOUT)
+            # Two workers, each with its own connection to the shared cache
+            first, second = (FileBasedCache(location, {}) for _ in range(2))
+            with mock.patch.object(page_cache, 'cache', first):
+                before = page_cache._generation()
+            with mock.patch.object(page_cache, 'cache', second):
+                self.assertEqual(page_cache._generation(), before)
+            with mock.patch.object(page_cache, 'cache', first), self.captureOnCommitCallbacks(execute=True):
+                page_cache.purge()
+            with mock.patch.object(page_cache, 'cache', second):
+                self.assertNotEqual(page_cache._generation(), before)
+
+
+class WorkerSizingTests(SimpleTestCase):
+    """
+    Tests for the cgroup-based gunicorn worker model.
+    """
+
+    def make_cgroup(self, cpu_max, memory_max):
+        root = tempfile.mkdtemp()
+        with open(os.path.join(root, 'cpu.max'), 'w') as f:
+            f.write(cpu_max)
+        with open(os.path.join(root, 'memory.max'), 'w') as f:
+            f.write(memory_max)
+        return root
+
+    def test_small_pod_is_bounded_by_memory(self):
+        # 1 CPU would allow 3 workers, but 512Mi only fits 2
+        root = self.make_cgroup('100000 100000', str(512 * workers.MB))
+        config = workers.compute(root)
+        self.assertEqual(config.source, 'cgroup')
+        self.assertEqual(config.cpu_limit, 1.0)
+        self.assertEqual(config.memory_limit_mb, 512)
+        self.assertEqual(config.workers, 2)
+        self.assertEqual(config.threads, workers.DEFAULT_THREADS)
+        self.assertLess(config.workers * config.max_worker_memory_mb, 512)
+
+    def test_large_pod_is_bounded_by_cpu(self):
+        root = self.make_cgroup('50000 100000', str(4096 * workers.MB))
+        config = workers.compute(root)
+        self.assertEqual(config.cpu_limit, 0.5)
+        self.assertEqual(config.workers, 3)
+
+    def test_unlimited_cgroup_falls_back_to_host(self):
+        root = self.make_cgroup('max 100000', 'max')
+        config = workers.compute(root)
+        self.assertEqual(config.source, 'host')
+        self.assertGreaterEqual(config.workers, 1)
+
+
+class DatabasePoolingTests(SimpleTestCase):
+    """
+    Tests for DB_POOL_MODE settings sized from the worker model.
+    """
+
+    model = workers.WorkerConfig(
+        cpu_limit=1.0, memory_limit_mb=512, workers=3, threads=8,
+        max_worker_memory_mb=170, source='cgroup',
+    )
+
+    def test_default_keeps_persistent_connections(self):
+        with mock.patch.dict(os.environ, {'DB_POOL_MODE': ''}):
+            config = pooling.database_settings(self.model)
+        self.assertEqual(config, {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True})
+
+    def test_psycopg_pool_shares_pod_budget(self):
+        with mock.patch.dict(os.environ, {'DB_MAX_CONNECTIONS_PER_POD': '12'}):
+            config = pooling.database_settings(self.model, 'psycopg')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        pool = config['OPTIONS']['pool']
+        # 12 connections over 3 workers, below the 8 threads each could use
+        self.assertEqual((pool['min_size'], pool['max_size']), (1, 4))
+        self.assertLessEqual(pool['max_size'] * self.model.workers, 12)
+        self.assertIs(pool['check'], pooling.check_connection)
+
+    def test_pool_never_exceeds_threads(self):
+        single_worker = dataclasses.replace(self.model, workers=1)
+        self.assertEqual(pooling.pool_size(single_worker), (1, 8))
+
+    def test_min_size_clamped_to_overridden_max_size(self):
+        with mock.patch.dict(os.environ, {'DB_POOL_MIN_SIZE': '4', 'DB_POOL_MAX_SIZE': '1'}):
+            self.assertEqual(pooling.pool_size(self.model), (1, 1))
+        with mock.patch.dict(os.environ, {'DB_POOL_MIN_SIZE': '4', 'DB_POOL_MAX_SIZE': '12'}):
+            self.assertEqual(pooling.pool_size(self.model), (4, 12))
+
+    def test_pgbouncer(self):
+        config = pooling.database_settings(self.model, 'pgbouncer')
+        self.assertEqual((config['HOST'], config['PORT']), ('127.0.0.1', '6432'))
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(pooling.pgbouncer_pool_size(self.model), 20)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            pooling.database_settings(self.model, 'pgpool')
+
+
+class SecretProviderTests(SimpleTestCase):
+    """
+    Tests for the settings secrets provider chain.
+    """
+
+    def test_chain_order_and_memo(self):
+        first = secret_providers.FakeSecretProvider({'db-password': 'from-file'})
+        second = secret_providers.FakeSecretProvider({'db-password': 'other', 'django-secret-key': 'key'})
+        with secret_providers.use_providers(first, second):
+            self.assertEqual(secret_providers.get_secret('db-password'), 'from-file')
+            self.assertEqual(secret_providers.get_secret('django-secret-key'), 'key')
+            self.assertEqual(secret_providers.get_secret('missing', 'fallback'), 'fallback')
+            secret_providers.get_secret('db-password')
+        self.assertEqual(first.requested, ['db-password', 'django-secret-key', 'missing'])
+        self.assertEqual(second.requested, ['django-secret-key', 'missing'])
+
+    def test_file_and_env_providers(self):
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, 'db-password'), 'w') as f:
+            f.write('mounted\n')
+        self.assertEqual(secret_providers.FileSecretProvider(directory).get('db-password'), 'mounted')
+        self.assertIsNone(secret_providers.FileSecretProvider(directory).get('django-secret-key'))
+        with mock.patch.dict(os.environ, {'DB_PASSWORD': 'from-env'}):
+            self.assertEqual(secret_providers.EnvSecretProvider().get('db-password'), 'from-env')
+
+    def test_default_chain(self):
+        with mock.patch.dict(os.environ, {'USE_SECRET_MANAGER': 'true'}):
+            chain = secret_providers.providers_from_env()
+        self.assertEqual(
+            [type(p) for p in chain],
+            [secret_providers.FileSecretProvider, secret_providers.SecretManagerProvider,
+             secret_providers.EnvSecretProvider],
+        )
+
+    def test_secret_manager_fetch_is_cached_across_processes(self):
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'secrets')
+        provider = secret_providers.SecretManagerProvider(cache_dir=cache_dir)
+        with mock.patch.object(provider, 'fetch', return_value='s3cret') as fetch:
+            self.assertEqual(provider.get('db-password'), 's3cret')
+        fetch.assert_called_once_with('quizapp-prod-db-password')
+        self.assertEqual(os.stat(os.path.join(cache_dir, 'quizapp-prod-db-password')).st_mode & 0o777, 0o600)
+
+        # Another process in the pod reads the cache instead of fetching
+        other = secret_providers.SecretManagerProvider(cache_dir=cache_dir)
+        with mock.patch.object(other, 'fetch', side_effect=AssertionError):
+            self.assertEqual(other.get('db-password'), 's3cret')
+
+    def test_secret_manager_failure_falls_through(self):
+        provider = secret_providers.SecretManagerProvider()
+        with mock.patch.object(provider, 'fetch', side_effect=RuntimeError('offline')):
+            with self.assertLogs('quizapp.secret_providers', 'WARNING'):
+                self.assertIsNone(provider.get('db-password'))
+
+    def test_settings_import_has_no_output(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='quizapp.settings.production',
+                   USE_SECRET_MANAGER='', SECRETS_PROVIDERS='env', DJANGO_SECRET_KEY='k')
+        result = subprocess.run(
+            [sys.executable, '-c', (
+                'import sys, quizapp.wsgi; '
+                'assert "google.cloud.secretmanager" not in sys.modules'
+            )],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, '')
@@ -0,0 +1,199 @@
+"""
+Gunicorn worker sizing from the container's cgroup limits.
+
+``multiprocessing.cpu_count()`` reports the node's cores, not the pod's CPU
+quota, so ``cpu_count() * 2 + 1`` workers inside a 512Mi / 1 CPU pod
+oversubscribes memory until the OOM killer SIGKILLs workers. This module reads
+the cgroup (v2, falling back to v1) CPU quota and memory limit and derives a
+worker count that fits in both.
+
+It deliberately has no Django imports so gunicorn.conf.py can use it before the
+application is loaded. Print the computed configuration without starting a
+server with::
+
+    python -m quizapp.workers
+"""
+import math
+import os
+import sys
+from dataclasses import asdict, dataclass
+
+from quizapp import pooling
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+# Rough steady-state footprint of one gthread worker running Django + Wagtail,
+# and of the master process holding the preloaded application.
+DEFAULT_WORKER_MEMORY_MB = 150
+DEFAULT_MASTER_MEMORY_MB = 80
+DEFAULT_THREADS = 4
+
+# Fraction of the memory limit left unused as a safety margin for page cache,
+# the interpreter's allocator and request spikes.
+MEMORY_HEADROOM = 0.15
+
+MB = 1024 * 1024
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _env_int(name, default=None):
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return int(value)
+
+
+def cgroup_cpu_limit(root=CGROUP_ROOT):
+    """Return the CPU quota in cores (e.g. 0.5), or None if unlimited"""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read(os.path.join(root, 'cpu.max'))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1
+    quota = _read(os.path.join(root, 'cpu', 'cpu.cfs_quota_us'))
+    period = _read(os.path.join(root, 'cpu', 'cpu.cfs_period_us'))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_memory_limit(root=CGROUP_ROOT):
+    """Return the memory limit in bytes, or None if unlimited"""
+    memory_max = _read(os.path.join(root, 'memory.max'))
+    if memory_max:
+        return None if memory_max == 'max' else int(memory_max)
+
+    limit = _read(os.path.join(root, 'memory', 'memory.limit_in_bytes'))
+    # v1 reports "unlimited" as a huge page-aligned number
+    if limit and int(limit) < 2 ** 60:
+        return int(limit)
+    return None
+
+
+def host_memory():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+@dataclass
+class WorkerConfig:
+    cpu_limit: float
+    memory_limit_mb: int
+    workers: int
+    threads: int
+    max_worker_memory_mb: int
+    source: str
+
+
+def compute(root=CGROUP_ROOT):
+    """
+    Derive the worker model for this container.
+
+    Environment overrides:
+      GUNICORN_WORKERS, GUNICORN_THREADS  - force the counts
+      GUNICORN_WORKER_MEMORY_MB           - expected footprint per worker
+      GUNICORN_MAX_WORKER_MEMORY_MB       - recycle threshold per worker
+    """
+    cpu = cgroup_cpu_limit(root)
+    memory = cgroup_memory_limit(root)
+    source = 'cgroup'
+    if cpu is None:
+        cpu = float(os.cpu_count() or 1)
+        source = 'host'
+    if memory is None:
+        memory = host_memory() or 1024 * MB
+        source = 'host'
+
+    worker_mb = _env_int('GUNICORN_WORKER_MEMORY_MB', DEFAULT_WORKER_MEMORY_MB)
+    usable_mb = memory / MB * (1 - MEMORY_HEADROOM) - DEFAULT_MASTER_MEMORY_MB
+
+    cpu_workers = 2 * max(1, math.ceil(cpu)) + 1
+    memory_workers = int(usable_mb // worker_mb)
+    workers = _env_int('GUNICORN_WORKERS') or max(1, min(cpu_workers, memory_workers))
+    threads = _env_int('GUNICORN_THREADS', DEFAULT_THREADS)
+
+    # Each worker may grow into its share of the usable memory before it is
+    # recycled, which keeps the pod as a whole under its limit.
+    max_worker_mb = _env_int(
+        'GUNICORN_MAX_WORKER_MEMORY_MB',
+        max(worker_mb, int(usable_mb // workers)),
+    )
+
+    return WorkerConfig(
+        cpu_limit=round(cpu, 2),
+        memory_limit_mb=int(memory // MB),
+        workers=workers,
+        threads=threads,
+        max_worker_memory_mb=max_worker_mb,
+        source=source,
+    )
+
+
+def current_memory():
+    """
+    Return this process's memory footprint in bytes.
+
+    With preload_app the forked workers share the application's pages
+    copy-on-write, so plain RSS counts those shared pages once per worker.
+    Proportional set size (PSS) splits them between the sharers and is what
+    actually adds up to the pod's usage; RSS is the fallback.
+    """
+    rollup = _read('/proc/self/smaps_rollup')
+    if rollup:
+        for line in rollup.splitlines():
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+
+    statm = _read('/proc/self/statm')
+    if statm:
+        return int(statm.split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    return None
+
+
+def recycle_if_oversized(worker, limit_mb, every=10):
+    """
+    Gracefully retire ``worker`` once its memory exceeds ``limit_mb``.
+
+    Meant for gunicorn's ``post_request`` hook. Clearing ``worker.alive`` is
+    the same mechanism ``max_requests`` uses: the worker finishes in-flight
+    requests and exits, and the arbiter forks a fresh one from the preloaded
+    master.
+    """
+    if not worker.alive or worker.nr % every:
+        return False
+    used = current_memory()
+    if used is None or used <= limit_mb * MB:
+        return False
+    worker.log.warning(
+        'Worker %s using %d MB (limit %d MB), recycling after current requests',
+        worker.pid, used // MB, limit_mb,
+    )
+    worker.alive = False
+    return True
+
+
+def main():
+    config = compute()
+    for key, value in asdict(config).items():
+        sys.stdout.write(f'{key} = {value}\n')
+    min_size, max_size = pooling.pool_size(config)
+    sys.stdout.write(f'db_pool_per_worker = {min_size}..{max_size}\n')
+    sys.stdout.write(f'pgbouncer_default_pool_size = {pooling.pgbouncer_pool_size(config)}\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())